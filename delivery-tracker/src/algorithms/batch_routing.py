@@ -0,0 +1,198 @@
+import heapq
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from algorithms.routing import Routing
+from models.shared_graph import SharedGraph
+
+ALGORITHMS = {
+    'dijkstra': 'shortest_path',
+    'astar': 'a_star_search',
+    'bfs': 'find_shortest_path_bfs',
+}
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+def _init_worker(handle, preprocess):
+    shared = SharedGraph.attach(handle)
+    _worker['shared'] = shared
+    _worker['routing'] = Routing(shared.graph, preprocess=preprocess)
+
+def dijkstra_many(graph, start, ends):
+    """
+    {end: path or None} for every end from one Dijkstra search on a
+    dict-backed graph, stopping once every reachable end is settled
+    """
+    native = getattr(graph, 'dijkstra_many', None)
+    if native is not None:
+        return native(start, ends)
+
+    results = {end: None for end in ends}
+    same_component = getattr(graph, 'same_component', None)
+    wanted = {end for end in results
+              if end in graph.nodes and start in graph.nodes
+              and (same_component is None or same_component(start, end))}
+    if not wanted:
+        return results
+
+    edges = graph.edges
+    distances = {start: 0}
+    previous = {}
+    counter = 0  # Tie-breaker so node ids never need to be comparable
+    heap = [(0, counter, start)]
+    while heap and wanted:
+        distance, _, node = heapq.heappop(heap)
+        if distance > distances[node]:
+            continue
+        if node in wanted:
+            wanted.discard(node)
+            path = [node]
+            while path[-1] in previous:
+                path.append(previous[path[-1]])
+            results[node] = path[::-1]
+        for neighbor, weight in edges[node].items():
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, float('inf')):
+                distances[neighbor] = candidate
+                previous[neighbor] = node
+                counter += 1
+                heapq.heappush(heap, (candidate, counter, neighbor))
+    return results
+
+def group_by_source(pairs):
+    """[(start, [ends...])] with the largest groups first"""
+    groups = {}
+    for start, end in pairs:
+        groups.setdefault(start, []).append(end)
+    return sorted(groups.items(), key=lambda group: len(group[1]), reverse=True)
+
+def _one_search_per_group(routing, algorithm):
+    """True when one search serves a whole group, False when each pair needs its own"""
+    return algorithm == 'dijkstra' and not routing.preprocess
+
+def route_groups(routing, algorithm, groups):
+    """[(start, end, path)] for a list of (start, ends) groups"""
+    results = []
+    if _one_search_per_group(routing, algorithm):
+        for start, ends in groups:
+            paths = dijkstra_many(routing.graph, start, ends)
+            results.extend((start, end, paths[end]) for end in ends)
+    else:
+        search = getattr(routing, ALGORITHMS[algorithm])
+        for start, ends in groups:
+            results.extend((start, end, search(start, end)) for end in ends)
+    return results
+
+def _route_groups_in_worker(algorithm, groups):
+    return route_groups(_worker['routing'], algorithm, groups)
+
+def _chunks(groups, workers, min_chunk):
+    """
+    Guided self-scheduling: each chunk takes about remaining / (2 * workers)
+    pairs, so early chunks are large and the tail is split finely enough
+    for idle workers to pick up the leftovers.
+    """
+    remaining = sum(len(ends) for _, ends in groups)
+    chunk, size = [], 0
+    for start, ends in groups:
+        chunk.append((start, ends))
+        size += len(ends)
+        if size >= max(min_chunk, remaining // (2 * workers)):
+            yield chunk
+            remaining -= size
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+def route_many(routing, pairs, algorithm='dijkstra', workers=1, min_chunk=16, stats=None):
+    """
+    Route (start, end) pairs, yielding (start, end, path) as results arrive
+    (not in input order).
+
+    Pairs are grouped by start so a single Dijkstra search serves every end
+    of a group. With workers > 1 the graph is published to shared memory and
+    chunks of groups are handed to a process pool as workers free up; the
+    workers route with the same preprocess setting as `routing`. If a stats
+    dict is given it is filled with throughput figures once the iterator is
+    exhausted. An unknown algorithm raises ValueError here, not on first use.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    return _route_many(routing, pairs, algorithm, workers, min_chunk, stats)
+
+def _route_many(routing, pairs, algorithm, workers, min_chunk, stats, shared=None):
+    started = time.perf_counter()
+    groups = group_by_source(pairs)
+    pair_count = sum(len(ends) for _, ends in groups)
+    workers = max(1, workers or os.cpu_count() or 1)
+    chunk_count = 0
+
+    if workers == 1 or pair_count <= min_chunk:
+        workers = 1
+        for chunk in _chunks(groups, 1, min_chunk):
+            chunk_count += 1
+            yield from route_groups(routing, algorithm, chunk)
+    else:
+        owned = shared is None
+        if owned:
+            shared = SharedGraph.publish(routing.graph)
+        try:
+            # Spawned workers attach to the shared graph instead of forking a
+            # copy of a parent that may be holding locks or threads
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.handle, routing.preprocess),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                chunks = _chunks(groups, workers, min_chunk)
+                pending = set()
+                # Keep a couple of chunks queued per worker, no more, so
+                # results stream back while later chunks are still being cut
+                for chunk in chunks:
+                    pending.add(executor.submit(_route_groups_in_worker, algorithm, chunk))
+                    chunk_count += 1
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield from future.result()
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+        finally:
+            if owned:
+                shared.close()
+
+    if stats is not None:
+        seconds = time.perf_counter() - started
+        stats.update({
+            'pairs': pair_count,
+            'searches': len(groups) if _one_search_per_group(routing, algorithm) else pair_count,
+            'chunks': chunk_count,
+            'workers': workers,
+            'seconds': round(seconds, 4),
+            'pairs_per_second': round(pair_count / seconds, 1) if seconds else None,
+        })
+
+def route_batch(graph, pairs, workers=None, algorithm='dijkstra', chunk_size=16, preprocess=False):
+    """
+    route_many for callers that want a list: the paths for `pairs` in input
+    order (None where there is no route).
+
+    graph may be a Graph/CompiledGraph, which is published to shared memory
+    for the duration of the call, or an already published SharedGraph so
+    repeated batches skip the copy. chunk_size is the smallest chunk handed
+    to a worker.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    pairs = list(pairs)
+    if not pairs:
+        return []
+
+    shared = graph if isinstance(graph, SharedGraph) else None
+    routing = Routing(shared.graph if shared is not None else graph, preprocess=preprocess)
+    paths = {(start, end): path for start, end, path in
+             _route_many(routing, pairs, algorithm, workers, chunk_size, None, shared)}
+    return [paths[pair] for pair in pairs]
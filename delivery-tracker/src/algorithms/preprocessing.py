@@ -0,0 +1,219 @@
+import heapq
+import time
+
+def largest_component(graph):
+    """Node ids of the largest connected component, found with union-find"""
+    from models.union_find import UnionFind
+    components = UnionFind(graph.nodes)
+    for node, neighbors in graph.edges.items():
+        for neighbor in neighbors:
+            components.union(node, neighbor)
+    if not len(components):
+        return set(), 0
+    groups = components.groups()
+    return set(max(groups.values(), key=len)), len(groups)
+
+class Chain:
+    """A run of degree-2 nodes between two kept nodes, contracted to one edge"""
+
+    def __init__(self, nodes, offsets):
+        self.nodes = nodes  # [u, interior..., v], u and v are kept nodes
+        self.offsets = offsets  # Distance from u along the chain for each entry
+        self.length = offsets[-1]
+
+class PreprocessedGraph:
+    """
+    A reduced copy of a Graph for faster searches.
+
+    Fragments outside the largest connected component are dropped and every
+    chain of degree-2 nodes is replaced by a single edge between its kept
+    endpoints. The contracted chains are remembered so paths found on the
+    reduced graph can be expanded back to the original node sequence, and so
+    searches can start or end on a contracted node.
+    """
+
+    def __init__(self, graph, largest_only=True, contract=True, keep=()):
+        from models.graph import Graph
+        started = time.perf_counter()
+        self.source = graph
+        self.graph = Graph()
+        self.chains = []
+        self.chain_of = {}  # Interior node: (chain, index)
+        self.expansions = {}  # (u, v): node sequence for a reduced edge that replaced a chain
+        self.nodes_settled = 0  # Nodes expanded by the last search
+
+        if largest_only:
+            nodes, components = largest_component(graph)
+        else:
+            nodes, components = set(graph.nodes), None
+        self.covered = nodes  # Nodes reachable through the reduced graph
+
+        def degree(node):
+            return len(graph.edges.get(node, {}))
+
+        keep = set(keep)
+        if contract:
+            kept = {node for node in nodes if degree(node) != 2 or node in keep}
+        else:
+            kept = set(nodes)
+
+        for node in kept:
+            self.graph.add_node(node, graph.nodes[node])
+        for node in kept:
+            for neighbor, weight in graph.edges.get(node, {}).items():
+                if neighbor in kept:
+                    self.graph.add_edge(node, neighbor, weight)
+
+        for start in list(kept):
+            for first in graph.edges.get(start, {}):
+                if first not in kept and first not in self.chain_of:
+                    self._walk(start, first, kept)
+
+        # Rings made only of degree-2 nodes: keep one node as the anchor
+        for node in nodes:
+            if node not in kept and node not in self.chain_of:
+                kept.add(node)
+                self.graph.add_node(node, graph.nodes[node])
+                self._walk(node, next(iter(graph.edges[node])), kept)
+
+        self.report = {
+            'nodes_before': graph.get_node_count(),
+            'edges_before': graph.get_edge_count(),
+            'components': components,
+            'fragment_nodes_removed': graph.get_node_count() - len(nodes),
+            'contracted_nodes': len(self.chain_of),
+            'chains': len(self.chains),
+            'nodes_after': self.graph.get_node_count(),
+            'edges_after': self.graph.get_edge_count(),
+        }
+        before = self.report['nodes_before']
+        self.report['node_reduction_pct'] = round(
+            100.0 * (before - self.report['nodes_after']) / before, 1) if before else 0.0
+        self.report['seconds'] = round(time.perf_counter() - started, 4)
+
+    def _walk(self, start, first, kept):
+        graph = self.source
+        nodes = [start]
+        offsets = [0]
+        previous, current = start, first
+        while True:
+            nodes.append(current)
+            offsets.append(offsets[-1] + graph.edges[previous][current])
+            if current in kept:
+                break
+            following = [n for n in graph.edges[current] if n != previous]
+            previous, current = current, following[0]
+
+        chain = Chain(nodes, offsets)
+        self.chains.append(chain)
+        for index in range(1, len(nodes) - 1):
+            self.chain_of[nodes[index]] = (chain, index)
+
+        u, v = nodes[0], nodes[-1]
+        if u != v and chain.length < self.graph.edges[u].get(v, float('inf')):
+            self.graph.add_edge(u, v, chain.length)
+            self.expansions[(u, v)] = nodes
+            self.expansions[(v, u)] = nodes[::-1]
+
+    def covers(self, node):
+        return node in self.covered
+
+    def _anchors(self, node):
+        """[(reduced node, distance, original path from node to it)]"""
+        if node in self.graph.nodes:
+            return [(node, 0, [node])]
+        chain, index = self.chain_of[node]
+        nodes, offsets = chain.nodes, chain.offsets
+        return [
+            (nodes[0], offsets[index], nodes[index::-1]),
+            (nodes[-1], chain.length - offsets[index], nodes[index:])
+        ]
+
+    def expand(self, reduced_path):
+        """Original node sequence for a path over the reduced graph"""
+        if not reduced_path:
+            return reduced_path
+        path = [reduced_path[0]]
+        for u, v in zip(reduced_path, reduced_path[1:]):
+            expansion = self.expansions.get((u, v))
+            if expansion is not None:
+                path.extend(expansion[1:])
+            else:
+                path.append(v)
+        return path
+
+    def shortest_path(self, start, end, heuristic=None):
+        """
+        Shortest path between two covered nodes of the original graph,
+        searched on the reduced graph and expanded. heuristic(node) turns
+        the search into A*; it must never overestimate the remaining cost.
+        """
+        self.nodes_settled = 0
+        if start == end:
+            return [start]
+
+        best_cost, best_path = float('inf'), None
+        if start in self.chain_of and end in self.chain_of:
+            (chain_s, i), (chain_e, j) = self.chain_of[start], self.chain_of[end]
+            if chain_s is chain_e:
+                best_cost = abs(chain_s.offsets[i] - chain_s.offsets[j])
+                best_path = chain_s.nodes[i:j + 1] if i < j else chain_s.nodes[j:i + 1][::-1]
+
+        # Targets: reduced node -> (remaining distance, path from it to end)
+        targets = {}
+        for node, distance, path in self._anchors(end):
+            if distance < targets.get(node, (float('inf'),))[0]:
+                targets[node] = (distance, path[::-1])
+
+        h = heuristic or (lambda node: 0)
+        distances = {}
+        previous = {}
+        heads = {}
+        heap = []
+        for node, distance, path in self._anchors(start):
+            if distance < distances.get(node, float('inf')):
+                distances[node] = distance
+                heads[node] = path
+                heapq.heappush(heap, (distance + h(node), distance, node))
+
+        edges = self.graph.edges
+        best_node = None
+        while heap:
+            estimate, distance, node = heapq.heappop(heap)
+            if distance > distances[node]:
+                continue
+            if estimate >= best_cost:
+                break  # Estimates are lower bounds, so no remaining entry can do better
+            self.nodes_settled += 1
+            if node in targets:
+                total = distance + targets[node][0]
+                if total < best_cost:
+                    best_cost, best_node = total, node
+            for neighbor, weight in edges[node].items():
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = candidate
+                    previous[neighbor] = node
+                    heads.pop(neighbor, None)
+                    heapq.heappush(heap, (candidate + h(neighbor), candidate, neighbor))
+
+        if best_node is None:
+            return best_path
+
+        reduced = [best_node]
+        while reduced[-1] in previous:
+            reduced.append(previous[reduced[-1]])
+        reduced.reverse()
+        head = heads[reduced[0]]
+        return head[:-1] + self.expand(reduced) + targets[best_node][1][1:]
+
+def preprocess_graph(graph, largest_only=True, contract=True, keep=()):
+    """Build a PreprocessedGraph; see its report attribute for the reduction"""
+    return PreprocessedGraph(graph, largest_only=largest_only, contract=contract, keep=keep)
+
+def format_report(report):
+    return (f"{report['nodes_before']} -> {report['nodes_after']} nodes "
+            f"({report['node_reduction_pct']}% fewer), "
+            f"{report['edges_before']} -> {report['edges_after']} edges; "
+            f"{report['fragment_nodes_removed']} fragment nodes dropped, "
+            f"{report['contracted_nodes']} nodes in {report['chains']} contracted chains")
@@ -2,20 +2,63 @@ from collections import deque
 import heapq
 import math
 
+from utils.metrics import timer
+
 class Routing:
-    def __init__(self, graph):
+    def __init__(self, graph, preprocess=False):
         self.graph = graph
+        # With preprocess=True, Dijkstra and A* search a reduced copy of the
+        # graph (largest component, degree-2 chains contracted) and expand
+        # the result. The copy is rebuilt when graph.version moves on.
+        self.preprocess = preprocess
+        self.preprocessed = None
+        self.preprocessed_version = None  # graph.version the reduced copy was built from
+        self.nodes_settled = 0  # Nodes expanded by the last BFS/Dijkstra/A* search
+
+    def _may_connect(self, start, end):
+        """O(1) no-route check from the graph's component tracking, when it has one"""
+        same_component = getattr(self.graph, 'same_component', None)
+        return same_component is None or same_component(start, end)
+
+    def refresh_preprocessing(self):
+        """Rebuild the reduced graph; returns its reduction report"""
+        from algorithms.preprocessing import preprocess_graph
+        self.preprocessed_version = getattr(self.graph, 'version', None)
+        self.preprocessed = preprocess_graph(self.graph)
+        return self.preprocessed.report
+
+    def _preprocessed_search(self, start, end, heuristic=None):
+        """
+        Search on the reduced graph. Returns (handled, path); handled is False
+        when the endpoints lie outside the reduced graph's component.
+        """
+        if self.preprocessed is None or self.preprocessed_version != getattr(self.graph, 'version', None):
+            self.refresh_preprocessing()
+        covers_start = self.preprocessed.covers(start)
+        covers_end = self.preprocessed.covers(end)
+        if covers_start and covers_end:
+            path = self.preprocessed.shortest_path(start, end, heuristic)
+            self.nodes_settled = self.preprocessed.nodes_settled
+            return True, path
+        if covers_start or covers_end:
+            return True, None  # Different components: no route
+        return False, None
 
+    @timer('routing_bfs_seconds', "BFS route searches")
     def find_shortest_path_bfs(self, start_node, end_node):
         """BFS implementation for finding shortest path"""
         if start_node not in self.graph.nodes or end_node not in self.graph.nodes:
             return None
+        if not self._may_connect(start_node, end_node):
+            return None
         
         queue = deque([(start_node, [start_node])])
         visited = {start_node}
+        self.nodes_settled = 0
         
         while queue:
             current, path = queue.popleft()
+            self.nodes_settled += 1
             
             if current == end_node:
                 return path
@@ -27,10 +70,13 @@ class Routing:
         
         return None
 
+    @timer('routing_dfs_seconds', "DFS route searches")
     def find_shortest_path_dfs(self, start_node, end_node):
         """DFS implementation for finding path"""
         if start_node not in self.graph.nodes or end_node not in self.graph.nodes:
             return None
+        if not self._may_connect(start_node, end_node):
+            return None
         
         def dfs_recursive(current, path, visited):
             if current == end_node:
@@ -48,16 +94,32 @@ class Routing:
         
         return dfs_recursive(start_node, [start_node], set())
 
+    @timer('routing_dijkstra_seconds', "Dijkstra route searches")
     def shortest_path(self, start, end):
         """Dijkstra's algorithm for shortest path with weights"""
         if start not in self.graph.nodes or end not in self.graph.nodes:
             return None
+        if not self._may_connect(start, end):
+            return None
+
+        if self.preprocess:
+            handled, path = self._preprocessed_search(start, end)
+            if handled:
+                return path
+
+        # Array-backed graphs (CompiledGraph) search their own CSR layout
+        native = getattr(self.graph, 'dijkstra', None)
+        if native is not None:
+            path = native(start, end)
+            self.nodes_settled = self.graph.nodes_settled
+            return path
         
         # Dijkstra's algorithm
         distances = {node: float('inf') for node in self.graph.nodes}
         distances[start] = 0
         previous = {}
         pq = [(0, start)]
+        self.nodes_settled = 0
         
         while pq:
             current_distance, current = heapq.heappop(pq)
@@ -73,6 +135,7 @@ class Routing:
             
             if current_distance > distances[current]:
                 continue
+            self.nodes_settled += 1
             
             for neighbor in self.graph.get_neighbors(current):
                 weight = self.graph.get_edge_weight(current, neighbor)
@@ -85,10 +148,13 @@ class Routing:
         
         return None
 
+    @timer('routing_astar_seconds', "A* route searches")
     def a_star_search(self, start, end):
         """A* algorithm for optimal pathfinding with heuristic"""
         if start not in self.graph.nodes or end not in self.graph.nodes:
             return None
+        if not self._may_connect(start, end):
+            return None
         
         # Get coordinates for heuristic calculation
         def get_coordinates(node):
@@ -100,6 +166,11 @@ class Routing:
             x1, y1 = get_coordinates(node1)
             x2, y2 = get_coordinates(node2)
             return math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+
+        if self.preprocess:
+            handled, path = self._preprocessed_search(start, end, lambda node: heuristic(node, end))
+            if handled:
+                return path
         
         # A* algorithm implementation
         open_set = [(0, start)]  # (f_score, node)
@@ -110,10 +181,12 @@ class Routing:
         f_score[start] = heuristic(start, end)
         
         open_set_hash = {start}  # For O(1) membership testing
+        self.nodes_settled = 0
         
         while open_set:
             current = heapq.heappop(open_set)[1]
             open_set_hash.discard(current)
+            self.nodes_settled += 1
             
             if current == end:
                 # Reconstruct path
@@ -151,6 +224,16 @@ class Routing:
             total_time += self.graph.get_edge_weight(path[i], path[i + 1])
         return total_time
     
+    def route_many(self, pairs, algorithm='dijkstra', workers=1, stats=None):
+        """
+        Route many (start, end) pairs, yielding (start, end, path) as they
+        finish. Pairs sharing a start are served by one search; workers > 1
+        spreads the work over a process pool. algorithm is 'dijkstra',
+        'astar' or 'bfs'. Pass a dict as stats to receive throughput figures.
+        """
+        from algorithms.batch_routing import route_many
+        return route_many(self, pairs, algorithm=algorithm, workers=workers, stats=stats)
+
     def compare_algorithms(self, start, end):
         """Compare all algorithms and return performance metrics"""
         import time
@@ -165,9 +248,9 @@ class Routing:
         results = {}
         
         for name, algorithm in algorithms.items():
-            start_time = time.time()
+            start_time = time.perf_counter()
             path = algorithm(start, end)
-            end_time = time.time()
+            end_time = time.perf_counter()
             
             execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
             
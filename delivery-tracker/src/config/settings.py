@@ -1,5 +1,6 @@
 API_KEY = "YOUR_GOOGLE_MAPS_API_KEY"
 DEFAULT_SPEED = 40  # Average speed in km/h
 TIME_UNIT = "minutes"  # Unit for time calculations
+STATE_STORE = "snapshot"  # Where the GUI saves its state: "snapshot" files or a "sqlite" database
 
 # Other configuration settings can be added here as needed.
\ No newline at end of file
@@ -8,16 +8,21 @@ import os
 
 # Add parent directory to path to import our models
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import settings
 from models.delivery import Delivery
 from models.driver import Driver
-from models.graph import Graph
+from models.graph import Graph, GraphHolder
 from algorithms.routing import Routing
 from utils.image_map_creator import create_image_map
 from utils.real_time_map import create_real_time_map
 from utils.cuisine_time_calculator import CuisineTimeCalculator
 from ml.time_predictor import TimePredictor
 from ml.demand_predictor import DemandPredictor
+from ml.online_learning import CompletedDeliveryLog, OnlineLearner, assignment_features, time_of_day
 from services.assignment_service import AssignmentService
+from services.tracking_service import TrackingService
+from services.persistence_service import import_legacy_backups, open_state_store
+from utils import metrics
 
 class DeliveryTrackerGUI:
     def __init__(self, root):
@@ -25,18 +30,32 @@ class DeliveryTrackerGUI:
         self.root.title("Delivery Tracker System")
         self.root.geometry("1200x800")
         
+        # Hot-path timings and counters for the Live Tracking panel
+        metrics.registry.enable()
+        self.metrics_interval_ms = 2000
+        
         # Initialize data structures
         self.graph = Graph()
         self.drivers = {}
         self.deliveries = {}
-        self.routing = Routing(self.graph)
+        self.routing = Routing(self.graph, preprocess=True)
+        # Frozen snapshots of the graph for readers off the Tk thread
+        self.graph_holder = GraphHolder(self.graph)
         self.cuisine_calculator = CuisineTimeCalculator()
         
         # Initialize ML components
+        # Load the cached model or train in the background; predictions use
+        # the heuristic until it is ready
         self.time_predictor = TimePredictor()
-        self.time_predictor.train() # Train on startup
+        self.time_predictor.use_prediction_cache()
+        self.time_predictor.train_async()
         self.demand_predictor = DemandPredictor()
-        self.assignment_service = AssignmentService(self.graph)
+        # Drivers report here while live tracking is on; assignment skips
+        # any that have stopped reporting
+        self.tracking_service = TrackingService()
+        self.tracking_service.add_expiry_listener(
+            lambda driver_id, info: self.log_update(f"Driver {driver_id} stopped reporting"))
+        self.assignment_service = AssignmentService(self.graph, self.tracking_service)
         
         # Coordinate system variables
         self.show_coordinates = tk.BooleanVar(value=True)
@@ -45,9 +64,26 @@ class DeliveryTrackerGUI:
         self.pending_intersection_name = None
         self.distance_var = tk.DoubleVar(value=0.0) # For imported real-time distance
         
+        # Persistence: saves written off the main thread, to snapshot + delta
+        # files or to SQLite depending on settings.STATE_STORE
+        persistent_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'persistent')
+        self.snapshot_store = open_state_store(persistent_dir, settings.STATE_STORE)
+        self.autosave_interval_ms = 30000
+        
+        # Online learning: completed deliveries are logged and the ETA model
+        # is refitted on them in a worker process, then swapped in
+        self.completed_log = CompletedDeliveryLog(os.path.join(persistent_dir, 'completed_deliveries.csv'))
+        self.online_learner = OnlineLearner(self.time_predictor, self.completed_log)
+        Delivery.add_completion_listener(self.online_learner.on_delivery_completed)
+        
         # Create GUI elements
         self.create_widgets()
-        self.create_sample_data()
+        if not self.restore_state():
+            self.create_sample_data()
+        self.root.after(self.autosave_interval_ms, self.autosave)
+        self.root.after(self.metrics_interval_ms, self.refresh_metrics)
+        self.root.after(500, self.check_model_ready)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def create_widgets(self):
         # Create notebook for tabs
@@ -343,6 +379,19 @@ class DeliveryTrackerGUI:
             print(f"Error loading dishes: {e}")
             self.dish_combo['values'] = ["Loading dishes..."]
         
+        # Current conditions, used for the AI estimate and recorded with
+        # assigned deliveries so their actual times can train the model
+        conditions_frame = ttk.Frame(selection_frame)
+        conditions_frame.pack(fill=tk.X)
+        ttk.Label(conditions_frame, text="Weather:", font=('Arial', 8)).pack(side=tk.LEFT)
+        self.weather_var = tk.StringVar(value="Unknown")
+        ttk.Combobox(conditions_frame, textvariable=self.weather_var, width=8, state="readonly",
+                     values=["Unknown", "Clear", "Rain", "Fog", "Snow"]).pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Label(conditions_frame, text="Traffic:", font=('Arial', 8)).pack(side=tk.LEFT)
+        self.traffic_var = tk.StringVar(value="Unknown")
+        ttk.Combobox(conditions_frame, textvariable=self.traffic_var, width=8, state="readonly",
+                     values=["Unknown", "Low", "Medium", "High", "Jam"]).pack(side=tk.LEFT, padx=2)
+        
         # Smart calculation button
         smart_calc_frame = ttk.Frame(cuisine_frame)
         smart_calc_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
@@ -443,6 +492,28 @@ Results will appear here with detailed breakdowns!
         self.completed_deliveries_label = ttk.Label(self.stats_frame, text="Completed: 0")
         self.completed_deliveries_label.grid(row=0, column=2, padx=20)
         
+        # Performance metrics from the hot-path instrumentation
+        metrics_frame = ttk.LabelFrame(self.tracking_frame, text="Performance Metrics")
+        metrics_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        columns = ('count', 'mean', 'p95')
+        self.metrics_tree = ttk.Treeview(metrics_frame, columns=columns, height=6)
+        self.metrics_tree.heading('#0', text="Metric")
+        self.metrics_tree.heading('count', text="Count")
+        self.metrics_tree.heading('mean', text="Mean (ms)")
+        self.metrics_tree.heading('p95', text="p95 (ms)")
+        self.metrics_tree.column('#0', width=260)
+        for column in columns:
+            self.metrics_tree.column(column, width=100, anchor=tk.E)
+        self.metrics_tree.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=5)
+        
+        metrics_buttons = ttk.Frame(metrics_frame)
+        metrics_buttons.pack(side=tk.RIGHT, padx=5)
+        ttk.Button(metrics_buttons, text="Export",
+                  command=self.export_metrics).pack(fill=tk.X, pady=2)
+        ttk.Button(metrics_buttons, text="Reset",
+                  command=metrics.registry.reset).pack(fill=tk.X, pady=2)
+        
         # Live updates
         updates_frame = ttk.LabelFrame(self.tracking_frame, text="Live Updates")
         updates_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -503,7 +574,7 @@ Results will appear here with detailed breakdowns!
                                        f"Enter intersection ID for position ({int(x)}, {int(y)}):")
         if node_id and node_id not in self.graph.nodes:
             self.graph.add_node(node_id, {"x": x, "y": y})
-            self.routing = Routing(self.graph)
+            self.graph_changed()
             self.update_location_combos()
             self.draw_graph()
             self.log_update(f"Added intersection {node_id} at ({int(x)}, {int(y)})")
@@ -514,7 +585,7 @@ Results will appear here with detailed breakdowns!
                                        f"Enter intersection ID for position ({x}, {y}):")
         if node_id and node_id not in self.graph.nodes:
             self.graph.add_node(node_id, {"x": x, "y": y})
-            self.routing = Routing(self.graph)
+            self.graph_changed()
             self.update_location_combos()
             self.draw_graph()
             self.log_update(f"Added intersection {node_id} at ({x}, {y})")
@@ -552,7 +623,7 @@ Results will appear here with detailed breakdowns!
                 if not self.graph.has_edge(node1, node2):
                     self.graph.add_edge(node1, node2, 5)  # Default weight
         
-        self.routing = Routing(self.graph)
+        self.graph_changed()
         self.update_location_combos()
         self.draw_graph()
         self.log_update(f"Created {rows}x{cols} grid with {len(nodes_added)} new intersections")
@@ -580,7 +651,7 @@ Results will appear here with detailed breakdowns!
             if not self.graph.has_edge(node1, node2):
                 self.graph.add_edge(node1, node2, 4)  # Default weight
         
-        self.routing = Routing(self.graph)
+        self.graph_changed()
         self.update_location_combos()
         self.draw_graph()
         self.log_update(f"Created linear chain with {len(nodes_added)} new intersections")
@@ -607,8 +678,8 @@ Results will appear here with detailed breakdowns!
         for start, end, weight in roads:
             self.graph.add_edge(start, end, weight)
         
-        # Recreate routing with updated graph
-        self.routing = Routing(self.graph)
+        # Republish the updated graph
+        self.graph_changed()
         
         # Update combo boxes
         self.update_location_combos()
@@ -640,13 +711,13 @@ Results will appear here with detailed breakdowns!
         
         if start in nodes and end in nodes and weight:
             self.graph.add_edge(start, end, weight)
-            self.routing = Routing(self.graph)
+            self.graph_changed()
             self.draw_graph()
             self.log_update(f"Added road from {start} to {end} (time: {weight} min)")
     
     def clear_map(self):
         self.graph = Graph()
-        self.routing = Routing(self.graph)
+        self.graph_changed()
         self.map_canvas.delete("all")
         self.update_location_combos()
         self.draw_graph()
@@ -720,6 +791,8 @@ Results will appear here with detailed breakdowns!
                 location = simpledialog.askstring("Location", f"Enter current location ({', '.join(nodes)}):")
                 if location in nodes and name:
                     self.drivers[driver_id] = Driver(driver_id, name, location)
+                    if self.tracking_active.get():
+                        self.tracking_service.add_driver(driver_id, location)
                     self.refresh_drivers_display()
                     self.log_update(f"Added driver {name} (ID: {driver_id}) at {location}")
     
@@ -738,6 +811,8 @@ Results will appear here with detailed breakdowns!
         
         if location in nodes:
             self.drivers[driver_id].update_location(location)
+            if driver_id in self.tracking_service.drivers:
+                self.tracking_service.update_driver_location(driver_id, location)
             self.refresh_drivers_display()
             self.log_update(f"Driver {driver_id} moved to {location}")
     
@@ -748,7 +823,11 @@ Results will appear here with detailed breakdowns!
             destination = simpledialog.askstring("Destination", 
                                                f"Enter destination ({', '.join(nodes)}):")
             if destination in nodes:
-                self.deliveries[delivery_id] = Delivery(delivery_id, destination)
+                dish = simpledialog.askstring("Dish", "Dish ordered (optional, used to learn delivery times):")
+                if dish and not self.cuisine_calculator.get_dish_info(dish):
+                    messagebox.showwarning("Warning", f"Unknown dish '{dish}', creating the delivery without one")
+                    dish = None
+                self.deliveries[delivery_id] = Delivery(delivery_id, destination, dish or None)
                 self.refresh_deliveries_display()
                 self.log_update(f"Created delivery {delivery_id} to {destination}")
     
@@ -775,6 +854,7 @@ Results will appear here with detailed breakdowns!
         if delivery_id in available_deliveries:
             self.drivers[driver_id].assign_delivery(delivery_id)
             self.deliveries[delivery_id].update_status("Assigned")
+            self.record_eta_features(self.deliveries[delivery_id], self.drivers[driver_id])
             self.refresh_all_displays()
             self.log_update(f"Assigned delivery {delivery_id} to driver {driver_id}")
     
@@ -1002,7 +1082,8 @@ Prep Time: {info['base_prep_time']} min
         predicted_time = self.time_predictor.predict(
             dish_info['cuisine'], 
             dish_info['base_prep_time'], 
-            distance
+            distance,
+            **self.current_conditions()
         )
         
         # Display results
@@ -1095,6 +1176,7 @@ Confidence: High (Random Forest Model)
                     self.graph.add_edge(prev_node, node_id, weight=distance/len(points))
                 
                 prev_node = node_id
+        self.graph_changed()
         
         # Refresh display
         self.refresh_all_displays()
@@ -1150,7 +1232,8 @@ Confidence: High (Random Forest Model)
         predicted_time = self.time_predictor.predict(
             dish_info['cuisine'], 
             dish_info['base_prep_time'], 
-            distance
+            distance,
+            **self.current_conditions()
         )
         
         # Display results
@@ -1193,6 +1276,7 @@ Confidence: High (Random Forest Model)
         if best_driver:
             best_driver.assign_delivery(delivery.delivery_id)
             delivery.update_status("Assigned")
+            self.record_eta_features(delivery, best_driver)
             self.refresh_all_displays()
             
             msg = f"🤖 Smart Assigned {delivery.delivery_id} to {best_driver.name}\n"
@@ -1202,6 +1286,32 @@ Confidence: High (Random Forest Model)
         else:
             messagebox.showwarning("Warning", "No suitable drivers found.")
 
+    def current_conditions(self):
+        """TimePredictor.predict keyword arguments for the conditions that are known"""
+        conditions = {'time_of_day': time_of_day(datetime.now())}
+        if self.weather_var.get() != "Unknown":
+            conditions['weather'] = self.weather_var.get()
+        if self.traffic_var.get() != "Unknown":
+            conditions['traffic_level'] = self.traffic_var.get()
+        return conditions
+
+    def record_eta_features(self, delivery, driver):
+        """
+        Remember the ETA inputs for the delivery's own dish and the current
+        conditions so the actual time can be learned from on completion.
+        Nothing is recorded (and the delivery is not learned from) unless the
+        dish, weather, traffic and a route are all known.
+        """
+        delivery.eta_features = None
+        features = assignment_features(delivery, self.cuisine_calculator, self.current_conditions())
+        if features is None:
+            return
+        path = self.routing.a_star_search(driver.current_location, delivery.destination)
+        if not path:
+            return
+        distance = self.routing.calculate_route_time(path) * 0.5  # Same approximation as the AI estimate
+        delivery.set_eta_features(distance=distance, driver_rating=driver.rating, **features)
+
     def show_hotspots(self):
         """Visualize demand hotspots"""
         self.demand_predictor.generate_synthetic_history(self.graph.nodes)
@@ -1265,11 +1375,151 @@ Confidence: High (Random Forest Model)
             self.stop_live_tracking()
 
     def start_live_tracking(self):
+        for driver_id, driver in self.drivers.items():
+            self.tracking_service.add_driver(driver_id, driver.current_location)
         self.log_update("Live tracking started")
         
     def stop_live_tracking(self):
+        for driver_id in list(self.tracking_service.drivers):
+            self.tracking_service.remove_driver(driver_id)
         self.log_update("Live tracking stopped")
 
+    def check_model_ready(self):
+        """Poll the background model training and log once it finishes"""
+        thread = self.time_predictor.training_thread
+        if thread is not None and thread.is_alive():
+            self.root.after(500, self.check_model_ready)
+        else:
+            if self.time_predictor.is_trained:
+                source = "loaded from cache" if self.time_predictor.loaded_from_cache else "trained"
+                self.log_update(f"Delivery time model {source}")
+            else:
+                self.log_update("Delivery time model unavailable, using heuristic estimates")
+            # Only now, so the base model cannot replace a refitted one
+            if self.online_learner.start() is not None:
+                self.log_update(f"Refitting delivery time model on {len(self.completed_log)} logged deliveries")
+
+    def refresh_metrics(self):
+        """Redraw the metrics panel from a registry snapshot"""
+        snapshot = metrics.registry.snapshot()['metrics']
+        for name, values in snapshot.items():
+            if values['type'] == 'histogram':
+                row = (values['count'], f"{values['mean'] * 1000:.3f}", f"{values['p95'] * 1000:.3f}")
+            else:
+                row = (values['value'], '', '')
+            if self.metrics_tree.exists(name):
+                self.metrics_tree.item(name, values=row)
+            else:
+                self.metrics_tree.insert('', tk.END, iid=name, text=name, values=row)
+        self.root.after(self.metrics_interval_ms, self.refresh_metrics)
+
+    def export_metrics(self):
+        """Write the current metrics as JSON and Prometheus text next to the saved state"""
+        directory = self.snapshot_store.directory
+        try:
+            metrics.registry.write(os.path.join(directory, 'metrics.json'))
+            metrics.registry.write(os.path.join(directory, 'metrics.prom'))
+            self.log_update(f"Metrics exported to {os.path.abspath(directory)}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not export metrics: {e}")
+
+    def collect_state(self):
+        """Build a detached copy of the app state for the background saver"""
+        # A frozen snapshot stays consistent while the saver thread reads it,
+        # without deep-copying every adjacency dict
+        graph = self.graph_holder.publish(self.graph)
+        return {
+            'nodes': graph.nodes,
+            'edges': graph.edges,
+            'drivers': {
+                driver_id: {
+                    'name': driver.name,
+                    'status': driver.status,
+                    'current_location': driver.current_location,
+                    'assigned_deliveries': list(driver.assigned_deliveries),
+                    'rating': driver.rating,
+                    'efficiency_score': driver.efficiency_score
+                } for driver_id, driver in self.drivers.items()
+            },
+            'deliveries': {
+                delivery_id: {
+                    'destination': delivery.destination,
+                    'dish': delivery.dish,
+                    'status': delivery.status,
+                    'progress': delivery.progress,
+                    'created_at': delivery.created_at.isoformat()
+                } for delivery_id, delivery in self.deliveries.items()
+            },
+            'app_state': {
+                'total_deliveries': len(self.deliveries),
+                'total_drivers': len(self.drivers),
+                'graph_nodes': len(self.graph.nodes)
+            }
+        }
+
+    def graph_changed(self):
+        """Call after editing or replacing self.graph: repoints services and republishes it"""
+        if self.routing.graph is not self.graph:
+            self.routing = Routing(self.graph, preprocess=True)
+            self.assignment_service = AssignmentService(self.graph, self.tracking_service)
+        self.graph_holder.publish(self.graph)
+
+    def restore_state(self):
+        """Load the last saved state (or old-style backups); returns False when there is none"""
+        try:
+            if self.snapshot_store.has_saved_state():
+                state = self.snapshot_store.load()
+            else:
+                # First run after the switch to snapshots: pick up the old backups
+                state = import_legacy_backups(self.snapshot_store.directory)
+                if not state['nodes'] and not state['drivers'] and not state['deliveries']:
+                    return False
+        except Exception as e:
+            print(f"Could not restore saved state: {e}")
+            return False
+
+        self.graph = Graph()
+        for node_id, attrs in state['nodes'].items():
+            self.graph.add_node(node_id, attrs)
+        for node1, neighbors in state['edges'].items():
+            for node2, weight in neighbors.items():
+                self.graph.add_edge(node1, node2, weight)
+        self.graph_changed()
+
+        self.drivers = {}
+        for driver_id, data in state['drivers'].items():
+            driver = Driver(driver_id, data['name'], data['current_location'])
+            driver.status = data.get('status', driver.status)
+            driver.assigned_deliveries = list(data.get('assigned_deliveries', []))
+            driver.rating = data.get('rating', driver.rating)
+            driver.efficiency_score = data.get('efficiency_score', driver.efficiency_score)
+            self.drivers[driver_id] = driver
+
+        self.deliveries = {}
+        for delivery_id, data in state['deliveries'].items():
+            delivery = Delivery(delivery_id, data['destination'], data.get('dish'))
+            delivery.status = data.get('status', delivery.status)
+            delivery.progress = data.get('progress', delivery.progress)
+            if data.get('created_at'):
+                delivery.created_at = datetime.fromisoformat(data['created_at'])
+            self.deliveries[delivery_id] = delivery
+
+        self.refresh_all_displays()
+        self.log_update(f"Restored {len(self.drivers)} drivers and {len(self.deliveries)} deliveries")
+        return True
+
+    def autosave(self):
+        """Periodically hand a state copy to the background saver"""
+        self.snapshot_store.save_async(self.collect_state())
+        self.root.after(self.autosave_interval_ms, self.autosave)
+
+    def on_close(self):
+        self.snapshot_store.save_async(self.collect_state())
+        self.snapshot_store.close()
+        Delivery.remove_completion_listener(self.online_learner.on_delivery_completed)
+        self.online_learner.shutdown()
+        self.root.destroy()
+
     def open_image_map_creator(self):
         """Open the image map creator tool"""
         create_image_map(self)
@@ -4,14 +4,15 @@ from services.map_service import MapService
 from services.tracking_service import TrackingService
 
 def main():
-    map_service = MapService()
+    map_service = MapService("data/maps/sample_map.json")
     tracking_service = TrackingService()
 
     # Load map data and create graph
-    graph = map_service.load_map("data/maps/sample_map.json")
+    map_service.load_map()
+    graph = map_service.get_graph()
     
     # Start tracking delivery drivers
     tracking_service.start_tracking(graph)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
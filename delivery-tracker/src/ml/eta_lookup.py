@@ -0,0 +1,173 @@
+import time
+
+import numpy as np
+
+# Categorical axes, in the order of the table's leading dimensions
+CATEGORICAL_AXES = ('Cuisine', 'Weather', 'TrafficLevel', 'TimeOfDay')
+
+# Continuous axes: (min, max, default number of grid points). The ranges
+# cover the enhanced dataset; queries outside them are clamped, where a tree
+# model is flat anyway.
+CONTINUOUS_AXES = {
+    'BasePrepTime': (8.0, 40.0, 9),
+    'Distance': (0.0, 20.0, 21),
+    'DriverRating': (3.0, 5.0, 5),
+}
+
+class EtaLookupTable:
+    """
+    The ETA model evaluated once over a grid of its inputs and stored as a
+    dense tensor, so a prediction is a table lookup instead of a model call.
+
+    Categorical inputs index the table directly; prep time, distance and
+    driver rating are interpolated linearly between their grid points.
+    Unknown categories fall back to code 0, as TimePredictor.predict does.
+    """
+
+    def __init__(self, table, categories, grids):
+        self.table = table
+        self.categories = categories  # axis name: {value: index}
+        self.grids = grids  # axis name: grid point array
+        self._cuisine = categories['Cuisine']
+        self._weather = categories['Weather']
+        self._traffic = categories['TrafficLevel']
+        self._time_of_day = categories['TimeOfDay']
+        self._prep, self._distance, self._rating = (
+            grids['BasePrepTime'], grids['Distance'], grids['DriverRating'])
+
+    @classmethod
+    def build(cls, predictor, prep_points=None, distance_points=None, rating_points=None):
+        """
+        Evaluate a trained (enhanced-dataset) model over the grid; predictor
+        is a TimePredictor or a FittedModel (anything with model and encoders)
+        """
+        if 'Weather' not in predictor.encoders:
+            raise ValueError("A lookup table needs a model trained on the enhanced dataset")
+
+        points = {'BasePrepTime': prep_points, 'Distance': distance_points, 'DriverRating': rating_points}
+        grids = {}
+        for name, (low, high, default) in CONTINUOUS_AXES.items():
+            grids[name] = np.linspace(low, high, max(2, points[name] or default))
+        categories = {name: {value: i for i, value in enumerate(predictor.encoders[name].classes_)}
+                      for name in CATEGORICAL_AXES}
+
+        # One row per grid cell in the model's feature order
+        shape = tuple(len(categories[name]) for name in CATEGORICAL_AXES) + tuple(
+            len(grids[name]) for name in CONTINUOUS_AXES)
+        cuisine, weather, traffic, time_of_day, prep, distance, rating = np.meshgrid(
+            *(np.arange(len(categories[name])) for name in CATEGORICAL_AXES),
+            grids['BasePrepTime'], grids['Distance'], grids['DriverRating'], indexing='ij')
+        X = np.column_stack([cuisine.ravel(), prep.ravel(), distance.ravel(), weather.ravel(),
+                             traffic.ravel(), time_of_day.ravel(), rating.ravel()]).astype(np.float64)
+        table = predictor.model.predict(X).reshape(shape)
+        return cls(table, categories, grids)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    @staticmethod
+    def _position(grid, value):
+        """(lower index, weight of the upper point) for linear interpolation"""
+        if value <= grid[0]:
+            return 0, 0.0
+        if value >= grid[-1]:
+            return len(grid) - 2, 1.0
+        step = grid[1] - grid[0]
+        index = min(int((value - grid[0]) / step), len(grid) - 2)
+        return index, (value - grid[index]) / step
+
+    def lookup(self, cuisine, base_prep_time, distance,
+               traffic_level='Medium', weather='Clear', time_of_day='Dinner', driver_rating=5.0):
+        """Predicted delivery time for one order; same arguments as TimePredictor.predict"""
+        cell = self.table[self._cuisine.get(cuisine, 0), self._weather.get(weather, 0),
+                          self._traffic.get(traffic_level, 0), self._time_of_day.get(time_of_day, 0)]
+        i, wi = self._position(self._prep, base_prep_time)
+        j, wj = self._position(self._distance, distance)
+        k, wk = self._position(self._rating, driver_rating)
+        corners = cell[i:i + 2, j:j + 2, k:k + 2]
+        # Collapse one axis at a time: rating, then distance, then prep
+        corners = corners[..., 0] * (1 - wk) + corners[..., 1] * wk
+        corners = corners[:, 0] * (1 - wj) + corners[:, 1] * wj
+        value = float(corners[0] * (1 - wi) + corners[1] * wi)
+        return max(value, base_prep_time)
+
+    def lookup_batch(self, cuisine, base_prep_time, distance,
+                     traffic_level='Medium', weather='Clear', time_of_day='Dinner', driver_rating=5.0):
+        """Vectorised lookup; arguments are arrays or scalars, as for predict_batch"""
+        args = [cuisine, base_prep_time, distance, traffic_level, weather, time_of_day, driver_rating]
+        count = max((len(v) for v in args if np.ndim(v) == 1), default=1)
+
+        def column(value):
+            return np.broadcast_to(np.asarray(value), (count,))
+
+        def codes(mapping, values):
+            return np.fromiter((mapping.get(v, 0) for v in column(values)), dtype=np.intp, count=count)
+
+        def positions(grid, values):
+            values = np.clip(column(values).astype(np.float64), grid[0], grid[-1])
+            step = grid[1] - grid[0]
+            index = np.minimum(((values - grid[0]) / step).astype(np.intp), len(grid) - 2)
+            return index, (values - grid[index]) / step
+
+        c = (codes(self._cuisine, cuisine), codes(self._weather, weather),
+             codes(self._traffic, traffic_level), codes(self._time_of_day, time_of_day))
+        i, wi = positions(self._prep, base_prep_time)
+        j, wj = positions(self._distance, distance)
+        k, wk = positions(self._rating, driver_rating)
+
+        result = np.zeros(count)
+        for di, fi in ((0, 1 - wi), (1, wi)):
+            for dj, fj in ((0, 1 - wj), (1, wj)):
+                for dk, fk in ((0, 1 - wk), (1, wk)):
+                    result += self.table[c + (i + di, j + dj, k + dk)] * (fi * fj * fk)
+        return np.maximum(result, column(base_prep_time))
+
+def random_orders(predictor, count, seed=0):
+    """Random in-range orders (keyword arrays for lookup_batch/predict_batch)"""
+    rng = np.random.default_rng(seed)
+    classes = {name: predictor.encoders[name].classes_ for name in CATEGORICAL_AXES}
+
+    def uniform(name):
+        low, high, _ = CONTINUOUS_AXES[name]
+        return rng.uniform(low, high, count)
+
+    return {
+        'cuisine': rng.choice(classes['Cuisine'], count),
+        'base_prep_time': np.round(uniform('BasePrepTime')),
+        'distance': np.round(uniform('Distance'), 2),
+        'traffic_level': rng.choice(classes['TrafficLevel'], count),
+        'weather': rng.choice(classes['Weather'], count),
+        'time_of_day': rng.choice(classes['TimeOfDay'], count),
+        'driver_rating': np.round(uniform('DriverRating'), 1),
+    }
+
+def accuracy_report(predictor, resolutions, samples=2000, seed=0):
+    """
+    Build a table per (prep, distance, rating) resolution and compare it
+    with the model on random orders: error in minutes, size and build time
+    """
+    orders = random_orders(predictor, samples, seed)
+    X = np.column_stack([
+        predictor._encode_many('Cuisine', orders['cuisine']), orders['base_prep_time'],
+        orders['distance'], predictor._encode_many('Weather', orders['weather']),
+        predictor._encode_many('TrafficLevel', orders['traffic_level']),
+        predictor._encode_many('TimeOfDay', orders['time_of_day']), orders['driver_rating']])
+    expected = np.maximum(predictor.model.predict(X), orders['base_prep_time'])
+
+    rows = []
+    for prep_points, distance_points, rating_points in resolutions:
+        started = time.perf_counter()
+        table = EtaLookupTable.build(predictor, prep_points, distance_points, rating_points)
+        build_seconds = time.perf_counter() - started
+        errors = np.abs(table.lookup_batch(**orders) - expected)
+        rows.append({
+            'resolution': [prep_points, distance_points, rating_points],
+            'cells': int(table.table.size),
+            'megabytes': round(table.nbytes / 1e6, 2),
+            'build_seconds': round(build_seconds, 2),
+            'mae_minutes': round(float(errors.mean()), 3),
+            'p95_error_minutes': round(float(np.percentile(errors, 95)), 3),
+            'max_error_minutes': round(float(errors.max()), 3),
+        })
+    return rows
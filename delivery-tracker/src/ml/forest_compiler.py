@@ -0,0 +1,110 @@
+import numpy as np
+
+class CompiledForest:
+    """
+    A fitted tree ensemble (RandomForestRegressor) flattened into one set of
+    contiguous node arrays, evaluated with NumPy instead of sklearn.
+
+    Every tree's nodes are stored back to back: feature, threshold, left,
+    right and value, with child indices made global. Leaves point at
+    themselves with an infinite threshold, so a batch can walk all trees in
+    lock step for max_depth steps without checking which rows are done.
+    Inputs are compared as float32, exactly as sklearn's trees do.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        # Per-step children table: children[node, go_right]
+        self.children = np.stack([left, right], axis=1)
+        self.is_leaf = left == np.arange(len(left))
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def predict(self, X):
+        """Mean leaf value over all trees for each row of X"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        count, n_features = X.shape
+        if n_features != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {n_features}")
+        if count == 1:
+            return np.array([self.predict_one(X[0])])
+
+        # One entry per (row, tree); entries that reach a leaf drop out of
+        # the active set so later levels only touch the deeper paths
+        flat = X.ravel()
+        nodes = np.tile(self.roots, count)
+        row_offsets = np.repeat(np.arange(count, dtype=np.intp) * n_features, self.n_trees)
+        active = np.arange(len(nodes))
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            go_right = flat[row_offsets[active] + self.feature[current]] > self.threshold[current]
+            current = np.where(go_right, self.right[current], self.left[current])
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+            if not len(active):
+                break
+        return self.value[nodes].reshape(count, self.n_trees).mean(axis=1)
+
+    def predict_one(self, x):
+        """Single-row fast path: all trees advance together, one step per level"""
+        x = np.asarray(x, dtype=np.float32)
+        feature, threshold, children = self.feature, self.threshold, self.children
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            nodes = children[nodes, (x[feature[nodes]] > threshold[nodes]).view(np.int8)]
+        return float(self.value[nodes].mean())
+
+def compile_forest(model):
+    """Flatten a fitted RandomForestRegressor (or any sklearn tree regressor ensemble)"""
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators:
+        raise ValueError("Model is not a fitted tree ensemble")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        if tree.value.shape[1] != 1 or tree.value.shape[2] != 1:
+            raise ValueError("Only single-output regression trees can be compiled")
+        count = tree.node_count
+        index = np.arange(offset, offset + count)
+        leaf = tree.children_left < 0
+
+        feature = tree.feature.astype(np.intp)
+        threshold = tree.threshold.astype(np.float64)
+        left = tree.children_left.astype(np.intp) + offset
+        right = tree.children_right.astype(np.intp) + offset
+        feature[leaf] = 0
+        threshold[leaf] = np.inf
+        left[leaf] = index[leaf]
+        right[leaf] = index[leaf]
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(tree.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += count
+
+    return CompiledForest(
+        np.concatenate(features), np.concatenate(thresholds),
+        np.concatenate(lefts), np.concatenate(rights), np.concatenate(values),
+        np.array(roots, dtype=np.intp), max_depth, model.n_features_in_)
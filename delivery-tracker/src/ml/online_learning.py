@@ -0,0 +1,238 @@
+import csv
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+from sklearn.base import clone
+
+from ml.time_predictor import ENHANCED_FEATURES, prepare_enhanced
+from utils.metrics import counter, histogram
+
+# Enhanced dataset columns plus when the delivery finished
+LOG_COLUMNS = ['Cuisine', 'BasePrepTime', 'Distance', 'Weather', 'TrafficLevel',
+               'TimeOfDay', 'DriverRating', 'DeliveryTime', 'CompletedAt']
+
+# Delivery.eta_features keys (TimePredictor.predict arguments) per log column
+FEATURE_KEYS = {
+    'Cuisine': 'cuisine',
+    'BasePrepTime': 'base_prep_time',
+    'Distance': 'distance',
+    'Weather': 'weather',
+    'TrafficLevel': 'traffic_level',
+    'TimeOfDay': 'time_of_day',
+    'DriverRating': 'driver_rating',
+}
+# Plausible door-to-door times; anything outside is a UI artefact (a
+# delivery completed by hand seconds after creation, or restored days later)
+MIN_DELIVERY_MINUTES = 5
+MAX_DELIVERY_MINUTES = 240
+
+# Hour ranges of the dataset's TimeOfDay categories
+TIME_OF_DAY_HOURS = [(5, 'Morning'), (11, 'Lunch'), (14, 'Afternoon'), (17, 'Dinner'), (22, 'Late')]
+
+logged_deliveries = counter('online_deliveries_logged_total', "Completed deliveries logged for online learning")
+refits = counter('online_refits_total', "ETA models refitted on logged deliveries")
+refit_failures = counter('online_refit_failures_total', "Online refits that raised")
+rejected_deliveries = counter('online_deliveries_rejected_total',
+                              "Completed deliveries not logged: missing ETA inputs or implausible duration")
+refit_seconds = histogram('online_refit_seconds', "Wall time of a background ETA refit, including the swap")
+
+def time_of_day(moment):
+    """TimeOfDay category for a datetime"""
+    label = TIME_OF_DAY_HOURS[-1][1]  # Before the first boundary is still late night
+    for start, name in TIME_OF_DAY_HOURS:
+        if moment.hour >= start:
+            label = name
+    return label
+
+def assignment_features(delivery, calculator, conditions):
+    """
+    ETA inputs known when a delivery is assigned, apart from distance and
+    driver rating: the cuisine and prep time of the dish on the delivery
+    plus the current conditions. None unless the dish, weather and traffic
+    are all known.
+    """
+    dish_info = calculator.get_dish_info(delivery.dish) if delivery.dish else None
+    if not dish_info or 'weather' not in conditions or 'traffic_level' not in conditions:
+        return None
+    return dict(conditions, cuisine=dish_info['cuisine'], base_prep_time=float(dish_info['base_prep_time']))
+
+def record_from_delivery(delivery):
+    """
+    Log row for a completed delivery, or None unless every ETA input was
+    recorded at assignment and the actual time is plausible
+    """
+    features = delivery.eta_features
+    minutes = delivery.actual_minutes()
+    if features is None or minutes is None:
+        return None
+    row = {}
+    for column, key in FEATURE_KEYS.items():
+        value = features.get(key)
+        if value is None:
+            return None
+        row[column] = value
+    if not MIN_DELIVERY_MINUTES <= minutes <= MAX_DELIVERY_MINUTES or minutes < row['BasePrepTime']:
+        return None
+    row['DeliveryTime'] = round(minutes, 2)
+    row['CompletedAt'] = delivery.completed_at.isoformat()
+    return row
+
+class CompletedDeliveryLog:
+    """
+    Append-only CSV of completed deliveries in the enhanced dataset's
+    columns, with the most recent `window` rows kept in memory for refits.
+    """
+
+    def __init__(self, path, window=5000):
+        self.path = path
+        self.rows = deque(maxlen=window)
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, newline='') as file:
+                self.rows.extend(csv.DictReader(file))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, row):
+        with self._lock:
+            new_file = not os.path.exists(self.path)
+            if new_file:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=LOG_COLUMNS, extrasaction='ignore')
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+            self.rows.append(row)
+
+    def window_frame(self):
+        """The in-memory window as a DataFrame in the dataset's dtypes"""
+        with self._lock:
+            rows = list(self.rows)
+        frame = pd.DataFrame(rows, columns=LOG_COLUMNS[:-1])
+        numeric = ['BasePrepTime', 'Distance', 'DriverRating', 'DeliveryTime']
+        frame[numeric] = frame[numeric].astype(float)
+        return frame
+
+def fit_window(template, base_path, window):
+    """
+    Fit a fresh copy of `template` on the base dataset plus the logged
+    window. Module level so it can run in a worker process.
+    """
+    frames = [window]
+    if base_path is not None and os.path.exists(base_path):
+        base = pd.read_csv(base_path)
+        if 'Weather' in base.columns:
+            frames.insert(0, base)
+    X, y, encoders = prepare_enhanced(pd.concat(frames, ignore_index=True))
+    model = clone(template)
+    model.fit(X, y)
+    return model, encoders
+
+class OnlineLearner:
+    """
+    Feeds completed deliveries back into a TimePredictor. Each delivery is
+    logged; once `min_new` have arrived since the last refit, the model is
+    refitted on the base dataset plus the log's sliding window in a worker
+    process and swapped in with TimePredictor.swap_model. Predictions keep
+    using the current model throughout; at most one refit runs at a time.
+
+    Refitted models are not saved: start() (called once the predictor's own
+    training has finished) refits straight away when the log already holds
+    deliveries from earlier runs, and no refit starts before it.
+    """
+
+    def __init__(self, predictor, log, min_new=50, use_process=True):
+        self.predictor = predictor
+        self.log = log
+        self.min_new = min_new
+        self.use_process = use_process
+        self.new_rows = 0
+        self.started = False
+        self.last_error = None
+        self._executor = None
+        self._future = None
+        self._started = None
+        self._lock = threading.Lock()
+        self._idle = threading.Event()  # Set while no refit is waiting to be swapped in
+        self._idle.set()
+
+    def on_delivery_completed(self, delivery):
+        """Delivery completion listener; returns whether the delivery was logged"""
+        row = record_from_delivery(delivery)
+        if row is None:
+            if delivery.eta_features is not None:
+                rejected_deliveries.inc()
+            return False
+        self.log.append(row)
+        logged_deliveries.inc()
+        with self._lock:
+            self.new_rows += 1
+            due = self.started and self.new_rows >= self.min_new
+        if due:
+            self.refit()
+        return True
+
+    def start(self):
+        """Allow refits; refits now if earlier runs left deliveries in the log"""
+        self.started = True
+        if len(self.log):
+            return self.refit()
+        return None
+
+    @property
+    def refitting(self):
+        return not self._idle.is_set()
+
+    def refit(self):
+        """Start a background refit unless one is running; returns the future or None"""
+        with self._lock:
+            if self.refitting:
+                return None
+            window = self.log.window_frame()
+            if window.empty:
+                return None
+            self.new_rows = 0
+            if self._executor is None:
+                if self.use_process:
+                    # Spawn, not fork: the GUI process runs Tk and several threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=1)
+            self._started = time.perf_counter()
+            self._idle.clear()
+            self._future = self._executor.submit(
+                fit_window, clone(self.predictor.model), self.predictor.data_path, window)
+            self._future.add_done_callback(self._finish)
+            return self._future
+
+    def _finish(self, future):
+        try:
+            model, encoders = future.result()
+            self.predictor.swap_model(model, encoders, ENHANCED_FEATURES)
+            refits.inc()
+        except Exception as e:
+            refit_failures.inc()
+            self.last_error = e
+            print(f"Online refit failed, keeping the current model: {e}")
+        refit_seconds.observe(time.perf_counter() - self._started)
+        self._idle.set()
+        # Deliveries that arrived during the refit may already be due
+        if self.new_rows >= self.min_new:
+            self.refit()
+
+    def wait(self, timeout=None):
+        """Block until the running refit (if any) has been swapped in; False on timeout"""
+        return self._idle.wait(timeout)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
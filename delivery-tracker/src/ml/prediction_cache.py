@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+
+from utils.metrics import counter
+
+cache_hits = counter('eta_cache_hits_total', "ETA predictions served from the memoization cache")
+cache_misses = counter('eta_cache_misses_total', "ETA predictions that missed the memoization cache")
+
+class PredictionCache:
+    """
+    Bounded LRU memo of TimePredictor.predict results. Continuous inputs are
+    quantized before they form the key (distance to distance_step km,
+    driver rating to rating_step), so near-identical orders share an entry.
+
+    Entries belong to one model version: looking up or storing with a newer
+    version drops everything cached for the old one, and results computed
+    by a model that has since been replaced are never stored.
+    """
+
+    def __init__(self, maxsize=4096, distance_step=0.1, rating_step=0.1):
+        self.maxsize = maxsize
+        self.distance_step = distance_step
+        self.rating_step = rating_step
+        self.version = None
+        self.entries = OrderedDict()  # key: predicted minutes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def quantize(self, distance, driver_rating):
+        """(distance, rating) snapped to the cache grid"""
+        return (round(round(distance / self.distance_step) * self.distance_step, 6),
+                round(round(driver_rating / self.rating_step) * self.rating_step, 6))
+
+    def get(self, key, version):
+        with self._lock:
+            value = self.entries.get(key) if self._current(version) else None
+            if value is None:
+                self.misses += 1
+                cache_misses.inc()
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            cache_hits.inc()
+            return value
+
+    def put(self, key, value, version):
+        with self._lock:
+            if not self._current(version):
+                return  # Computed by a model that has been swapped out
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version=None):
+        """Drop every entry, e.g. when the model is retrained or swapped to `version`"""
+        with self._lock:
+            self._reset(self.version if version is None else version)
+
+    def _current(self, version):
+        """Whether `version` is the cached model's, moving to it if it is newer"""
+        if self.version is None or version > self.version:
+            self._reset(version)
+        return version == self.version
+
+    def _reset(self, version):
+        if self.entries:
+            self.invalidations += 1
+        self.entries = OrderedDict()
+        self.version = version
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate, 4),
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'model_version': self.version,
+        }
@@ -1,15 +1,172 @@
 import pandas as pd
 import numpy as np
+import joblib
+import sklearn
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
+import hashlib
+import json
 import os
+import threading
+
+from ml.eta_lookup import EtaLookupTable
+from ml.forest_compiler import compile_forest
+from ml.prediction_cache import PredictionCache
+from utils.metrics import counter, timer
+
+fallback_predictions = counter('eta_fallback_total', "Predictions answered by the heuristic instead of the model")
+unknown_categories = counter('eta_unknown_category_total', "Categorical inputs the model was not trained on")
+
+# Fallback factors for the heuristic, and the legacy model's TrafficFactor input
+TRAFFIC_FACTORS = {'Low': 1.0, 'Medium': 1.3, 'High': 1.8, 'Jam': 2.5}
+WEATHER_FACTORS = {'Clear': 1.0, 'Rain': 1.2, 'Fog': 1.3, 'Snow': 1.5}
+
+ENHANCED_FEATURES = ['Cuisine_Encoded', 'BasePrepTime', 'Distance',
+                     'Weather_Encoded', 'TrafficLevel_Encoded',
+                     'TimeOfDay_Encoded', 'DriverRating']
+LEGACY_FEATURES = ['Cuisine_Encoded', 'BasePrepTime', 'Distance', 'TrafficFactor']
+
+# Code given to categories the encoders have not seen (the first class)
+UNKNOWN_CODE = 0
+
+# Bump when the saved model layout changes so old cache entries are ignored
+MODEL_FORMAT = 1
+DEFAULT_CACHE = object()  # Sentinel: cache next to the dataset
+
+# Batches up to this size use the compiled forest; sklearn's C traversal
+# wins on larger ones
+COMPILED_BATCH_LIMIT = 256
+
+# predict_batch column names for DataFrame input
+BATCH_COLUMNS = {
+    'cuisine': 'Cuisine', 'base_prep_time': 'BasePrepTime', 'distance': 'Distance',
+    'traffic_level': 'TrafficLevel', 'weather': 'Weather', 'time_of_day': 'TimeOfDay',
+    'driver_rating': 'DriverRating'
+}
+ENHANCED_CATEGORICALS = ['Cuisine', 'Weather', 'TrafficLevel', 'TimeOfDay']
+
+# Synthetic orders generated per dish when training on the legacy dataset
+LEGACY_EXPANSION = 50
+# Bootstrap rows per tree on larger training sets; fully grown trees on a
+# million near-duplicate synthetic rows would not fit in memory
+MAX_TREE_SAMPLES = 20000
+
+def expand_legacy(df, factor=LEGACY_EXPANSION, seed=None):
+    """
+    Synthetic training orders for the legacy dish dataset: every row is
+    repeated `factor` times (an int, or one count per row) with a uniform
+    random distance (1-15 km) and traffic factor (1.0-2.0).
+    """
+    rng = np.random.default_rng(seed)
+    index = np.repeat(np.arange(len(df)), factor)
+    distance = rng.uniform(1, 15, len(index))
+    traffic_factor = rng.uniform(1.0, 2.0, len(index))
+    expanded = df.iloc[index].reset_index(drop=True)
+    expanded['Distance'] = distance
+    expanded['TrafficFactor'] = traffic_factor
+    expanded['TotalTime'] = expanded['BasePrepTime'].to_numpy(dtype=np.float64) + distance * 2 * traffic_factor
+    return expanded
+
+def prepare_enhanced(df):
+    """(X, y, encoders) for rows in the enhanced dataset's columns"""
+    df = df.copy()
+    encoders = {}
+    for col in ENHANCED_CATEGORICALS:
+        le = LabelEncoder()
+        df[f'{col}_Encoded'] = le.fit_transform(df[col])
+        encoders[col] = le
+    X = df[ENHANCED_FEATURES].to_numpy(dtype=np.float64)
+    return X, df['DeliveryTime'].to_numpy(dtype=np.float64), encoders
+
+class FittedModel:
+    """
+    Everything needed to serve one fitted model: the sklearn estimator, its
+    label encoders, the compiled forest and optional lookup table. The
+    predictor holds a single reference to one of these, so swapping models
+    is one assignment and a prediction never mixes two models.
+    """
+
+    def __init__(self, model, encoders, feature_columns, version=0):
+        self.model = model
+        self.encoders = encoders
+        self.feature_columns = list(feature_columns)
+        self.enhanced = 'Weather' in encoders
+        self.version = version
+        self._local = threading.local()  # Per-thread preallocated feature row, see feature_row()
+        self.lookup_table = None
+        # Encoders compiled for inference: value -> code dicts for single
+        # values, categorical dtypes for arrays (class order = code order)
+        self.codes = {col: {value: code for code, value in enumerate(encoder.classes_)}
+                      for col, encoder in encoders.items()}
+        self.dtypes = {col: pd.CategoricalDtype(encoder.classes_) for col, encoder in encoders.items()}
+        try:
+            self.forest = compile_forest(model)
+        except (ValueError, AttributeError) as e:
+            print(f"Could not compile model, using sklearn for predictions: {e}")
+            self.forest = None
+
+    def feature_row(self):
+        """
+        Preallocated (1, n_features) row for single-order predictions. Each
+        thread gets its own, since the GUI, online refits and worker threads
+        predict concurrently.
+        """
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.zeros((1, len(self.feature_columns)))
+        return row
+
+    def encode(self, col, value):
+        """Label code for one value; unknown values get UNKNOWN_CODE"""
+        try:
+            return self.codes[col][value]
+        except (KeyError, TypeError):
+            unknown_categories.inc()
+            return UNKNOWN_CODE
+
+    def encode_many(self, col, values):
+        """
+        Label codes for an array of values: the codes pandas.Categorical
+        assigns for the class dtype, looked up in its hashed category index
+        (building the Categorical itself warns on unseen values)
+        """
+        dtype = self.dtypes[col]
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            codes = pd.Categorical(values).set_categories(dtype.categories).codes
+        else:
+            codes = dtype.categories.get_indexer(np.asarray(values, dtype=object))
+        unknown = codes < 0
+        if unknown.any():
+            unknown_categories.inc(int(unknown.sum()))
+            codes = np.where(unknown, UNKNOWN_CODE, codes)
+        return codes
 
 class TimePredictor:
-    def __init__(self, data_path=None):
+    def __init__(self, data_path=None, cache_dir=DEFAULT_CACHE, lazy=False,
+                 expansion_factor=LEGACY_EXPANSION, expansion_seed=None):
         self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+        # Legacy dataset only: synthetic orders per dish and their RNG seed
+        self.expansion_factor = expansion_factor
+        self.expansion_seed = expansion_seed
         self.encoders = {}
         self.is_trained = False
+        self.feature_columns = None
+        self.forest = None  # Flattened copy of the fitted model for fast inference
+        # The live FittedModel; model/encoders/forest above mirror it for callers
+        self._fitted = None
+        self.model_version = 0  # Bumped on every install or swap
+        # Optional precomputed ETA grid (see use_lookup_table)
+        self.lookup_table = None
+        self.lookup_resolution = None
+        # Optional LRU memo of predict() results (see use_prediction_cache)
+        self.prediction_cache = None
+        # lazy=True trains (or loads the cached model) on the first predict
+        self.lazy = lazy
+        self.loaded_from_cache = False
+        self.training_thread = None
+        self._train_lock = threading.Lock()
         
         if data_path is None:
             # Default path to enhanced dataset
@@ -21,67 +178,198 @@ class TimePredictor:
         else:
             self.data_path = data_path
 
-    def train(self):
-        """Train the model on the dataset"""
+        # Fitted models are cached next to the dataset unless told otherwise;
+        # cache_dir=None disables the cache
+        if cache_dir is DEFAULT_CACHE:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(self.data_path)), '.model_cache')
+        self.cache_dir = cache_dir
+
+    def cache_key(self):
+        """
+        Hash of the dataset contents, the model hyperparameters and the
+        library versions, so any change to them misses the cache
+        """
+        digest = hashlib.sha256()
+        with open(self.data_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        params = json.dumps([self.model.get_params(), self.expansion_factor, self.expansion_seed],
+                            sort_keys=True, default=str)
+        digest.update(f"{params}|{sklearn.__version__}|{np.__version__}|{MODEL_FORMAT}".encode())
+        return digest.hexdigest()
+
+    def cache_path(self):
+        if self.cache_dir is None or not os.path.exists(self.data_path):
+            return None
+        return os.path.join(self.cache_dir, f"time_predictor_{self.cache_key()[:32]}.joblib")
+
+    def swap_model(self, model, encoders, feature_columns):
+        """
+        Make a fitted model live. The compiled forest (and lookup table, if
+        enabled) are built first on the caller's thread; predictions keep
+        using the previous model until the single reference swap.
+        """
+        fitted = FittedModel(model, encoders, feature_columns, self.model_version + 1)
+        if self.lookup_resolution is not None:
+            fitted.lookup_table = self._build_lookup_table(fitted)
+        self._fitted = fitted
+        self.model_version = fitted.version
+        self.model = model
+        self.encoders = encoders
+        self.feature_columns = fitted.feature_columns
+        self.forest = fitted.forest
+        self.lookup_table = fitted.lookup_table
+        self.is_trained = True
+        if self.prediction_cache is not None:
+            self.prediction_cache.invalidate(fitted.version)
+        return fitted.version
+
+    def use_lookup_table(self, enabled=True, prep_points=None, distance_points=None, rating_points=None):
+        """
+        Answer predictions from a precomputed grid of the model (see
+        ml.eta_lookup) instead of evaluating it. The grid is rebuilt whenever
+        a new model is installed. Only models trained on the enhanced
+        dataset are supported; returns whether the table is in use.
+        """
+        if not enabled:
+            self.lookup_resolution = None
+            self.lookup_table = None
+            if self._fitted is not None:
+                self._fitted.lookup_table = None
+            return False
+        self.lookup_resolution = (prep_points, distance_points, rating_points)
+        self._ensure_model()
+        fitted = self._fitted
+        if fitted is not None:
+            fitted.lookup_table = self.lookup_table = self._build_lookup_table(fitted)
+        return self.lookup_table is not None
+
+    def use_prediction_cache(self, enabled=True, maxsize=4096, distance_step=0.1, rating_step=0.1):
+        """
+        Memoize predict() in a bounded LRU keyed on the order's features,
+        with distance (km) and driver rating quantized to the given steps;
+        cached orders are predicted at the quantized values. The cache is
+        emptied whenever a new model is installed. Returns the cache.
+        """
+        if not enabled:
+            self.prediction_cache = None
+            return None
+        self.prediction_cache = PredictionCache(maxsize, distance_step, rating_step)
+        return self.prediction_cache
+
+    def _build_lookup_table(self, fitted):
+        try:
+            return EtaLookupTable.build(fitted, *self.lookup_resolution)
+        except ValueError as e:
+            print(f"ETA lookup table unavailable: {e}")
+            return None
+
+    def load_cached(self):
+        """Install the cached model for the current dataset, if there is one"""
+        path = self.cache_path()
+        if path is None or not os.path.exists(path):
+            return False
+        try:
+            saved = joblib.load(path)
+        except Exception as e:
+            print(f"Could not load cached model {path}: {e}")
+            return False
+        self.swap_model(saved['model'], saved['encoders'], saved['feature_columns'])
+        self.loaded_from_cache = True
+        return True
+
+    def save_cached(self):
+        """Write the fitted model and encoders to the cache, atomically"""
+        path = self.cache_path()
+        fitted = self._fitted
+        if path is None or fitted is None:
+            return None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump({'model': fitted.model, 'encoders': fitted.encoders,
+                         'feature_columns': fitted.feature_columns}, tmp_path)
+            os.replace(tmp_path, path)
+            return path
+        except OSError as e:
+            print(f"Could not cache trained model: {e}")
+            return None
+
+    def train(self, use_cache=True):
+        """Train the model on the dataset, or load it from the cache when the dataset is unchanged"""
+        with self._train_lock:
+            if use_cache and self.load_cached():
+                print(f"Time Prediction Model loaded from cache ({os.path.basename(self.cache_path())}).")
+                return True
+            if not self._fit():
+                return False
+            if use_cache:
+                self.save_cached()
+            return True
+
+    def train_async(self, use_cache=True, callback=None):
+        """
+        Train (or load) on a daemon thread and return it at once. predict()
+        answers with the heuristic until the model is ready; callback(success)
+        runs on the training thread when it finishes.
+        """
+        def run():
+            success = self.train(use_cache)
+            if callback is not None:
+                callback(success)
+
+        self.training_thread = threading.Thread(target=run, name="time-predictor-train", daemon=True)
+        self.training_thread.start()
+        return self.training_thread
+
+    def _ensure_model(self):
+        """Lazy mode: load or train on first use, unless a background training run is in progress"""
+        if self.is_trained or not self.lazy:
+            return
+        if self.training_thread is not None and self.training_thread.is_alive():
+            return
+        self.lazy = False  # Only try once
+        self.train()
+
+    def _fit(self):
         try:
             if not os.path.exists(self.data_path):
                 print(f"Data file not found at {self.data_path}")
                 return False
 
             df = pd.read_csv(self.data_path)
+            encoders = {}
             
             # Check if we are using the enhanced dataset or legacy
             is_enhanced = 'Weather' in df.columns
             
             if not is_enhanced:
                 print("Using legacy dataset. Generating synthetic features...")
-                # Legacy training logic (synthetic expansion)
-                expanded_data = []
-                for _, row in df.iterrows():
-                    for _ in range(50):
-                        distance = np.random.uniform(1, 15)
-                        traffic_factor = np.random.uniform(1.0, 2.0)
-                        travel_time = distance * 2 * traffic_factor
-                        total_time = row['BasePrepTime'] + travel_time
-                        
-                        expanded_data.append({
-                            'Cuisine': row['Cuisine'],
-                            'BasePrepTime': row['BasePrepTime'],
-                            'Distance': distance,
-                            'TrafficFactor': traffic_factor,
-                            'TotalTime': total_time
-                        })
-                df = pd.DataFrame(expanded_data)
-                
-                # Encode only Cuisine
+                # Encode only Cuisine, on the dishes before they are repeated
                 le = LabelEncoder()
                 df['Cuisine_Encoded'] = le.fit_transform(df['Cuisine'])
-                self.encoders['Cuisine'] = le
+                encoders['Cuisine'] = le
+                df = expand_legacy(df, self.expansion_factor, self.expansion_seed)
                 
-                X = df[['Cuisine_Encoded', 'BasePrepTime', 'Distance', 'TrafficFactor']]
-                y = df['TotalTime']
+                feature_cols = LEGACY_FEATURES
+                X = df[feature_cols].to_numpy(dtype=np.float64)
+                y = df['TotalTime'].to_numpy(dtype=np.float64)
                 
             else:
                 print("Using enhanced dataset with rich features...")
-                # Enhanced training logic
-                categorical_cols = ['Cuisine', 'Weather', 'TrafficLevel', 'TimeOfDay']
-                
-                for col in categorical_cols:
-                    le = LabelEncoder()
-                    df[f'{col}_Encoded'] = le.fit_transform(df[col])
-                    self.encoders[col] = le
-                
-                # Map TrafficLevel to numeric factor for fallback logic if needed, but model learns it
                 # Features: Cuisine, PrepTime, Distance, Weather, Traffic, TimeOfDay, DriverRating
-                feature_cols = ['Cuisine_Encoded', 'BasePrepTime', 'Distance', 
-                                'Weather_Encoded', 'TrafficLevel_Encoded', 
-                                'TimeOfDay_Encoded', 'DriverRating']
-                
-                X = df[feature_cols]
-                y = df['DeliveryTime']
+                X, y, encoders = prepare_enhanced(df)
+                feature_cols = ENHANCED_FEATURES
 
-            self.model.fit(X, y)
-            self.is_trained = True
+            # Fit on a plain array so predictions can pass arrays too, with
+            # no per-call feature-name checks. A fresh clone is fitted so the
+            # live model keeps serving until the new one is installed.
+            model = clone(self.model)
+            if len(X) > MAX_TREE_SAMPLES and model.bootstrap and model.max_samples is None:
+                model.set_params(max_samples=MAX_TREE_SAMPLES)
+            model.fit(X, y)
+            self.swap_model(model, encoders, feature_cols)
+            self.loaded_from_cache = False
             print(f"Time Prediction Model trained successfully on {len(df)} records.")
             return True
             
@@ -89,60 +377,131 @@ class TimePredictor:
             print(f"Error training model: {e}")
             return False
 
+    def _encode(self, col, value):
+        return self._fitted.encode(col, value)
+
+    def _encode_many(self, col, values):
+        return self._fitted.encode_many(col, values)
+
+    @timer('eta_predict_seconds', "Delivery time predictions")
     def predict(self, cuisine, base_prep_time, distance, 
                 traffic_level='Medium', weather='Clear', time_of_day='Dinner', driver_rating=5.0):
         """Predict delivery time with enhanced features"""
         
         # Fallback calculation
-        # Map text levels to factors
-        traffic_map = {'Low': 1.0, 'Medium': 1.3, 'High': 1.8, 'Jam': 2.5}
-        weather_map = {'Clear': 1.0, 'Rain': 1.2, 'Fog': 1.3, 'Snow': 1.5}
-        
-        traffic_factor = traffic_map.get(traffic_level, 1.3)
-        weather_factor = weather_map.get(weather, 1.0)
+        traffic_factor = TRAFFIC_FACTORS.get(traffic_level, 1.3)
+        weather_factor = WEATHER_FACTORS.get(weather, 1.0)
         
-        if not self.is_trained:
+        self._ensure_model()
+        fitted = self._fitted  # One read, so a concurrent swap cannot mix models
+        if fitted is None:
+            fallback_predictions.inc()
             return base_prep_time + (distance * 2 * traffic_factor * weather_factor)
+        
+        cache = self.prediction_cache
+        if cache is None:
+            prediction, _ = self._predict_fitted(fitted, cuisine, base_prep_time, distance,
+                                                 traffic_level, weather, time_of_day, driver_rating)
+            return prediction
+        distance, driver_rating = cache.quantize(distance, driver_rating)
+        key = (cuisine, base_prep_time, distance, traffic_level, weather, time_of_day, driver_rating)
+        prediction = cache.get(key, fitted.version)
+        if prediction is None:
+            prediction, from_model = self._predict_fitted(fitted, cuisine, base_prep_time, distance,
+                                                          traffic_level, weather, time_of_day, driver_rating)
+            if from_model:  # A heuristic fallback must not outlive the error behind it
+                cache.put(key, prediction, fitted.version)
+        return prediction
+
+    def _predict_fitted(self, fitted, cuisine, base_prep_time, distance,
+                        traffic_level, weather, time_of_day, driver_rating):
+        """(minutes, from_model); from_model is False when the heuristic stood in"""
+        if fitted.lookup_table is not None:
+            return fitted.lookup_table.lookup(cuisine, base_prep_time, distance, traffic_level,
+                                              weather, time_of_day, driver_rating), True
             
+        traffic_factor = TRAFFIC_FACTORS.get(traffic_level, 1.3)
         try:
-            # Check if we have the right encoders (enhanced model)
-            if 'Weather' in self.encoders:
-                # Encode inputs
-                def safe_encode(col, val):
-                    try:
-                        return self.encoders[col].transform([val])[0]
-                    except:
-                        return 0 # Default to first class if unknown
-                
-                X_pred = pd.DataFrame([[
-                    safe_encode('Cuisine', cuisine),
-                    base_prep_time,
-                    distance,
-                    safe_encode('Weather', weather),
-                    safe_encode('TrafficLevel', traffic_level),
-                    safe_encode('TimeOfDay', time_of_day),
-                    driver_rating
-                ]], columns=['Cuisine_Encoded', 'BasePrepTime', 'Distance', 
-                             'Weather_Encoded', 'TrafficLevel_Encoded', 
-                             'TimeOfDay_Encoded', 'DriverRating'])
-                
-                prediction = self.model.predict(X_pred)[0]
-                return max(prediction, base_prep_time)
-                
+            # Fill the preallocated row in feature order; no DataFrame per call
+            row = fitted.feature_row()
+            if fitted.enhanced:
+                row[0] = (fitted.encode('Cuisine', cuisine), base_prep_time, distance,
+                          fitted.encode('Weather', weather), fitted.encode('TrafficLevel', traffic_level),
+                          fitted.encode('TimeOfDay', time_of_day), driver_rating)
             else:
-                # Legacy model prediction
-                try:
-                    cuisine_encoded = self.encoders['Cuisine'].transform([cuisine])[0]
-                except:
-                    cuisine_encoded = 0
-                    
                 # Legacy model expects TrafficFactor (float), not Level (str)
-                X_pred = pd.DataFrame([[cuisine_encoded, base_prep_time, distance, traffic_factor]], 
-                                    columns=['Cuisine_Encoded', 'BasePrepTime', 'Distance', 'TrafficFactor'])
-                
-                prediction = self.model.predict(X_pred)[0]
-                return max(prediction, base_prep_time)
+                row[0] = (fitted.encode('Cuisine', cuisine), base_prep_time, distance, traffic_factor)
+            
+            if fitted.forest is not None:
+                prediction = fitted.forest.predict_one(row[0])
+            else:
+                prediction = float(fitted.model.predict(row)[0])
+            return max(prediction, base_prep_time), True
             
         except Exception as e:
             print(f"Prediction error: {e}")
-            return base_prep_time + (distance * 2 * traffic_factor * weather_factor)
+            fallback_predictions.inc()
+            return base_prep_time + (distance * 2 * traffic_factor * WEATHER_FACTORS.get(weather, 1.0)), False
+
+    @timer('eta_predict_batch_seconds', "Batched delivery time predictions")
+    def predict_batch(self, cuisine, base_prep_time=None, distance=None,
+                      traffic_level='Medium', weather='Clear', time_of_day='Dinner', driver_rating=5.0):
+        """
+        Predict delivery times for many orders with one model call.
+
+        Takes the same arguments as predict, each either an array-like (one
+        entry per order) or a scalar shared by every order, or a DataFrame
+        as the only argument with the dataset's column names (Cuisine,
+        BasePrepTime, Distance and optionally TrafficLevel, Weather,
+        TimeOfDay, DriverRating). Returns a float array.
+        """
+        if isinstance(cuisine, pd.DataFrame):
+            frame = cuisine
+            defaults = {'traffic_level': traffic_level, 'weather': weather,
+                        'time_of_day': time_of_day, 'driver_rating': driver_rating}
+            args = {name: frame[column].to_numpy() if column in frame else defaults[name]
+                    for name, column in BATCH_COLUMNS.items()}
+        else:
+            args = {'cuisine': cuisine, 'base_prep_time': base_prep_time, 'distance': distance,
+                    'traffic_level': traffic_level, 'weather': weather,
+                    'time_of_day': time_of_day, 'driver_rating': driver_rating}
+        count = max((len(v) for v in args.values() if np.ndim(v) == 1), default=1)
+        columns = {name: np.broadcast_to(np.asarray(value), (count,)) for name, value in args.items()}
+
+        prep = columns['base_prep_time'].astype(np.float64)
+        distance = columns['distance'].astype(np.float64)
+        traffic_factor = pd.Series(columns['traffic_level']).map(TRAFFIC_FACTORS).fillna(1.3).to_numpy()
+        weather_factor = pd.Series(columns['weather']).map(WEATHER_FACTORS).fillna(1.0).to_numpy()
+        fallback = prep + distance * 2 * traffic_factor * weather_factor
+
+        self._ensure_model()
+        fitted = self._fitted
+        if fitted is None:
+            fallback_predictions.inc(count)
+            return fallback
+
+        if fitted.lookup_table is not None:
+            return fitted.lookup_table.lookup_batch(*(columns[name] for name in (
+                'cuisine', 'base_prep_time', 'distance', 'traffic_level',
+                'weather', 'time_of_day', 'driver_rating')))
+
+        try:
+            X = np.empty((count, len(fitted.feature_columns)))
+            X[:, 0] = fitted.encode_many('Cuisine', columns['cuisine'])
+            X[:, 1] = prep
+            X[:, 2] = distance
+            if fitted.enhanced:
+                X[:, 3] = fitted.encode_many('Weather', columns['weather'])
+                X[:, 4] = fitted.encode_many('TrafficLevel', columns['traffic_level'])
+                X[:, 5] = fitted.encode_many('TimeOfDay', columns['time_of_day'])
+                X[:, 6] = columns['driver_rating']
+            else:
+                X[:, 3] = traffic_factor
+            if fitted.forest is not None and count <= COMPILED_BATCH_LIMIT:
+                return np.maximum(fitted.forest.predict(X), prep)
+            return np.maximum(fitted.model.predict(X), prep)
+
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            fallback_predictions.inc(count)
+            return fallback
@@ -0,0 +1,417 @@
+import heapq
+import json
+import os
+import shutil
+from collections.abc import Mapping
+
+import numpy as np
+
+FORMAT_NAME = 'delivery-tracker-graph'
+FORMAT_VERSION = 1
+
+# Sections stored as .npy files inside a compiled graph directory
+SECTIONS = ('node_ids', 'id_offsets', 'x', 'y', 'offsets', 'targets', 'weights')
+
+def graph_arrays(graph, source_hash=None):
+    """
+    Flatten a Graph into the compiled sections.
+    Returns (arrays, meta, extra), extra being {index: attributes} for
+    attributes other than x/y.
+    """
+    node_ids = list(graph.nodes)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    count = len(node_ids)
+
+    int_ids = all(isinstance(node_id, int) and not isinstance(node_id, bool) for node_id in node_ids)
+    if int_ids:
+        ids = np.array(node_ids, dtype=np.int64)
+        id_offsets = np.zeros(1, dtype=np.int64)
+    else:
+        encoded = [str(node_id).encode('utf-8') for node_id in node_ids]
+        id_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=id_offsets[1:])
+        ids = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    x = np.full(count, np.nan)
+    y = np.full(count, np.nan)
+    extra = {}
+    for i, node_id in enumerate(node_ids):
+        attrs = graph.nodes[node_id] or {}
+        if not isinstance(attrs, dict):
+            extra[i] = {'__raw__': attrs}  # Non-dict attributes are kept verbatim
+            continue
+        if 'x' in attrs:
+            x[i] = attrs['x']
+        if 'y' in attrs:
+            y[i] = attrs['y']
+        rest = {key: value for key, value in attrs.items() if key not in ('x', 'y')}
+        if rest:
+            extra[i] = rest
+
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum([len(graph.edges.get(node_id, {})) for node_id in node_ids], out=offsets[1:])
+    targets = np.empty(offsets[-1], dtype=np.int32)
+    weights = np.empty(offsets[-1], dtype=np.float64)
+    position = 0
+    for node_id in node_ids:
+        for neighbor, weight in graph.edges.get(node_id, {}).items():
+            targets[position] = index[neighbor]
+            weights[position] = weight
+            position += 1
+
+    meta = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'node_count': count,
+        'edge_count': int(offsets[-1]) // 2,
+        'id_type': 'int' if int_ids else 'str',
+        'source_hash': source_hash
+    }
+
+    arrays = {'node_ids': ids, 'id_offsets': id_offsets, 'x': x, 'y': y,
+              'offsets': offsets, 'targets': targets, 'weights': weights}
+    return arrays, meta, extra
+
+def compile_graph(graph, path, source_hash=None):
+    """
+    Write a Graph to a compiled directory:
+
+        meta.json        format/version, counts, id type
+        node_ids.npy     int64 ids, or a UTF-8 blob (uint8) for string ids
+        id_offsets.npy   int64 string boundaries into node_ids (string ids only)
+        x.npy, y.npy     float64 coordinates, NaN when missing
+        offsets.npy      int64 CSR row offsets (node_count + 1)
+        targets.npy      int32 neighbor indices
+        weights.npy      float64 edge weights
+        attributes.json  node attributes other than x/y (only if any exist)
+
+    The directory is built next to path and renamed into place, so readers
+    never see a half-written graph.
+    """
+    arrays, meta, extra = graph_arrays(graph, source_hash)
+
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, name + '.npy'), array)
+    if extra:
+        with open(os.path.join(tmp_path, 'attributes.json'), 'w') as file:
+            json.dump({str(i): attrs for i, attrs in extra.items()}, file)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as file:
+        json.dump(meta, file)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return meta
+
+def read_meta(path):
+    """Return the metadata of a compiled graph, or None if it is missing or from another version"""
+    try:
+        with open(os.path.join(path, 'meta.json')) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != FORMAT_NAME or meta.get('version') != FORMAT_VERSION:
+        return None
+    return meta
+
+class _NodeView(Mapping):
+    """graph.nodes: node_id -> {'x', 'y', ...}, built per lookup"""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, node_id):
+        return self.graph.node_attributes(self.graph.index_of(node_id))
+
+    def __contains__(self, node_id):
+        return self.graph.lookup(node_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.ids)
+
+    def __len__(self):
+        return self.graph.node_count
+
+class _EdgeView(Mapping):
+    """graph.edges: node_id -> {neighbor_id: weight}, built per lookup"""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, node_id):
+        return dict(self.graph.iter_edges(node_id))
+
+    def __contains__(self, node_id):
+        return self.graph.lookup(node_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.ids)
+
+    def __len__(self):
+        return self.graph.node_count
+
+class CompiledGraph:
+    """
+    Read-only graph backed by a compiled directory.
+
+    Arrays are memory-mapped, so opening a graph costs a few file reads no
+    matter its size; pages are pulled in as routing touches them. It offers
+    the read side of Graph (nodes, edges, get_neighbors, get_edge_weight, ...)
+    so Routing and the services can use it unchanged. Call to_graph() for a
+    mutable copy.
+    """
+
+    def __init__(self, path, mmap=True):
+        meta = read_meta(path)
+        if meta is None:
+            raise ValueError(f"Not a compiled graph (format {FORMAT_NAME} v{FORMAT_VERSION}): {path}")
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mode) for name in SECTIONS}
+        attributes_path = os.path.join(path, 'attributes.json')
+        self._setup(path, meta, arrays, attributes_path if os.path.exists(attributes_path) else None, None)
+
+    @classmethod
+    def from_arrays(cls, arrays, meta, extra=None):
+        """Wrap already-built sections (e.g. views into shared memory)"""
+        graph = cls.__new__(cls)
+        extra = {str(i): attrs for i, attrs in (extra or {}).items()}
+        graph._setup(None, meta, arrays, None, extra)
+        return graph
+
+    def _setup(self, path, meta, arrays, attributes_path, extra):
+        self.path = path
+        self.meta = meta
+        self.node_count = meta['node_count']
+        for name in SECTIONS:
+            setattr(self, '_' + name, arrays[name])
+
+        self._attributes_path = attributes_path
+        self._extra = extra
+        self._ids = None
+        self._index = None
+        self._labels = None
+        self._component_count = 0
+        self.nodes_settled = 0  # Nodes expanded by the last dijkstra_many search
+
+        self.nodes = _NodeView(self)
+        self.edges = _EdgeView(self)
+
+    # Index
+
+    @property
+    def ids(self):
+        """Node ids in index order, decoded on first use"""
+        if self._ids is None:
+            if self.meta['id_type'] == 'int':
+                self._ids = self._node_ids.tolist()
+            else:
+                blob = bytes(self._node_ids)
+                bounds = self._id_offsets.tolist()
+                self._ids = [blob[bounds[i]:bounds[i + 1]].decode('utf-8')
+                             for i in range(self.node_count)]
+        return self._ids
+
+    def lookup(self, node_id):
+        """Index of node_id, or None if it is not in the graph"""
+        if self._index is None:
+            self._index = {node_id: i for i, node_id in enumerate(self.ids)}
+        try:
+            return self._index.get(node_id)
+        except TypeError:  # Unhashable key
+            return None
+
+    def index_of(self, node_id):
+        i = self.lookup(node_id)
+        if i is None:
+            raise KeyError(node_id)
+        return i
+
+    def extra_attributes(self):
+        """{index string: stored attributes} for nodes with more than x/y, read on first use"""
+        if self._attributes_path is not None and self._extra is None:
+            with open(self._attributes_path) as file:
+                self._extra = json.load(file)
+        return self._extra or {}
+
+    def node_attributes(self, i):
+        extra = self.extra_attributes().get(str(i), {})
+        if '__raw__' in extra:
+            return extra['__raw__']
+
+        attrs = {}
+        x, y = float(self._x[i]), float(self._y[i])
+        if x == x:  # Not NaN
+            attrs['x'] = x
+        if y == y:
+            attrs['y'] = y
+        attrs.update(extra)
+        return attrs
+
+    def neighbor_indices(self, i):
+        """(targets, weights) array slices for node index i"""
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._targets[start:end], self._weights[start:end]
+
+    def iter_edges(self, node_id):
+        i = self.lookup(node_id)
+        if i is None:
+            return
+        targets, weights = self.neighbor_indices(i)
+        ids = self.ids
+        for target, weight in zip(targets.tolist(), weights.tolist()):
+            yield ids[target], weight
+
+    # Graph interface
+
+    def get_neighbors(self, node_id):
+        """Get all neighbors of a node"""
+        return [neighbor for neighbor, _ in self.iter_edges(node_id)]
+
+    def get_edge_weight(self, node1, node2):
+        """Get weight of edge between two nodes"""
+        for neighbor, weight in self.iter_edges(node1):
+            if neighbor == node2:
+                return weight
+        return float('inf')
+
+    def has_edge(self, node1, node2):
+        """Check if edge exists between two nodes"""
+        return any(neighbor == node2 for neighbor, _ in self.iter_edges(node1))
+
+    def get_node_count(self):
+        return self.node_count
+
+    def get_edge_count(self):
+        return self.meta['edge_count']
+
+    def dijkstra(self, start, end):
+        """
+        Shortest path between two node ids, searched directly over the CSR
+        arrays (Routing.shortest_path uses this when available)
+        """
+        return self.dijkstra_many(start, [end]).get(end)
+
+    def dijkstra_many(self, start, ends):
+        """
+        {end: path or None} for every end, from a single search that stops
+        once all reachable ends are settled
+        """
+        results = {end: None for end in ends}
+        self.nodes_settled = 0
+        source = self.lookup(start)
+        wanted = {}
+        for end in results:
+            index = self.lookup(end)
+            if index is not None and source is not None:
+                wanted.setdefault(index, []).append(end)
+        if not wanted:
+            return results
+
+        offsets, targets, weights = self._offsets, self._targets, self._weights
+        ids = self.ids
+        distances = {source: 0.0}
+        previous = {}
+        heap = [(0.0, source)]
+        settled = 0
+        while heap and wanted:
+            distance, node = heapq.heappop(heap)
+            if distance > distances[node]:
+                continue
+            settled += 1
+            if node in wanted:
+                path = [ids[node]]
+                step = node
+                while step in previous:
+                    step = previous[step]
+                    path.append(ids[step])
+                path.reverse()
+                for end in wanted.pop(node):
+                    results[end] = path
+            start_at, end_at = offsets[node], offsets[node + 1]
+            for neighbor, weight in zip(targets[start_at:end_at].tolist(), weights[start_at:end_at].tolist()):
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = candidate
+                    previous[neighbor] = node
+                    heapq.heappush(heap, (candidate, neighbor))
+        self.nodes_settled = settled
+        return results
+
+    def component_labels(self):
+        """Component number per node index, computed once over the CSR arrays"""
+        if self._labels is None:
+            offsets, targets = self._offsets.tolist(), self._targets.tolist()
+            labels = [-1] * self.node_count
+            component = 0
+            for root in range(self.node_count):
+                if labels[root] != -1:
+                    continue
+                labels[root] = component
+                stack = [root]
+                while stack:
+                    i = stack.pop()
+                    for position in range(offsets[i], offsets[i + 1]):
+                        target = targets[position]
+                        if labels[target] == -1:
+                            labels[target] = component
+                            stack.append(target)
+                component += 1
+            self._labels = np.array(labels, dtype=np.int32)
+            self._component_count = component
+        return self._labels
+
+    def component_count(self):
+        self.component_labels()
+        return self._component_count
+
+    def is_connected(self):
+        """Check if the graph is connected"""
+        return self.component_count() <= 1
+
+    def component_id(self, node_id):
+        i = self.lookup(node_id)
+        return None if i is None else int(self.component_labels()[i])
+
+    def component_ids(self):
+        """{node_id: component number}, numbered from 0"""
+        return dict(zip(self.ids, self.component_labels().tolist()))
+
+    def same_component(self, node1, node2):
+        """True if a path can exist between the two nodes"""
+        i, j = self.lookup(node1), self.lookup(node2)
+        if i is None or j is None:
+            return False
+        labels = self.component_labels()
+        return labels[i] == labels[j]
+
+    def get_graph_info(self):
+        return {
+            "nodes": self.node_count,
+            "edges": self.get_edge_count(),
+            "is_connected": self.is_connected(),
+            "node_list": list(self.ids)
+        }
+
+    def snapshot(self):
+        """Compiled graphs are immutable, so they are their own snapshot"""
+        return self
+
+    def to_graph(self):
+        """Materialise a mutable Graph"""
+        from models.graph import Graph
+        graph = Graph()
+        ids = self.ids
+        for i, node_id in enumerate(ids):
+            graph.add_node(node_id, self.node_attributes(i))
+        offsets = self._offsets.tolist()
+        targets = self._targets.tolist()
+        weights = self._weights.tolist()
+        for i, node_id in enumerate(ids):
+            neighbors = graph.edges[node_id]
+            for position in range(offsets[i], offsets[i + 1]):
+                neighbors[ids[targets[position]]] = weights[position]
+        return graph
@@ -1,22 +1,63 @@
+from datetime import datetime
+
 class Delivery:
-    def __init__(self, delivery_id, destination):
+    # Callables run with the delivery when it first reaches "Completed"
+    completion_listeners = []
+
+    def __init__(self, delivery_id, destination, dish=None):
         self.delivery_id = delivery_id
         self.destination = destination
+        self.dish = dish  # Dish ordered, if known (a CuisineTimeCalculator dish name)
         self.status = "Pending"
         self.progress = 0
+        self.created_at = datetime.now()
+        self.completed_at = None
+        # ETA model inputs recorded at assignment (see set_eta_features)
+        self.eta_features = None
+
+    @classmethod
+    def add_completion_listener(cls, listener):
+        cls.completion_listeners.append(listener)
+
+    @classmethod
+    def remove_completion_listener(cls, listener):
+        if listener in cls.completion_listeners:
+            cls.completion_listeners.remove(listener)
+
+    def set_eta_features(self, **features):
+        """Keyword arguments for TimePredictor.predict describing this order"""
+        self.eta_features = features
 
     def update_status(self, new_status):
         self.status = new_status
+        if new_status == "Completed":
+            self._mark_completed()
 
     def update_progress(self, progress_increment):
         self.progress += progress_increment
         if self.progress >= 100:
             self.status = "Completed"
+            self._mark_completed()
+
+    def _mark_completed(self):
+        if self.completed_at is not None:
+            return
+        self.completed_at = datetime.now()
+        for listener in list(self.completion_listeners):
+            listener(self)
+
+    def actual_minutes(self):
+        """Minutes from creation to completion, or None while in progress"""
+        if self.completed_at is None:
+            return None
+        return (self.completed_at - self.created_at).total_seconds() / 60
 
     def get_delivery_info(self):
         return {
             "delivery_id": self.delivery_id,
             "destination": self.destination,
+            "dish": self.dish,
             "status": self.status,
-            "progress": self.progress
-        }
\ No newline at end of file
+            "progress": self.progress,
+            "created_at": self.created_at.isoformat()
+        }
@@ -1,5 +1,5 @@
 class Driver:
-    def __init__(self, driver_id, name, current_location):
+    def __init__(self, driver_id, name, current_location, event_log=None):
         self.driver_id = driver_id
         self.name = name
         self.current_location = current_location
@@ -8,9 +8,13 @@ class Driver:
         self.route_history = []
         self.rating = 5.0 # Default 5 stars
         self.efficiency_score = 100.0 # Default 100% efficiency
+        self.event_log = event_log # Optional TrackingLog for location history
 
     def update_location(self, new_location):
         """Update driver's current location"""
+        # Log first, so the in-memory state never holds a move the log lacks
+        if self.event_log is not None:
+            self.event_log.append_location(self.driver_id, new_location)
         self.route_history.append({
             "from": self.current_location,
             "to": new_location,
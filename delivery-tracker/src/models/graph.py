@@ -1,41 +1,127 @@
+import threading
+
+from models.union_find import UnionFind
+
 class Graph:
     def __init__(self):
         self.nodes = {}  # node_id: {attributes}
         self.edges = {}  # node_id: {neighbor_id: weight}
-    
-    def add_node(self, node_id, attributes=None):
-        """Add a node to the graph"""
+        # Connected components, built on the first connectivity query, kept
+        # up to date on additions and dropped (rebuilt lazily) on removals
+        self._components = None
+        # Bumped on every change; snapshots record the version they froze
+        self.version = 0
+        self._write_lock = threading.RLock()
+        # Adjacency dicts copied since the last snapshot (None: no snapshot
+        # shares them, so every dict may be written in place)
+        self._owned = None
+        self._snapshot = None
+
+    def _adjacency(self, node_id):
+        """Adjacency dict of node_id that is safe to modify (copy-on-write)"""
+        owned = self._owned
+        if owned is not None and node_id not in owned:
+            # The last snapshot keeps the old dict; write to a private copy
+            self.edges[node_id] = dict(self.edges.get(node_id, ()))
+            owned.add(node_id)
+        return self.edges[node_id]
+
+    def _new_node(self, node_id, attributes):
         self.nodes[node_id] = attributes or {}
         if node_id not in self.edges:
             self.edges[node_id] = {}
+            if self._owned is not None:
+                self._owned.add(node_id)
+        if self._components is not None:
+            self._components.add(node_id)
+    
+    def add_node(self, node_id, attributes=None):
+        """Add a node to the graph"""
+        with self._write_lock:
+            self._new_node(node_id, attributes)
+            self.version += 1
     
     def add_edge(self, node1, node2, weight=1):
         """Add an edge between two nodes (undirected)"""
-        if node1 not in self.nodes:
-            self.add_node(node1)
-        if node2 not in self.nodes:
-            self.add_node(node2)
-        
-        self.edges[node1][node2] = weight
-        self.edges[node2][node1] = weight  # Undirected graph
+        with self._write_lock:
+            if node1 not in self.nodes:
+                self._new_node(node1, None)
+            if node2 not in self.nodes:
+                self._new_node(node2, None)
+
+            self._adjacency(node1)[node2] = weight
+            self._adjacency(node2)[node1] = weight  # Undirected graph
+            if self._components is not None:
+                self._components.union(node1, node2)
+            self.version += 1
     
+    def add_nodes(self, nodes):
+        """Add many (node_id, attributes) pairs"""
+        with self._write_lock:
+            for node_id, attributes in nodes:
+                self._new_node(node_id, attributes)
+            self.version += 1
+
+    def add_edges(self, edges):
+        """Add many (node1, node2, weight) edges (undirected)"""
+        with self._write_lock:
+            graph_nodes = self.nodes
+            adjacency = self._adjacency
+            components = self._components
+            for node1, node2, weight in edges:
+                if node1 not in graph_nodes:
+                    self._new_node(node1, None)
+                if node2 not in graph_nodes:
+                    self._new_node(node2, None)
+                adjacency(node1)[node2] = weight
+                adjacency(node2)[node1] = weight
+                if components is not None:
+                    components.union(node1, node2)
+            self.version += 1
+
     def remove_edge(self, node1, node2):
         """Remove edge between two nodes"""
-        if node1 in self.edges and node2 in self.edges[node1]:
-            del self.edges[node1][node2]
-        if node2 in self.edges and node1 in self.edges[node2]:
-            del self.edges[node2][node1]
+        with self._write_lock:
+            if node1 in self.edges and node2 in self.edges[node1]:
+                del self._adjacency(node1)[node2]
+                self._components = None
+                self.version += 1
+            if node2 in self.edges and node1 in self.edges[node2]:
+                del self._adjacency(node2)[node1]
+                self._components = None
+                self.version += 1
     
     def remove_node(self, node_id):
         """Remove a node and all its edges"""
-        if node_id in self.nodes:
-            # Remove all edges to this node
-            for neighbor in list(self.edges[node_id].keys()):
-                self.remove_edge(node_id, neighbor)
-            
-            # Remove the node itself
-            del self.nodes[node_id]
-            del self.edges[node_id]
+        with self._write_lock:
+            if node_id in self.nodes:
+                # Remove all edges to this node
+                for neighbor in list(self.edges[node_id].keys()):
+                    self.remove_edge(node_id, neighbor)
+
+                # Remove the node itself
+                del self.nodes[node_id]
+                del self.edges[node_id]
+                if self._owned is not None:
+                    self._owned.discard(node_id)
+                self._components = None
+                self.version += 1
+
+    def snapshot(self):
+        """
+        Consistent read-only view of the graph as it is now.
+
+        Node attribute dicts are copied, since callers edit them in place;
+        adjacency dicts are shared and the graph copies one before its next
+        change to it. Repeated calls without changes in between return the
+        same FrozenGraph.
+        """
+        with self._write_lock:
+            if self._snapshot is None or self._snapshot.version != self.version:
+                nodes = {node_id: dict(attrs) for node_id, attrs in self.nodes.items()}
+                self._snapshot = FrozenGraph(nodes, dict(self.edges), self.version)
+                self._owned = set()
+            return self._snapshot
     
     def get_neighbors(self, node_id):
         """Get all neighbors of a node"""
@@ -60,24 +146,44 @@ class Graph:
             count += len(self.edges[node])
         return count // 2  # Divide by 2 since graph is undirected
     
+    def _connectivity(self):
+        """UnionFind over the current components, rebuilt if a removal invalidated it"""
+        if self._components is None:
+            components = UnionFind(self.nodes)
+            for node, neighbors in self.edges.items():
+                for neighbor in neighbors:
+                    components.union(node, neighbor)
+            self._components = components
+        return self._components
+
     def is_connected(self):
-        """Check if the graph is connected using BFS"""
-        if not self.nodes:
-            return True
-        
-        start_node = next(iter(self.nodes))
-        visited = set()
-        queue = [start_node]
-        visited.add(start_node)
-        
-        while queue:
-            current = queue.pop(0)
-            for neighbor in self.get_neighbors(current):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-        
-        return len(visited) == len(self.nodes)
+        """Check if the graph is connected"""
+        return self._connectivity().count <= 1
+
+    def component_count(self):
+        """Number of connected components"""
+        return self._connectivity().count
+
+    def component_id(self, node_id):
+        """
+        Id of the component containing node_id (None for unknown nodes).
+        Ids are only comparable until the graph next changes.
+        """
+        if node_id not in self.nodes:
+            return None
+        return self._connectivity().find(node_id)
+
+    def component_ids(self):
+        """{node_id: component number}, numbered from 0"""
+        components = self._connectivity()
+        numbers = {}
+        return {node: numbers.setdefault(components.find(node), len(numbers)) for node in self.nodes}
+
+    def same_component(self, node1, node2):
+        """True if a path can exist between the two nodes"""
+        if node1 not in self.nodes or node2 not in self.nodes:
+            return False
+        return self._connectivity().connected(node1, node2)
     
     def get_graph_info(self):
         """Get summary information about the graph"""
@@ -86,4 +192,67 @@ class Graph:
             "edges": self.get_edge_count(),
             "is_connected": self.is_connected(),
             "node_list": list(self.nodes.keys())
-        }
\ No newline at end of file
+        }
+
+class FrozenGraph(Graph):
+    """
+    Immutable graph returned by Graph.snapshot(). Safe to share between
+    threads (and cheap to pickle to worker processes); all read methods of
+    Graph work on it, modifications raise TypeError.
+    """
+
+    def __init__(self, nodes, edges, version):
+        self.nodes = nodes
+        self.edges = edges
+        self.version = version
+        self._components = None
+        self._snapshot = self
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("FrozenGraph is read-only; modify the source Graph or use thaw()")
+
+    add_node = add_edge = add_nodes = add_edges = remove_edge = remove_node = _read_only
+
+    def snapshot(self):
+        return self
+
+    def thaw(self):
+        """Mutable Graph copy of this snapshot"""
+        graph = Graph()
+        graph.nodes = {node_id: dict(attrs) for node_id, attrs in self.nodes.items()}
+        graph.edges = {node_id: dict(neighbors) for node_id, neighbors in self.edges.items()}
+        return graph
+
+    def __reduce__(self):
+        return (FrozenGraph, (self.nodes, self.edges, self.version))
+
+class GraphHolder:
+    """
+    Publishes the current graph version to concurrent readers.
+
+    Writers call publish() after changing (or replacing) the graph; readers
+    call current() and keep using the FrozenGraph they got for the whole
+    operation, so they never take a lock or see a half-applied change.
+    """
+
+    def __init__(self, graph=None):
+        self._current = None
+        self.generation = 0  # Publications so far, across replaced graphs
+        self._lock = threading.Lock()
+        self.listeners = []  # Called with each newly published snapshot
+        if graph is not None:
+            self.publish(graph)
+
+    def publish(self, graph):
+        snapshot = graph.snapshot()
+        with self._lock:
+            if snapshot is self._current:
+                return snapshot
+            self._current = snapshot  # A single reference swap
+            self.generation += 1
+        for listener in list(self.listeners):
+            listener(snapshot)
+        return snapshot
+
+    def current(self):
+        return self._current
@@ -0,0 +1,87 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from models.compiled_graph import SECTIONS, CompiledGraph, graph_arrays
+
+_ALIGNMENT = 64
+
+class SharedGraph:
+    """
+    Compiled graph arrays published in one multiprocessing.shared_memory block.
+
+    The publishing process calls SharedGraph.publish(graph) and passes
+    shared.handle (a small picklable dict) to workers, which call
+    SharedGraph.attach(handle) to get a CompiledGraph whose arrays are views
+    straight into the shared block: no copy and no per-worker pickling of
+    the graph. Only the publisher unlinks the block (close() or the context
+    manager); attached workers just close their mapping.
+    """
+
+    def __init__(self, shm, handle, owner):
+        self.shm = shm
+        self.handle = handle
+        self.owner = owner
+        self.graph = CompiledGraph.from_arrays(_views(shm, handle['layout']), handle['meta'], handle['extra'])
+
+    @classmethod
+    def publish(cls, graph, name=None):
+        """Copy a Graph (or CompiledGraph) into a new shared memory block"""
+        if isinstance(graph, CompiledGraph):
+            arrays = {section: getattr(graph, '_' + section) for section in SECTIONS}
+            meta = graph.meta
+            extra = {int(i): attrs for i, attrs in graph.extra_attributes().items()}
+        else:
+            arrays, meta, extra = graph_arrays(graph)
+
+        layout = {}
+        size = 0
+        for section in SECTIONS:
+            array = np.ascontiguousarray(arrays[section])
+            arrays[section] = array
+            size = -(-size // _ALIGNMENT) * _ALIGNMENT
+            layout[section] = (size, array.dtype.str, array.shape)
+            size += array.nbytes
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        for section, (offset, dtype, shape) in layout.items():
+            view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            view[...] = arrays[section]
+            del view
+
+        handle = {'name': shm.name, 'layout': layout, 'meta': meta, 'extra': extra}
+        return cls(shm, handle, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """Map a published graph into this process without copying it"""
+        return cls(shared_memory.SharedMemory(name=handle['name']), handle, owner=False)
+
+    @property
+    def nbytes(self):
+        return self.shm.size
+
+    def close(self):
+        """Release this process's mapping; the publisher also frees the block"""
+        if self.shm is None:
+            return
+        # Views must go before the buffer can be released; the graph's
+        # node/edge views reference it, so drop its arrays explicitly
+        if self.graph is not None:
+            for section in SECTIONS:
+                setattr(self.graph, '_' + section, None)
+            self.graph = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _views(shm, layout):
+    return {section: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for section, (offset, dtype, shape) in layout.items()}
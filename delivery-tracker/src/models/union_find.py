@@ -0,0 +1,57 @@
+class UnionFind:
+    """Disjoint sets over hashable items with union by size and path halving"""
+
+    def __init__(self, items=()):
+        self.parent = {}
+        self.size = {}
+        self.count = 0  # Number of disjoint sets
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            self.count += 1
+
+    def find(self, item):
+        """Representative of item's set (item is added if unseen)"""
+        parent = self.parent
+        if item not in parent:
+            self.add(item)
+            return item
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merge the sets of a and b; returns False if they were already joined"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+        self.count -= 1
+        return True
+
+    def connected(self, a, b):
+        return self.find(a) == self.find(b)
+
+    def set_size(self, item):
+        return self.size[self.find(item)]
+
+    def groups(self):
+        """{representative: [members]}"""
+        result = {}
+        for item in self.parent:
+            result.setdefault(self.find(item), []).append(item)
+        return result
+
+    def __contains__(self, item):
+        return item in self.parent
+
+    def __len__(self):
+        return len(self.parent)
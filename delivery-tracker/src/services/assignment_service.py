@@ -1,8 +1,15 @@
 import math
 
+from utils.metrics import counter, timer
+
+drivers_scored = counter('assignment_drivers_scored_total', "Drivers scored for a delivery")
+unassigned = counter('assignment_no_driver_total', "Deliveries with no available driver")
+
 class AssignmentService:
-    def __init__(self, graph):
+    def __init__(self, graph, tracking_service=None):
         self.graph = graph
+        # Optional: lets assignment skip drivers whose tracking has gone stale
+        self.tracking_service = tracking_service
 
     def calculate_distance(self, node1, node2):
         """Calculate Euclidean distance between two nodes"""
@@ -24,6 +31,11 @@ class AssignmentService:
         """
         if not driver.is_available():
             return -1
+
+        if (self.tracking_service is not None and
+                driver.driver_id in self.tracking_service.drivers and
+                not self.tracking_service.is_driver_active(driver.driver_id)):
+            return -1
             
         distance = self.calculate_distance(driver.current_location, pickup_location)
         
@@ -56,6 +68,7 @@ class AssignmentService:
                  
         return score
 
+    @timer('assignment_seconds', "Best-driver searches")
     def find_best_driver(self, delivery, drivers):
         """Find the best driver for a delivery"""
         pickup_location = delivery.destination # In this simple model, pickup is previous location or we just use dest
@@ -74,5 +87,8 @@ class AssignmentService:
             if score > best_score:
                 best_score = score
                 best_driver = driver
-                
+        
+        drivers_scored.inc(len(drivers))
+        if best_driver is None:
+            unassigned.inc()
         return best_driver
@@ -0,0 +1,210 @@
+from algorithms.routing import Routing
+
+class EtaTracker:
+    """
+    Keeps the remaining route of every active delivery and refreshes its ETA
+    incrementally as driver positions arrive.
+
+    A position on the planned path only moves an index forward, so the cost is
+    one dict lookup; the route is searched again only when the driver leaves
+    the path or an edge on the remaining path changes weight. Updated ETAs are
+    collected and handed to listeners in batches by flush().
+    """
+
+    def __init__(self, graph, routing=None, time_predictor=None):
+        self.graph = graph
+        self.routing = routing or Routing(graph)
+        self.time_predictor = time_predictor
+        self.deliveries = {}  # delivery_id: route state
+        self.driver_deliveries = {}  # driver_id: set of delivery ids
+        self.edge_deliveries = {}  # (node1, node2): set of delivery ids using the edge
+        self.changed = set()  # delivery ids with an ETA to publish
+        self.stale = set()  # delivery ids that need a new route
+        self.listeners = []
+        self.reroute_count = 0
+
+    def add_listener(self, callback):
+        """Register callback(batch) receiving {delivery_id: eta_info} on each flush"""
+        self.listeners.append(callback)
+
+    def track(self, delivery_id, driver_id, start, destination,
+              cuisine=None, base_prep_time=0, **predict_kwargs):
+        """Plan the route for a delivery and start tracking its ETA"""
+        state = {
+            'driver_id': driver_id,
+            'destination': destination,
+            'cuisine': cuisine,
+            'base_prep_time': base_prep_time,
+            'predict_kwargs': predict_kwargs,
+            'path': [],
+            'positions': {},
+            'cumulative': [],
+            'index': 0,
+            'fraction': 0.0,
+            'factor': 1.0,
+        }
+        self.deliveries[delivery_id] = state
+        self.driver_deliveries.setdefault(driver_id, set()).add(delivery_id)
+        if not self._route(delivery_id, start):
+            self.untrack(delivery_id)
+            return None
+        self.changed.add(delivery_id)
+        return self.get_eta(delivery_id)
+
+    def untrack(self, delivery_id):
+        state = self.deliveries.pop(delivery_id, None)
+        if state is None:
+            return
+        self._unindex_edges(delivery_id, state)
+        self.driver_deliveries.get(state['driver_id'], set()).discard(delivery_id)
+        self.changed.discard(delivery_id)
+        self.stale.discard(delivery_id)
+
+    def update_position(self, driver_id, node, next_node=None, fraction=0.0):
+        """
+        Record a driver at node (optionally a fraction of the way towards
+        next_node) and advance every delivery that driver carries.
+        """
+        for delivery_id in self.driver_deliveries.get(driver_id, ()):
+            state = self.deliveries[delivery_id]
+            index = state['positions'].get(node)
+
+            if index is None:
+                # Off-route: plan again from where the driver actually is
+                self.stale.discard(delivery_id)
+                self._route(delivery_id, node)
+                self.reroute_count += 1
+            else:
+                if index != state['index']:
+                    self._advance(delivery_id, state, index)
+                state['fraction'] = 0.0
+
+            path = state['path']
+            if (next_node is not None and state['index'] + 1 < len(path)
+                    and path[state['index'] + 1] == next_node):
+                state['fraction'] = min(max(fraction, 0.0), 1.0)
+
+            self.changed.add(delivery_id)
+
+    def update_from_match(self, driver_id, match):
+        """Feed a MapMatcher result ({'edge': (a, b), 'offset': t, 'node': ...})"""
+        if match is None:
+            return
+        node1, node2 = match['edge']
+        offset = match['offset']
+        for delivery_id in self.driver_deliveries.get(driver_id, ()):
+            positions = self.deliveries[delivery_id]['positions']
+            # Orient the matched edge along the planned path when possible
+            if positions.get(node2) == positions.get(node1, -2) + 1:
+                self.update_position(driver_id, node1, node2, offset)
+                return
+            if positions.get(node1) == positions.get(node2, -2) + 1:
+                self.update_position(driver_id, node2, node1, 1.0 - offset)
+                return
+        self.update_position(driver_id, match['node'])
+
+    def edge_weight_changed(self, node1, node2):
+        """Mark deliveries whose remaining route uses the edge for rerouting"""
+        affected = self.edge_deliveries.get((node1, node2), set()) | \
+            self.edge_deliveries.get((node2, node1), set())
+        self.stale.update(affected)
+        self.changed.update(affected)
+
+    def get_eta(self, delivery_id):
+        """Remaining travel time estimate (minutes) for a tracked delivery"""
+        state = self.deliveries.get(delivery_id)
+        if state is None:
+            return None
+
+        path = state['path']
+        cumulative = state['cumulative']
+        index = state['index']
+        remaining = cumulative[-1] - cumulative[index]
+        if state['fraction'] and index + 1 < len(path):
+            remaining -= state['fraction'] * (cumulative[index + 1] - cumulative[index])
+        return remaining * state['factor']
+
+    def flush(self):
+        """Reroute stale deliveries and publish all changed ETAs as one batch"""
+        for delivery_id in list(self.stale):
+            state = self.deliveries.get(delivery_id)
+            if state is not None:
+                self._route(delivery_id, state['path'][state['index']])
+                self.reroute_count += 1
+        self.stale.clear()
+
+        batch = {}
+        for delivery_id in self.changed:
+            state = self.deliveries.get(delivery_id)
+            if state is None:
+                continue
+            path = state['path']
+            batch[delivery_id] = {
+                'driver_id': state['driver_id'],
+                'eta_minutes': self.get_eta(delivery_id),
+                'next_node': path[state['index'] + 1] if state['index'] + 1 < len(path) else path[-1],
+                'remaining_stops': len(path) - state['index'] - 1,
+            }
+        self.changed.clear()
+
+        if batch:
+            for callback in self.listeners:
+                callback(batch)
+        return batch
+
+    def _route(self, delivery_id, start):
+        state = self.deliveries[delivery_id]
+        path = self.routing.shortest_path(start, state['destination'])
+        if not path:
+            return False
+
+        self._unindex_edges(delivery_id, state)
+
+        cumulative = [0]
+        for i in range(len(path) - 1):
+            cumulative.append(cumulative[-1] + self.graph.get_edge_weight(path[i], path[i + 1]))
+
+        state['path'] = path
+        state['positions'] = {node: i for i, node in enumerate(path)}
+        state['cumulative'] = cumulative
+        state['index'] = 0
+        state['fraction'] = 0.0
+        state['factor'] = self._travel_factor(state, cumulative[-1])
+
+        for i in range(len(path) - 1):
+            self.edge_deliveries.setdefault((path[i], path[i + 1]), set()).add(delivery_id)
+        return True
+
+    def _advance(self, delivery_id, state, index):
+        # Only edges still ahead of the driver can trigger a reroute
+        path = state['path']
+        for i in range(state['index'], index):
+            edge = (path[i], path[i + 1])
+            users = self.edge_deliveries.get(edge)
+            if users is not None:
+                users.discard(delivery_id)
+                if not users:
+                    del self.edge_deliveries[edge]
+        for i in range(index, state['index']):
+            self.edge_deliveries.setdefault((path[i], path[i + 1]), set()).add(delivery_id)
+        state['index'] = index
+
+    def _unindex_edges(self, delivery_id, state):
+        path = state['path']
+        for i in range(state['index'], len(path) - 1):
+            users = self.edge_deliveries.get((path[i], path[i + 1]))
+            if users is not None:
+                users.discard(delivery_id)
+                if not users:
+                    del self.edge_deliveries[(path[i], path[i + 1])]
+
+    def _travel_factor(self, state, route_time):
+        """Scale graph travel time by the ML model's view of the trip, once per route"""
+        if self.time_predictor is None or state['cuisine'] is None or route_time <= 0:
+            return 1.0
+        prep = state['base_prep_time']
+        # Same distance approximation the GUI uses for graph routes
+        predicted = self.time_predictor.predict(state['cuisine'], prep, route_time * 0.5,
+                                                **state['predict_kwargs'])
+        travel = predicted - prep
+        return travel / route_time if travel > 0 else 1.0
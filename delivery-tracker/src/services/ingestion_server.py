@@ -0,0 +1,219 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from utils.metrics import counter
+from utils.stats import percentile
+
+# Statuses a driver may report about itself; 'removed' is reserved for remove_driver()
+DRIVER_STATUSES = frozenset({'active', 'busy', 'inactive'})
+
+failed_updates = counter('ingest_updates_failed_total', "Location updates that raised while being applied")
+
+class IngestMetrics:
+    """Counters and per-second rates for the ingestion pipeline"""
+
+    def __init__(self, window_seconds=60, latency_samples=10000, clock=time.time):
+        self.clock = clock
+        self.received_total = 0
+        self.applied_total = 0
+        self.rejected_total = 0
+        self.batches_total = 0
+        self.queue_depth = 0
+        self.per_second = deque(maxlen=window_seconds)  # (second, applied)
+        self.latencies = deque(maxlen=latency_samples)  # seconds, sender ts -> applied
+        self._current_second = int(clock())
+        self._current_count = 0
+
+    def record_received(self, count=1):
+        self.received_total += count
+
+    def record_rejected(self, count=1):
+        self.rejected_total += count
+
+    def record_batch(self, applied, latencies):
+        self.batches_total += 1
+        self.applied_total += applied
+        self.latencies.extend(latencies)
+        self._roll()
+        self._current_count += applied
+
+    def messages_per_second(self):
+        """Applied updates in the last complete second"""
+        self._roll()
+        if not self.per_second:
+            return 0
+        second, count = self.per_second[-1]
+        return count if second == self._current_second - 1 else 0
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        return {
+            'received_total': self.received_total,
+            'applied_total': self.applied_total,
+            'rejected_total': self.rejected_total,
+            'batches_total': self.batches_total,
+            'queue_depth': self.queue_depth,
+            'messages_per_second': self.messages_per_second(),
+            'history': [count for _, count in self.per_second],
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 3),
+                'p95': round(percentile(latencies, 0.95) * 1000, 3),
+                'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            }
+        }
+
+    def _roll(self):
+        second = int(self.clock())
+        if second == self._current_second:
+            return
+        self.per_second.append((self._current_second, self._current_count))
+        # Record the idle seconds too so the rate drops to zero when traffic stops
+        for idle in range(self._current_second + 1, min(second, self._current_second + self.per_second.maxlen)):
+            self.per_second.append((idle, 0))
+        self._current_second = second
+        self._current_count = 0
+
+class LocationIngestServer:
+    """
+    Asyncio server accepting newline-delimited JSON location reports.
+
+    Each line is an object such as
+        {"driver_id": "D1", "location": "A", "status": "active", "ts": 1700000000.0}
+    where location is a graph node id or an [x, y] pair and ts is the sender's
+    wall-clock time (used for latency metrics). Sending {"op": "stats"} returns
+    a metrics snapshot line.
+
+    Reports go through a bounded queue: when the writer falls behind, readers
+    stop pulling from their sockets and TCP flow control pushes back on clients.
+    """
+
+    def __init__(self, tracking_service, host='127.0.0.1', port=8765, graph=None,
+                 batch_size=500, max_queue=10000):
+        self.tracking_service = tracking_service
+        self.host = host
+        self.port = port
+        self.graph = graph
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.metrics = IngestMetrics()
+        self.queue = None
+        self.server = None
+        self.writer_task = None
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # Pick up the real port when started with port=0
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.writer_task = asyncio.create_task(self._writer_loop())
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.queue is not None:
+            await self.queue.join()
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+            try:
+                await self.writer_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    self.metrics.record_rejected()
+                    continue
+                if not isinstance(message, dict):
+                    self.metrics.record_rejected()
+                    continue
+
+                if message.get('op') == 'stats':
+                    self.metrics.queue_depth = self.queue.qsize()
+                    writer.write(json.dumps(self.metrics.snapshot()).encode() + b"\n")
+                    await writer.drain()
+                    continue
+
+                self.metrics.record_received()
+                # Blocks while the queue is full, which is the backpressure
+                await self.queue.put(message)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _writer_loop(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                self._apply_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            self.metrics.queue_depth = self.queue.qsize()
+            # Let readers refill the queue between batches
+            await asyncio.sleep(0)
+
+    def _parse_update(self, message):
+        """(driver_id, location, status) for a valid report, otherwise None"""
+        driver_id = message.get('driver_id')
+        location = message.get('location')
+        status = message.get('status')
+        if isinstance(driver_id, bool) or not isinstance(driver_id, (str, int)):
+            return None
+        if status is not None and (not isinstance(status, str) or status not in DRIVER_STATUSES):
+            return None
+        if isinstance(location, list):
+            if len(location) != 2 or not all(
+                    isinstance(v, (int, float)) and not isinstance(v, bool) for v in location):
+                return None
+            return driver_id, tuple(location), status
+        if isinstance(location, bool) or not isinstance(location, (str, int)):
+            return None
+        if self.graph is not None and location not in self.graph.nodes:
+            return None
+        return driver_id, location, status
+
+    def _apply_batch(self, batch):
+        """
+        Apply each report on its own, so one that raises is counted as
+        rejected without dropping the rest of the batch. The writer must
+        not stop: the queue would fill and every client would block.
+        """
+        applied = 0
+        sent_times = []
+        for message in batch:
+            update = self._parse_update(message)
+            if update is None:
+                self.metrics.record_rejected()
+                continue
+            try:
+                self.tracking_service.update_driver_locations([update])
+            except Exception:
+                failed_updates.inc()
+                self.metrics.record_rejected()
+                continue
+            applied += 1
+            sent_times.append(message.get('ts'))
+
+        now = time.time()
+        latencies = [now - ts for ts in sent_times if isinstance(ts, (int, float))]
+        self.metrics.record_batch(applied, latencies)
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+
+class Subscription:
+    """
+    A consumer's view of driver updates.
+
+    Updates are coalesced per driver, so a consumer polling at its own rate
+    only ever sees the latest state of each driver. At most max_pending
+    states are held: when full, the oldest pending driver keeps its place in
+    the queue but not its state, and poll() reads that driver's latest state
+    from the broker instead. Only intermediate updates are ever lost, and
+    the publisher never blocks.
+    """
+
+    def __init__(self, broker, driver_ids=None, region=None, max_pending=1000, callback=None):
+        self.broker = broker
+        self.driver_ids = set(driver_ids) if driver_ids is not None else None
+        self.region = region  # (x_min, y_min, x_max, y_max) or None
+        self.max_pending = max_pending
+        self.callback = callback  # Called (without the lock) when updates become available
+        self.pending = OrderedDict()  # driver_id: (state, first_enqueued_at)
+        self.overflow = OrderedDict()  # driver_id: first_enqueued_at, state read at poll time
+        self.inside = set()  # Drivers currently inside the region
+        self.lock = threading.Lock()
+        self.delivered_total = 0
+        self.coalesced_total = 0
+        self.dropped_total = 0
+        self.last_poll = broker.clock()
+
+    def wants(self, driver_id):
+        return self.driver_ids is None or driver_id in self.driver_ids
+
+    def offer(self, driver_id, state, position, now):
+        """Queue a driver update if it concerns this subscription"""
+        if not self.wants(driver_id):
+            return
+
+        with self.lock:
+            if self.region is not None:
+                x_min, y_min, x_max, y_max = self.region
+                inside = (position is not None and
+                          x_min <= position[0] <= x_max and y_min <= position[1] <= y_max)
+                if inside:
+                    self.inside.add(driver_id)
+                elif driver_id in self.inside:
+                    # Tell the consumer the driver left so it can forget it
+                    self.inside.discard(driver_id)
+                    state = dict(state, in_region=False)
+                else:
+                    return
+
+            was_empty = not self.pending and not self.overflow
+            entry = self.pending.get(driver_id)
+            if entry is not None:
+                self.pending[driver_id] = (state, entry[1])
+                self.coalesced_total += 1
+            elif driver_id in self.overflow:
+                self.coalesced_total += 1
+            else:
+                if len(self.pending) >= self.max_pending:
+                    dropped_id, (_, enqueued) = self.pending.popitem(last=False)
+                    self.overflow[dropped_id] = enqueued
+                    self.dropped_total += 1
+                self.pending[driver_id] = (state, now)
+
+        if was_empty and self.callback is not None:
+            self.callback(self)
+
+    def _latest(self, driver_id):
+        """Current state of an overflowed driver, as offer() would have queued it"""
+        state = self.broker.latest[driver_id]
+        if self.region is not None and driver_id not in self.inside:
+            state = dict(state, in_region=False)
+        return state
+
+    def poll(self, max_items=None):
+        """Take pending updates as {driver_id: latest state}, oldest first"""
+        with self.lock:
+            taken = {}
+            # Overflowed drivers were queued before anything still pending
+            while self.overflow and (max_items is None or len(taken) < max_items):
+                driver_id, _ = self.overflow.popitem(last=False)
+                taken[driver_id] = self._latest(driver_id)
+            if max_items is None or max_items - len(taken) >= len(self.pending):
+                pending = self.pending
+                self.pending = OrderedDict()
+            else:
+                pending = OrderedDict()
+                for _ in range(max_items - len(taken)):
+                    driver_id, entry = self.pending.popitem(last=False)
+                    pending[driver_id] = entry
+            taken.update((driver_id, state) for driver_id, (state, _) in pending.items())
+            self.delivered_total += len(taken)
+            self.last_poll = self.broker.clock()
+        return taken
+
+    def lag_stats(self):
+        now = self.broker.clock()
+        with self.lock:
+            if self.overflow:
+                oldest = next(iter(self.overflow.values()))
+            else:
+                oldest = next(iter(self.pending.values()))[1] if self.pending else now
+            return {
+                'pending': len(self.pending) + len(self.overflow),
+                'delivered_total': self.delivered_total,
+                'coalesced_total': self.coalesced_total,
+                'dropped_total': self.dropped_total,
+                'max_lag_seconds': now - oldest,
+                'since_last_poll_seconds': now - self.last_poll,
+            }
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class LocationBroker:
+    """Fans driver state changes out to subscriptions"""
+
+    def __init__(self, graph=None, clock=time.monotonic):
+        self.graph = graph  # Used to place node-id locations inside regions
+        self.clock = clock
+        self.subscriptions = []
+        self.latest = {}  # driver_id: last published state, for overflowed subscriptions
+        self.published_total = 0
+
+    def subscribe(self, driver_ids=None, region=None, max_pending=1000, callback=None, initial=None):
+        """
+        Register a subscription for a set of drivers and/or a bounding box.
+        initial ({driver_id: info}) seeds it with the current state.
+        """
+        subscription = Subscription(self, driver_ids, region, max_pending, callback)
+        if initial:
+            now = self.clock()
+            for driver_id, info in initial.items():
+                state = self.latest[driver_id] = dict(info)
+                subscription.offer(driver_id, state, self.resolve_position(state.get('location')), now)
+        # Copy-on-write so publishers can iterate without a lock
+        self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def publish(self, driver_id, info):
+        """Publish a snapshot of a driver's state to every interested subscription"""
+        subscriptions = self.subscriptions
+        if not subscriptions:
+            return
+        state = self.latest[driver_id] = dict(info)
+        position = self.resolve_position(state.get('location'))
+        now = self.clock()
+        for subscription in subscriptions:
+            subscription.offer(driver_id, state, position, now)
+        self.published_total += 1
+
+    def resolve_position(self, location):
+        """Return (x, y) for a coordinate pair or a graph node id, else None"""
+        if isinstance(location, (tuple, list)) and len(location) == 2:
+            return location
+        if self.graph is not None and location in self.graph.nodes:
+            attrs = self.graph.nodes[location]
+            if 'x' in attrs and 'y' in attrs:
+                return attrs['x'], attrs['y']
+        return None
+
+    def metrics(self):
+        return {
+            'published_total': self.published_total,
+            'subscriptions': [s.lag_stats() for s in self.subscriptions]
+        }
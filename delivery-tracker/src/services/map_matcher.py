@@ -0,0 +1,216 @@
+import heapq
+import math
+from collections import OrderedDict
+
+class EdgeIndex:
+    """Uniform grid over edge segments for fast nearest-edge candidate lookup"""
+
+    def __init__(self, graph, cell_size=100.0):
+        self.graph = graph
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy): [edge_index, ...]
+        self.segments = []  # (node1, node2, x1, y1, x2, y2, length)
+
+        seen = set()
+        for node1, neighbors in graph.edges.items():
+            a = graph.nodes.get(node1, {})
+            if 'x' not in a or 'y' not in a:
+                continue
+            for node2 in neighbors:
+                if (node2, node1) in seen:
+                    continue
+                seen.add((node1, node2))
+                b = graph.nodes.get(node2, {})
+                if 'x' not in b or 'y' not in b:
+                    continue
+                self._insert(node1, node2, a['x'], a['y'], b['x'], b['y'])
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _insert(self, node1, node2, x1, y1, x2, y2):
+        index = len(self.segments)
+        self.segments.append((node1, node2, x1, y1, x2, y2, math.hypot(x2 - x1, y2 - y1)))
+
+        cx1, cy1 = self._cell(min(x1, x2), min(y1, y2))
+        cx2, cy2 = self._cell(max(x1, x2), max(y1, y2))
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self.cells.setdefault((cx, cy), []).append(index)
+
+    def query(self, x, y, radius):
+        """Return (distance, segment_index, t, px, py) for segments within radius, nearest first"""
+        cx1, cy1 = self._cell(x - radius, y - radius)
+        cx2, cy2 = self._cell(x + radius, y + radius)
+
+        checked = set()
+        results = []
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                for index in self.cells.get((cx, cy), ()):
+                    if index in checked:
+                        continue
+                    checked.add(index)
+                    _, _, x1, y1, x2, y2, length = self.segments[index]
+
+                    # Project the point onto the segment
+                    if length == 0:
+                        t = 0.0
+                    else:
+                        t = ((x - x1) * (x2 - x1) + (y - y1) * (y2 - y1)) / (length * length)
+                        t = min(1.0, max(0.0, t))
+                    px = x1 + t * (x2 - x1)
+                    py = y1 + t * (y2 - y1)
+                    distance = math.hypot(x - px, y - py)
+                    if distance <= radius:
+                        results.append((distance, index, t, px, py))
+
+        results.sort()
+        return results
+
+class MapMatcher:
+    """
+    Online HMM map-matcher snapping raw driver positions onto graph edges.
+
+    Each driver keeps only the last Viterbi column (candidate edges and their
+    log-probabilities), so a new fix costs one grid lookup plus a small
+    candidates x candidates transition step. Route distances between
+    candidates come from bounded Dijkstra searches cached per source node.
+    """
+
+    def __init__(self, graph, sigma=20.0, beta=50.0, search_radius=60.0,
+                 max_candidates=5, max_route_distance=1000.0,
+                 cell_size=100.0, cache_size=4096):
+        self.graph = graph
+        self.sigma = sigma  # GPS noise (std dev, map units)
+        self.beta = beta  # Tolerance for route vs straight-line mismatch
+        self.search_radius = search_radius
+        self.max_candidates = max_candidates
+        self.max_route_distance = max_route_distance
+        self.cache_size = cache_size
+        self.index = EdgeIndex(graph, cell_size)
+        self.distance_cache = OrderedDict()  # source node: {node: route distance}
+        self.states = {}  # driver_id: (x, y, candidates, scores)
+
+    def attach(self, tracking_service):
+        """Drop per-driver state whenever the tracking service expires a driver"""
+        tracking_service.add_expiry_listener(lambda driver_id, info: self.remove_driver(driver_id))
+
+    def remove_driver(self, driver_id):
+        self.states.pop(driver_id, None)
+
+    def match_batch(self, fixes):
+        """Match a batch of (driver_id, x, y) fixes; returns {driver_id: match or None}"""
+        return {driver_id: self.match(driver_id, x, y) for driver_id, x, y in fixes}
+
+    def match(self, driver_id, x, y):
+        """
+        Feed one GPS fix for a driver and return its current best match:
+        {'edge': (node1, node2), 'offset': t, 'x', 'y', 'node', 'distance'}
+        where offset is the fraction along the edge from node1, or None when
+        no road is within the search radius.
+        """
+        found = self.index.query(x, y, self.search_radius)[:self.max_candidates]
+        if not found:
+            return None
+
+        inv_two_sigma_sq = 1.0 / (2.0 * self.sigma * self.sigma)
+        emissions = [-distance * distance * inv_two_sigma_sq for distance, _, _, _, _ in found]
+        candidates = [(index, t) for _, index, t, _, _ in found]
+
+        previous = self.states.get(driver_id)
+        scores = None
+        if previous is not None:
+            prev_x, prev_y, prev_candidates, prev_scores = previous
+            straight = math.hypot(x - prev_x, y - prev_y)
+            scores = []
+            for candidate, emission in zip(candidates, emissions):
+                best = -math.inf
+                for prev_candidate, prev_score in zip(prev_candidates, prev_scores):
+                    route = self._route_distance(prev_candidate, candidate)
+                    if route is None:
+                        continue
+                    score = prev_score - abs(route - straight) / self.beta
+                    if score > best:
+                        best = score
+                scores.append(best + emission)
+
+            # HMM break (no connected transition): restart from this fix
+            if max(scores) == -math.inf:
+                scores = None
+            else:
+                # Normalise so scores do not drift towards -inf over long streams
+                top = max(scores)
+                scores = [score - top for score in scores]
+
+        if scores is None:
+            scores = emissions
+
+        self.states[driver_id] = (x, y, candidates, scores)
+
+        best = max(range(len(candidates)), key=scores.__getitem__)
+        distance, index, t, px, py = found[best]
+        node1, node2 = self.index.segments[index][:2]
+        return {
+            'edge': (node1, node2),
+            'offset': t,
+            'x': px,
+            'y': py,
+            'node': node1 if t < 0.5 else node2,
+            'distance': distance
+        }
+
+    def _route_distance(self, origin, destination):
+        """Network distance between two (segment_index, t) positions, None if too far"""
+        index1, t1 = origin
+        index2, t2 = destination
+        a, b, _, _, _, _, length1 = self.index.segments[index1]
+        c, d, _, _, _, _, length2 = self.index.segments[index2]
+
+        if index1 == index2:
+            return abs(t2 - t1) * length1
+
+        best = None
+        for start, start_cost in ((a, t1 * length1), (b, (1.0 - t1) * length1)):
+            reachable = self._distances_from(start)
+            for end, end_cost in ((c, t2 * length2), (d, (1.0 - t2) * length2)):
+                middle = reachable.get(end)
+                if middle is None:
+                    continue
+                total = start_cost + middle + end_cost
+                if best is None or total < best:
+                    best = total
+
+        if best is None or best > self.max_route_distance:
+            return None
+        return best
+
+    def _distances_from(self, source):
+        """Bounded Dijkstra over geometric edge lengths, LRU-cached per source"""
+        cached = self.distance_cache.get(source)
+        if cached is not None:
+            self.distance_cache.move_to_end(source)
+            return cached
+
+        nodes = self.graph.nodes
+        limit = self.max_route_distance
+        distances = {source: 0.0}
+        pq = [(0.0, source)]
+        while pq:
+            distance, current = heapq.heappop(pq)
+            if distance > distances[current]:
+                continue
+            here = nodes[current]
+            for neighbor in self.graph.get_neighbors(current):
+                there = nodes[neighbor]
+                step = math.hypot(there.get('x', 0) - here.get('x', 0),
+                                  there.get('y', 0) - here.get('y', 0))
+                candidate = distance + step
+                if candidate <= limit and candidate < distances.get(neighbor, math.inf):
+                    distances[neighbor] = candidate
+                    heapq.heappush(pq, (candidate, neighbor))
+
+        self.distance_cache[source] = distances
+        if len(self.distance_cache) > self.cache_size:
+            self.distance_cache.popitem(last=False)
+        return distances
@@ -1,19 +1,281 @@
 from typing import Dict, List
+import hashlib
+import io
 import json
 import os
+import re
+
+from utils.metrics import counter, timer
+
+STREAM_CHUNK_SIZE = 1 << 20
+_WHITESPACE = ' \t\n\r'
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,\]])[ \t\n\r]*')
+
+cache_hits = counter('map_cache_hits_total', "Map loads served from the compiled cache")
+cache_misses = counter('map_cache_misses_total', "Map loads that parsed the source file")
+
+class _ChunkReader:
+    """Text buffer over a file that is refilled in fixed-size chunks"""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read another chunk; returns False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer stays around one chunk in size
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (not consumed), or '' at end of file"""
+        while True:
+            buffer, pos = self.buffer, self.pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed map JSON: expected one of {chars!r}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self, decoder):
+        """Decode one complete JSON value, reading more chunks as needed"""
+        self.peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A scalar that ends at the buffer edge may continue in the next chunk
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+    def array_items(self, decoder):
+        """Yield the elements of an array whose '[' has just been consumed"""
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        raw_decode = decoder.raw_decode
+        separator = _SEPARATOR.match
+        while True:
+            buffer = self.buffer
+            try:
+                obj, end = raw_decode(buffer, self.pos)
+                match = separator(buffer, end)
+            except json.JSONDecodeError:
+                match = None
+            if match is None or match.end() == len(buffer):
+                # Element or separator may run past the buffered chunk
+                obj = self.value(decoder)
+                closing = self.expect(',]') == ']'
+                self.peek()
+            else:
+                self.pos = match.end()
+                closing = match.group(1) == ']'
+            yield obj
+            if closing:
+                return
+
+def iter_map_json(file, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield ('intersection', item) and ('road', item) from a map JSON document
+    without loading it whole. Only one array element is decoded at a time;
+    other top-level keys are decoded and discarded.
+    """
+    reader = _ChunkReader(file, chunk_size)
+    decoder = json.JSONDecoder()
+    kinds = {'intersections': 'intersection', 'roads': 'road'}
+
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value(decoder)
+        reader.expect(':')
+        kind = kinds.get(key)
+        if kind is not None and reader.peek() == '[':
+            reader.expect('[')
+            for item in reader.array_items(decoder):
+                yield kind, item
+        else:
+            reader.value(decoder)
+        if reader.expect(',}') == '}':
+            return
+
+def iter_map_ndjson(file):
+    """
+    Yield elements from an NDJSON map: one intersection or road per line,
+    tagged with "kind" or recognised by a "start" field.
+    """
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        kind = item.pop('kind', None) or ('road' if 'start' in item else 'intersection')
+        yield kind, item
 
 class MapService:
-    def __init__(self, map_data_path: str):
+    def __init__(self, map_data_path: str, cache_dir: str = None):
         self.map_data_path = map_data_path
+        # Compiled graphs are cached by content hash; None disables the cache
+        self.cache_dir = cache_dir if cache_dir is not None else os.path.join(
+            os.path.dirname(os.path.abspath(map_data_path)), '.graph_cache')
         self.graph = None
 
-    def load_map(self) -> None:
+    @timer('map_load_seconds', "Map loads")
+    def load_map(self, use_cache: bool = True) -> None:
+        """
+        Load the map into self.graph as a mutable Graph.
+
+        With the cache enabled, a JSON map is compiled to the binary graph
+        format on first load and later loads rebuild the Graph from the
+        compiled copy instead of parsing JSON again. A path to a compiled
+        graph directory is read directly. See load_compiled() for the
+        read-only, memory-mapped graph without the rebuild.
+        """
+        self._check_exists()
+        from models.compiled_graph import CompiledGraph
+        if os.path.isdir(self.map_data_path):
+            self.graph = CompiledGraph(self.map_data_path).to_graph()
+            return
+
+        if not use_cache or self.cache_dir is None:
+            self.graph = self.stream_graph()
+            return
+
+        digest = self.content_hash()
+        cached = self._open_cached(digest)
+        if cached is not None:
+            self.graph = cached.to_graph()
+            return
+        self.graph = self.stream_graph()
+        self._compile_to_cache(self.graph, digest)
+
+    @timer('map_load_compiled_seconds', "Read-only compiled map loads")
+    def load_compiled(self) -> None:
+        """
+        Load the map into self.graph as a read-only CompiledGraph, memory-
+        mapped from the cache (compiled on first use). Callers must not
+        mutate it; call to_graph() on it for a mutable copy.
+        """
+        self._check_exists()
+        from models.compiled_graph import CompiledGraph
+        if os.path.isdir(self.map_data_path):
+            self.graph = CompiledGraph(self.map_data_path)
+            return
+
+        digest = self.content_hash() if self.cache_dir is not None else None
+        cached = self._open_cached(digest) if digest is not None else None
+        if cached is None:
+            graph = self.stream_graph()
+            cached_path = self._compile_to_cache(graph, digest) if digest is not None else None
+            self.graph = CompiledGraph(cached_path) if cached_path else graph
+            return
+        self.graph = cached
+
+    def _check_exists(self):
         if not os.path.exists(self.map_data_path):
             raise FileNotFoundError(f"Map data file not found: {self.map_data_path}")
-        
-        with open(self.map_data_path, 'r') as file:
-            map_data = json.load(file)
-            self.graph = self.build_graph(map_data)
+
+    def _cached_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.graphbin")
+
+    def _open_cached(self, digest):
+        """The cached CompiledGraph for map contents with this hash, or None"""
+        from models.compiled_graph import CompiledGraph, read_meta
+        cached_path = self._cached_path(digest)
+        if read_meta(cached_path) is None:
+            cache_misses.inc()
+            return None
+        cache_hits.inc()
+        return CompiledGraph(cached_path)
+
+    def _compile_to_cache(self, graph, digest):
+        """Write graph to the cache; returns its path, or None if it could not be written"""
+        from models.compiled_graph import compile_graph
+        cached_path = self._cached_path(digest)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            compile_graph(graph, cached_path, source_hash=digest)
+        except OSError as e:
+            print(f"Could not cache compiled map: {e}")
+            return None
+        return cached_path
+
+    def content_hash(self) -> str:
+        """SHA-256 of the map file, read in chunks"""
+        digest = hashlib.sha256()
+        with open(self.map_data_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def stream_graph(self, batch_size: int = 5000, progress=None,
+                     chunk_size: int = STREAM_CHUNK_SIZE) -> 'Graph':
+        """
+        Build a Graph from the map file without materialising the document.
+
+        Intersections and roads are parsed incrementally (.ndjson/.jsonl files
+        line by line, anything else as one JSON object) and added in batches
+        of batch_size. progress(bytes_read, total_bytes, nodes, edges) is
+        called after every batch and once at the end.
+        """
+        from models.graph import Graph
+        graph = Graph()
+        total_bytes = os.path.getsize(self.map_data_path)
+        node_batch, edge_batch = [], []
+        counts = [0, 0]
+
+        def flush():
+            graph.add_nodes(node_batch)
+            graph.add_edges(edge_batch)
+            counts[0] += len(node_batch)
+            counts[1] += len(edge_batch)
+            node_batch.clear()
+            edge_batch.clear()
+            if progress is not None:
+                progress(min(raw.tell(), total_bytes), total_bytes, counts[0], counts[1])
+
+        with open(self.map_data_path, 'rb') as raw:
+            # Text wrapper over the binary file so progress can report bytes read
+            file = io.TextIOWrapper(raw, encoding='utf-8')
+            if self.map_data_path.endswith(('.ndjson', '.jsonl')):
+                elements = iter_map_ndjson(file)
+            else:
+                elements = iter_map_json(file, chunk_size)
+
+            for kind, item in elements:
+                if kind == 'intersection':
+                    node_batch.append((item['id'], item.get('location')))
+                else:
+                    edge_batch.append((item['start'], item['end'], item['travel_time']))
+                if len(node_batch) + len(edge_batch) >= batch_size:
+                    flush()
+            flush()
+        return graph
 
     def build_graph(self, map_data: Dict) -> 'Graph':
         from models.graph import Graph
@@ -34,4 +296,4 @@ class MapService:
 
     def save_map(self, map_data: Dict) -> None:
         with open(self.map_data_path, 'w') as file:
-            json.dump(map_data, file)
\ No newline at end of file
+            json.dump(map_data, file)
@@ -0,0 +1,243 @@
+import glob
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+SECTIONS = ('nodes', 'edges', 'drivers', 'deliveries', 'app_state')
+
+def _diff(previous, current):
+    """Per-section changes between two states: {section: {'set': {...}, 'removed': [...]}}"""
+    changes = {}
+    for section in SECTIONS:
+        old = previous.get(section, {})
+        new = current.get(section, {})
+        changed = {key: value for key, value in new.items() if old.get(key) != value}
+        removed = [key for key in old if key not in new]
+        if changed or removed:
+            changes[section] = {'set': changed, 'removed': removed}
+    return changes
+
+def _apply(state, changes):
+    for section, change in changes.items():
+        target = state.setdefault(section, {})
+        target.update(change.get('set', {}))
+        for key in change.get('removed', []):
+            target.pop(key, None)
+
+class BackgroundSaver:
+    """
+    save_async() for a store with a save(state) method: the state is handed
+    to a background thread, so callers on the Tk main loop never wait for
+    disk I/O. If saves arrive faster than they can be written, only the
+    newest pending state is kept.
+    """
+
+    def _init_saver(self):
+        self.pending = queue.Queue(maxsize=1)
+        self.worker = None
+        self.last_error = None
+
+    def save_async(self, state):
+        """Queue a save on the background writer thread without blocking"""
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, daemon=True)
+            self.worker.start()
+
+        # Coalesce: a newer state replaces one that has not been written yet
+        while True:
+            try:
+                self.pending.put_nowait(state)
+                return
+            except queue.Full:
+                try:
+                    self.pending.get_nowait()
+                    self.pending.task_done()
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            state = self.pending.get()
+            try:
+                if state is None:
+                    return
+                self.save(state)
+            except Exception as e:
+                self.last_error = e
+                print(f"Error saving state: {e}")
+            finally:
+                self.pending.task_done()
+
+    def close(self):
+        """Wait for queued saves to finish and stop the writer thread"""
+        if self.worker is not None and self.worker.is_alive():
+            self.pending.join()
+            self.pending.put(None)
+            self.worker.join()
+        self.worker = None
+
+class SnapshotStore(BackgroundSaver):
+    """
+    Persists application state as a periodic base snapshot plus small delta
+    records in between.
+
+    A state is a dict of sections (nodes, edges, drivers, deliveries,
+    app_state), each a dict keyed by id. Each save appends only the entries
+    that changed since the previous save to the current delta log; every
+    base_every saves a new full snapshot is written instead, and snapshots
+    (with their deltas) beyond keep_bases are deleted.
+
+    save_async() writes on a background thread (see BackgroundSaver).
+    """
+
+    def __init__(self, directory, base_every=50, keep_bases=3):
+        self.directory = directory
+        self.base_every = base_every
+        self.keep_bases = keep_bases
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.RLock()  # Serialises writers
+        self.last_state = None
+        self.base_seq = None
+        self.deltas_since_base = 0
+        self.saves = 0
+        self._init_saver()
+
+    def _snapshot_path(self, seq):
+        return os.path.join(self.directory, f"snapshot_{seq:06d}.json")
+
+    def _delta_path(self, seq):
+        return os.path.join(self.directory, f"delta_{seq:06d}.jsonl")
+
+    def _bases(self):
+        paths = sorted(glob.glob(os.path.join(self.directory, "snapshot_*.json")))
+        return [int(os.path.basename(path)[9:15]) for path in paths]
+
+    def save(self, state):
+        """Persist state now; returns 'base', 'delta' or None when nothing changed"""
+        with self.lock:
+            if self.last_state is None:
+                self.last_state = self.load()
+                bases = self._bases()
+                self.base_seq = bases[-1] if bases else None
+
+            if self.base_seq is None or self.deltas_since_base >= self.base_every:
+                self._write_base(state)
+                kind = 'base'
+            else:
+                changes = _diff(self.last_state, state)
+                if not changes:
+                    return None
+                record = {'saved_at': datetime.now().isoformat(), 'changes': changes}
+                with open(self._delta_path(self.base_seq), 'a') as file:
+                    file.write(json.dumps(record) + "\n")
+                self.deltas_since_base += 1
+                kind = 'delta'
+
+            self.last_state = state
+            self.saves += 1
+            return kind
+
+    def _write_base(self, state):
+        seq = 0 if self.base_seq is None else self.base_seq + 1
+        path = self._snapshot_path(seq)
+        with open(path + '.tmp', 'w') as file:
+            json.dump({'saved_at': datetime.now().isoformat(), 'state': state}, file)
+        os.replace(path + '.tmp', path)
+        self.base_seq = seq
+        self.deltas_since_base = 0
+        self._compact()
+
+    def _compact(self):
+        """Drop snapshots and delta logs beyond the retention count"""
+        for seq in self._bases()[:-self.keep_bases]:
+            for path in (self._snapshot_path(seq), self._delta_path(seq)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def load(self):
+        """Latest saved state: newest snapshot with its deltas applied"""
+        bases = self._bases()
+        if not bases:
+            return {section: {} for section in SECTIONS}
+
+        seq = bases[-1]
+        with open(self._snapshot_path(seq)) as file:
+            state = json.load(file)['state']
+
+        delta_path = self._delta_path(seq)
+        count = 0
+        if os.path.exists(delta_path):
+            good_offset = 0
+            with open(delta_path, 'rb') as file:
+                for line in file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated record")
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Torn final line from an interrupted save
+                    _apply(state, record['changes'])
+                    good_offset += len(line)
+                    count += 1
+                torn = file.seek(0, os.SEEK_END) > good_offset
+            if torn:
+                # Cut the fragment off, or the next appended record would be
+                # glued onto it and lost along with everything after it
+                with self.lock, open(delta_path, 'r+b') as file:
+                    file.truncate(good_offset)
+        with self.lock:
+            if self.base_seq is None or self.base_seq == seq:
+                self.deltas_since_base = count
+        return state
+
+    def has_saved_state(self):
+        return bool(self._bases())
+
+def import_legacy_backups(directory):
+    """Read the newest old-style *_backup_*.json files into a state dict"""
+    state = {section: {} for section in SECTIONS}
+
+    def latest(prefix):
+        paths = sorted(glob.glob(os.path.join(directory, f"{prefix}_backup_*.json")))
+        if not paths:
+            return None
+        with open(paths[-1]) as file:
+            return json.load(file)
+
+    graph = latest('graph')
+    if graph:
+        state['nodes'] = graph.get('nodes', {})
+        edges = graph.get('edges', {})
+        if isinstance(edges, dict):
+            state['edges'] = edges
+        else:
+            for edge in edges:
+                if isinstance(edge, dict):
+                    node1 = edge.get('from', edge.get('start', edge.get('node1')))
+                    node2 = edge.get('to', edge.get('end', edge.get('node2')))
+                    weight = edge.get('weight', edge.get('travel_time', 1))
+                else:
+                    node1, node2, weight = edge
+                state['edges'].setdefault(node1, {})[node2] = weight
+                state['edges'].setdefault(node2, {})[node1] = weight
+
+    state['drivers'] = latest('drivers') or {}
+    state['deliveries'] = latest('deliveries') or {}
+    state['app_state'] = latest('app_state') or {}
+    return state
+
+def open_state_store(directory, backend='snapshot'):
+    """
+    The store the GUI saves its state to: 'snapshot' for SnapshotStore files
+    in directory, 'sqlite' for a SQLiteStore database (state.db) in it
+    """
+    if backend == 'snapshot':
+        return SnapshotStore(directory)
+    if backend == 'sqlite':
+        from services.sqlite_store import SQLiteStore
+        os.makedirs(directory, exist_ok=True)
+        return SQLiteStore(os.path.join(directory, 'state.db'))
+    raise ValueError(f"Unknown state store: {backend}")
@@ -0,0 +1,314 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from services.persistence_service import BackgroundSaver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    x REAL,
+    y REAL,
+    attributes TEXT
+);
+CREATE TABLE IF NOT EXISTS edges (
+    node1 TEXT NOT NULL,
+    node2 TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (node1, node2)
+);
+CREATE INDEX IF NOT EXISTS idx_edges_node2 ON edges (node2);
+CREATE TABLE IF NOT EXISTS drivers (
+    driver_id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT,
+    current_location TEXT,
+    rating REAL,
+    efficiency_score REAL,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_drivers_status ON drivers (status);
+CREATE TABLE IF NOT EXISTS deliveries (
+    delivery_id TEXT PRIMARY KEY,
+    destination TEXT,
+    dish TEXT,
+    status TEXT,
+    progress INTEGER,
+    driver_id TEXT REFERENCES drivers (driver_id) ON DELETE SET NULL,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_status_created ON deliveries (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_deliveries_driver ON deliveries (driver_id);
+CREATE INDEX IF NOT EXISTS idx_deliveries_created ON deliveries (created_at);
+"""
+
+# Statements are kept as constants so sqlite3's statement cache reuses the
+# compiled (prepared) form on every call.
+UPSERT_NODE = ("INSERT INTO nodes (node_id, x, y, attributes) VALUES (?, ?, ?, ?) "
+               "ON CONFLICT(node_id) DO UPDATE SET x=excluded.x, y=excluded.y, attributes=excluded.attributes")
+UPSERT_EDGE = ("INSERT INTO edges (node1, node2, weight) VALUES (?, ?, ?) "
+               "ON CONFLICT(node1, node2) DO UPDATE SET weight=excluded.weight")
+UPSERT_DRIVER = ("INSERT INTO drivers (driver_id, name, status, current_location, rating, efficiency_score, updated_at) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                 "ON CONFLICT(driver_id) DO UPDATE SET name=excluded.name, status=excluded.status, "
+                 "current_location=excluded.current_location, rating=excluded.rating, "
+                 "efficiency_score=excluded.efficiency_score, updated_at=excluded.updated_at")
+UPSERT_DELIVERY = ("INSERT INTO deliveries (delivery_id, destination, dish, status, progress, driver_id, created_at, updated_at) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                   "ON CONFLICT(delivery_id) DO UPDATE SET destination=excluded.destination, dish=excluded.dish, "
+                   "status=excluded.status, progress=excluded.progress, driver_id=excluded.driver_id, "
+                   "updated_at=excluded.updated_at")
+SELECT_PENDING_OLDER = ("SELECT delivery_id, destination, dish, status, progress, driver_id, created_at, updated_at "
+                        "FROM deliveries WHERE status = ? AND created_at < ? ORDER BY created_at")
+SELECT_DRIVER_DELIVERIES = ("SELECT delivery_id, destination, dish, status, progress, driver_id, created_at, updated_at "
+                            "FROM deliveries WHERE driver_id = ?")
+SELECT_NEIGHBORS = "SELECT node2, weight FROM edges WHERE node1 = ?"
+
+def _timestamp(value):
+    if value is None:
+        return datetime.now().isoformat()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _encode_location(location):
+    """Driver location (node id or (x, y) pair) as JSON text"""
+    return None if location is None else json.dumps(location)
+
+def _decode_location(text):
+    """Inverse of _encode_location"""
+    if text is None:
+        return None
+    location = json.loads(text)
+    return tuple(location) if isinstance(location, list) else location
+
+class SQLiteStore(BackgroundSaver):
+    """
+    Embedded SQLite persistence for drivers, deliveries and the road graph.
+
+    The database runs in WAL mode so readers never block the writer. Writes
+    are grouped into transactions with batch(), and list queries stream rows
+    from the cursor instead of loading whole tables. A delivery's driver_id
+    must name a stored driver and is cleared when that driver is deleted.
+
+    It also stands in for SnapshotStore (save/load/save_async), which is how
+    the GUI uses it when settings.STATE_STORE is 'sqlite'.
+    """
+
+    def __init__(self, path, cached_statements=128):
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.connection = sqlite3.connect(path, check_same_thread=False,
+                                          cached_statements=cached_statements)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self._depth = 0
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("PRAGMA foreign_keys=ON")
+            self.connection.executescript(SCHEMA)
+            self.connection.commit()
+        self._init_saver()
+
+    def close(self):
+        """Finish queued saves, then close the database"""
+        super().close()
+        with self.lock:
+            self.connection.close()
+
+    @contextmanager
+    def batch(self):
+        """Group every write inside the block into one transaction"""
+        with self.lock:
+            self._depth += 1
+            try:
+                yield self
+            except Exception:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.connection.rollback()
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.connection.commit()
+
+    def _write(self, sql, rows):
+        with self.batch():
+            self.connection.executemany(sql, rows)
+
+    # Writes
+
+    def upsert_nodes(self, nodes):
+        """nodes: iterable of (node_id, attributes)"""
+        self._write(UPSERT_NODE, (
+            (node_id, attrs.get('x'), attrs.get('y'), json.dumps(attrs))
+            for node_id, attrs in nodes
+        ))
+
+    def upsert_edges(self, edges):
+        """edges: iterable of (node1, node2, weight); stored in both directions"""
+        def both_directions():
+            for node1, node2, weight in edges:
+                yield node1, node2, weight
+                yield node2, node1, weight
+        self._write(UPSERT_EDGE, both_directions())
+
+    def delete_edge(self, node1, node2):
+        with self.batch():
+            self.connection.execute("DELETE FROM edges WHERE (node1 = ? AND node2 = ?) OR (node1 = ? AND node2 = ?)",
+                                    (node1, node2, node2, node1))
+
+    def upsert_drivers(self, drivers):
+        """drivers: iterable of Driver objects"""
+        now = datetime.now().isoformat()
+        self._write(UPSERT_DRIVER, (
+            (driver.driver_id, driver.name, driver.status, _encode_location(driver.current_location),
+             driver.rating, driver.efficiency_score, now)
+            for driver in drivers
+        ))
+
+    def upsert_deliveries(self, deliveries, driver_ids=None):
+        """
+        deliveries: iterable of Delivery objects. driver_ids optionally maps
+        delivery_id to the assigned driver.
+        """
+        driver_ids = driver_ids or {}
+        now = datetime.now().isoformat()
+        self._write(UPSERT_DELIVERY, (
+            (delivery.delivery_id, delivery.destination, delivery.dish,
+             delivery.status, delivery.progress,
+             driver_ids.get(delivery.delivery_id),
+             _timestamp(getattr(delivery, 'created_at', None)), now)
+            for delivery in deliveries
+        ))
+
+    def save_graph(self, graph):
+        """Replace the stored graph with the contents of a Graph"""
+        with self.batch():
+            self.connection.execute("DELETE FROM edges")
+            self.connection.execute("DELETE FROM nodes")
+            self.upsert_nodes(graph.nodes.items())
+            self.connection.executemany(UPSERT_EDGE, (
+                (node1, node2, weight)
+                for node1, neighbors in graph.edges.items()
+                for node2, weight in neighbors.items()
+            ))
+
+    # Queries
+
+    def _stream(self, sql, params):
+        cursor = self.connection.execute(sql, params)
+        try:
+            for row in cursor:
+                yield dict(row)
+        finally:
+            cursor.close()
+
+    def pending_deliveries_older_than(self, cutoff, status='Pending'):
+        """Stream deliveries in the given status created before cutoff (datetime or ISO string)"""
+        return self._stream(SELECT_PENDING_OLDER, (status, _timestamp(cutoff)))
+
+    def deliveries_for_driver(self, driver_id):
+        return self._stream(SELECT_DRIVER_DELIVERIES, (driver_id,))
+
+    def get_neighbors(self, node_id):
+        """{neighbor: weight} for one node, straight from the index"""
+        return {row[0]: row[1] for row in self.connection.execute(SELECT_NEIGHBORS, (node_id,))}
+
+    def count(self, table, **where):
+        if table not in ('nodes', 'edges', 'drivers', 'deliveries'):
+            raise ValueError(f"Unknown table: {table}")
+        clause = " AND ".join(f"{column} = ?" for column in where)
+        sql = f"SELECT COUNT(*) FROM {table}" + (f" WHERE {clause}" if clause else "")
+        return self.connection.execute(sql, tuple(where.values())).fetchone()[0]
+
+    def load_graph(self):
+        from models.graph import Graph
+        graph = Graph()
+        for row in self.connection.execute("SELECT node_id, attributes FROM nodes"):
+            graph.add_node(row[0], json.loads(row[1]) if row[1] else {})
+        for row in self.connection.execute("SELECT node1, node2, weight FROM edges WHERE node1 < node2"):
+            graph.add_edge(row[0], row[1], row[2])
+        return graph
+
+    # SnapshotStore-compatible state API
+
+    def save_state(self, state):
+        """Persist a state dict in the shape produced by DeliveryTrackerGUI.collect_state()"""
+        now = datetime.now().isoformat()
+        with self.batch():
+            execute = self.connection.execute
+            execute("DELETE FROM nodes")
+            execute("DELETE FROM edges")
+            self.upsert_nodes(state.get('nodes', {}).items())
+            self.connection.executemany(UPSERT_EDGE, (
+                (node1, node2, weight)
+                for node1, neighbors in state.get('edges', {}).items()
+                for node2, weight in neighbors.items()
+            ))
+
+            drivers = state.get('drivers', {})
+            execute("DELETE FROM drivers WHERE driver_id NOT IN (%s)" % ",".join("?" * len(drivers)),
+                    tuple(drivers))
+            self.connection.executemany(UPSERT_DRIVER, (
+                (driver_id, data.get('name'), data.get('status'), _encode_location(data.get('current_location')),
+                 data.get('rating'), data.get('efficiency_score'), now)
+                for driver_id, data in drivers.items()
+            ))
+
+            assigned = {delivery_id: driver_id
+                        for driver_id, data in drivers.items()
+                        for delivery_id in data.get('assigned_deliveries', [])}
+            deliveries = state.get('deliveries', {})
+            execute("DELETE FROM deliveries WHERE delivery_id NOT IN (%s)" % ",".join("?" * len(deliveries)),
+                    tuple(deliveries))
+            self.connection.executemany(UPSERT_DELIVERY, (
+                (delivery_id, data.get('destination'), data.get('dish'), data.get('status'), data.get('progress'),
+                 assigned.get(delivery_id), data.get('created_at', now), now)
+                for delivery_id, data in deliveries.items()
+            ))
+
+    def load_state(self):
+        with self.lock:
+            return self._load_state()
+
+    def _load_state(self):
+        state = {'nodes': {}, 'edges': {}, 'drivers': {}, 'deliveries': {}, 'app_state': {}}
+        for row in self.connection.execute("SELECT node_id, attributes FROM nodes"):
+            state['nodes'][row[0]] = json.loads(row[1]) if row[1] else {}
+        for row in self.connection.execute("SELECT node1, node2, weight FROM edges"):
+            state['edges'].setdefault(row[0], {})[row[1]] = row[2]
+
+        for row in self.connection.execute("SELECT * FROM drivers"):
+            data = dict(row)
+            data['current_location'] = _decode_location(data['current_location'])
+            data['assigned_deliveries'] = []
+            state['drivers'][data.pop('driver_id')] = data
+        for row in self.connection.execute("SELECT * FROM deliveries"):
+            data = dict(row)
+            delivery_id = data.pop('delivery_id')
+            state['deliveries'][delivery_id] = data
+            driver = state['drivers'].get(data['driver_id'])
+            if driver is not None:
+                driver['assigned_deliveries'].append(delivery_id)
+
+        state['app_state'] = {
+            'total_deliveries': len(state['deliveries']),
+            'total_drivers': len(state['drivers']),
+            'graph_nodes': len(state['nodes'])
+        }
+        return state
+
+    save = save_state
+    load = load_state
+
+    def has_saved_state(self):
+        with self.lock:
+            return any(self.connection.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+                       for table in ('nodes', 'drivers', 'deliveries'))
@@ -0,0 +1,563 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+# Segment header: magic, format version, padding, coordinate scale
+HEADER = struct.Struct('<5sBxxd')
+MAGIC = b'DTWAL'
+VERSION = 1
+# Journal of an in-progress compaction, see TrackingLog.compact
+COMPACTION_MANIFEST = 'compaction.json'
+
+# Record types. Every block starts with a KEYFRAME and carries its own string
+# table, so a reader can start decoding at any block boundary.
+REC_KEYFRAME = 1  # absolute timestamp (ms)
+REC_STRING = 2  # string table entry: index, length, utf-8 bytes
+REC_XY = 3  # driver, dt, dx, dy (coordinates delta-encoded per driver)
+REC_NODE = 4  # driver, dt, node string index
+REC_STATUS = 5  # driver, dt, status string index
+
+def _put_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _get_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+def _to_epoch(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+def _to_ms(value):
+    """Epoch seconds or datetime as the integer milliseconds stored in records"""
+    return int(round(_to_epoch(value) * 1000))
+
+class _SegmentWriter:
+    """Appends delta-encoded records to one segment file"""
+
+    def __init__(self, path, coordinate_scale, block_records, blocks=None):
+        self.path = path
+        self.coordinate_scale = coordinate_scale
+        self.block_records = block_records
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        if new_file:
+            self.file.write(HEADER.pack(MAGIC, VERSION, coordinate_scale))
+        self.size = self.file.tell()
+        self.buffer = bytearray()
+        self.blocks = blocks if blocks is not None else []  # [offset, min_ts_ms, max_ts_ms]
+        self.block_count = self.block_records  # Force a keyframe on the first append
+        self.strings = {}
+        self.last_ts = 0
+        self.last_xy = {}
+
+    def append(self, kind, driver_id, value, ts_ms):
+        buffer = self.buffer
+        if self.block_count >= self.block_records:
+            # Start a self-contained block
+            self.blocks.append([self.size + len(buffer), ts_ms, ts_ms])
+            self.block_count = 0
+            self.strings = {}
+            self.last_xy = {}
+            self.last_ts = ts_ms
+            buffer.append(REC_KEYFRAME)
+            _put_varint(buffer, ts_ms)
+
+        block = self.blocks[-1]
+        if ts_ms < block[1]:
+            block[1] = ts_ms
+        if ts_ms > block[2]:
+            block[2] = ts_ms
+
+        driver = self._string(driver_id)
+        dt = _zigzag(ts_ms - self.last_ts)
+        self.last_ts = ts_ms
+
+        if kind == 'status':
+            status = self._string(str(value))
+            buffer.append(REC_STATUS)
+            _put_varint(buffer, driver)
+            _put_varint(buffer, dt)
+            _put_varint(buffer, status)
+        elif (isinstance(value, (tuple, list)) and len(value) == 2
+              and all(isinstance(v, (int, float)) for v in value)):
+            x = int(round(value[0] * self.coordinate_scale))
+            y = int(round(value[1] * self.coordinate_scale))
+            last_x, last_y = self.last_xy.get(driver, (0, 0))
+            self.last_xy[driver] = (x, y)
+            buffer.append(REC_XY)
+            _put_varint(buffer, driver)
+            _put_varint(buffer, dt)
+            _put_varint(buffer, _zigzag(x - last_x))
+            _put_varint(buffer, _zigzag(y - last_y))
+        else:
+            node = self._string(str(value))
+            buffer.append(REC_NODE)
+            _put_varint(buffer, driver)
+            _put_varint(buffer, dt)
+            _put_varint(buffer, node)
+
+        self.block_count += 1
+
+    def _string(self, text):
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+            encoded = text.encode('utf-8')
+            self.buffer.append(REC_STRING)
+            _put_varint(self.buffer, index)
+            _put_varint(self.buffer, len(encoded))
+            self.buffer.extend(encoded)
+        return index
+
+    def flush(self, fsync=False):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.size += len(self.buffer)
+            self.buffer = bytearray()
+        self.file.flush()
+        if fsync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def write_index(self):
+        _write_index(self.path, self.size, self.blocks)
+
+def _index_path(segment_path):
+    return segment_path[:-len('.wal')] + '.idx'
+
+def _write_index(segment_path, size, blocks):
+    temp_path = _index_path(segment_path) + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump({'size': size, 'blocks': blocks}, file)
+    os.replace(temp_path, _index_path(segment_path))
+
+def _decode(data, start, end, scale):
+    """Yield (ts_ms, driver_id, kind, value, next_pos) for records in data[start:end]"""
+    pos = start
+    strings = []
+    last_ts = 0
+    last_xy = {}
+    while pos < end:
+        record = data[pos]
+        pos += 1
+        if record == REC_KEYFRAME:
+            last_ts, pos = _get_varint(data, pos)
+            strings = []
+            last_xy = {}
+        elif record == REC_STRING:
+            _, pos = _get_varint(data, pos)
+            length, pos = _get_varint(data, pos)
+            if pos + length > end:
+                raise IndexError("truncated string record")
+            strings.append(bytes(data[pos:pos + length]).decode('utf-8'))
+            pos += length
+        else:
+            driver, pos = _get_varint(data, pos)
+            dt, pos = _get_varint(data, pos)
+            last_ts += _unzigzag(dt)
+            if record == REC_XY:
+                dx, pos = _get_varint(data, pos)
+                dy, pos = _get_varint(data, pos)
+                last_x, last_y = last_xy.get(driver, (0, 0))
+                x = last_x + _unzigzag(dx)
+                y = last_y + _unzigzag(dy)
+                last_xy[driver] = (x, y)
+                yield last_ts, strings[driver], 'location', (x / scale, y / scale), pos
+            elif record == REC_NODE:
+                value, pos = _get_varint(data, pos)
+                yield last_ts, strings[driver], 'location', strings[value], pos
+            elif record == REC_STATUS:
+                value, pos = _get_varint(data, pos)
+                yield last_ts, strings[driver], 'status', strings[value], pos
+            else:
+                raise ValueError(f"Unknown record type {record}")
+
+def _scan(data, start, end):
+    """Find block boundaries and time ranges; returns (blocks, end of last intact record)"""
+    blocks = []
+    pos = start
+    good_end = start
+    last_ts = 0
+    try:
+        while pos < end:
+            record = data[pos]
+            pos += 1
+            if record == REC_KEYFRAME:
+                last_ts, pos = _get_varint(data, pos)
+                blocks.append([good_end, last_ts, last_ts])
+            elif not blocks:
+                break
+            elif record == REC_STRING:
+                _, pos = _get_varint(data, pos)
+                length, pos = _get_varint(data, pos)
+                pos += length
+                if pos > end:
+                    break
+            elif record in (REC_XY, REC_NODE, REC_STATUS):
+                _, pos = _get_varint(data, pos)
+                dt, pos = _get_varint(data, pos)
+                for _ in range(2 if record == REC_XY else 1):
+                    _, pos = _get_varint(data, pos)
+                if pos > end:
+                    break
+                last_ts += _unzigzag(dt)
+                block = blocks[-1]
+                block[1] = min(block[1], last_ts)
+                block[2] = max(block[2], last_ts)
+            else:
+                break
+            good_end = pos
+    except IndexError:
+        pass
+    return blocks, good_end
+
+class TrackingLog:
+    """
+    Append-only binary write-ahead log of driver location and status events.
+
+    Events are written to size-capped segment files as delta-encoded records
+    (varint timestamps and coordinate deltas, per-block string tables). Each
+    sealed segment has a small sidecar index of block time ranges, so
+    time-range queries mmap the segment and decode only the blocks that
+    overlap. Sealed segments are periodically compacted into one, dropping
+    events past the retention window and repeated identical positions.
+
+    Records are buffered and written as a group once flush_every have
+    accumulated or flush_interval seconds have passed since the last write,
+    so a crash loses at most that much; fsync=True also syncs each write.
+    A background thread flushes a buffer left behind when traffic stops,
+    and compaction after a rotation runs on its own thread. A query running
+    while a compaction publishes its result may miss the merged events.
+    """
+
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024, block_records=1024,
+                 coordinate_scale=100.0, retention_seconds=None, compact_after=8,
+                 flush_every=64, flush_interval=1.0, fsync=False, clock=time.time):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.block_records = block_records
+        self.coordinate_scale = coordinate_scale
+        self.retention_seconds = retention_seconds
+        self.compact_after = compact_after
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.clock = clock
+        self.pending = 0
+        self.last_flush = clock()
+        self._lock = threading.RLock()  # Writer, segment map and buffer
+        self._compactor = None
+        self._compact_lock = threading.Lock()  # One compaction at a time
+        self._closed = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._finish_compaction()
+
+        self.segments = {}  # path: [[offset, min_ts_ms, max_ts_ms], ...]
+        for name in sorted(os.listdir(directory)):
+            if name.startswith('segment_') and name.endswith('.wal'):
+                path = os.path.join(directory, name)
+                self.segments[path] = self._load_index(path)
+
+        if self.segments:
+            # Keep appending to the newest segment; new data starts a fresh block
+            active = list(self.segments)[-1]
+            self.next_seq = int(os.path.basename(active)[8:-4]) + 1
+            self.writer = _SegmentWriter(active, self._scale_of(active), block_records,
+                                         self.segments[active])
+        else:
+            self.next_seq = 0
+            self.writer = self._new_writer()
+
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, name='tracking-log-flush', daemon=True)
+            self._flusher.start()
+
+    def append_location(self, driver_id, location, timestamp=None):
+        self._append('location', driver_id, location, timestamp)
+
+    def append_status(self, driver_id, status, timestamp=None):
+        self._append('status', driver_id, status, timestamp)
+
+    def _append(self, kind, driver_id, value, timestamp):
+        now = self.clock()
+        ts_ms = _to_ms(now if timestamp is None else timestamp)
+        with self._lock:
+            self.writer.append(kind, str(driver_id), value, ts_ms)
+            self.pending += 1
+            if self.pending >= self.flush_every or now - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """Write buffered records to disk (group commit)"""
+        with self._lock:
+            self.writer.flush(self.fsync)
+            self.pending = 0
+            self.last_flush = self.clock()
+            if self.writer.size >= self.segment_bytes:
+                self._rotate()
+
+    def flush_if_due(self):
+        """Flush records that have waited flush_interval seconds; returns whether it flushed"""
+        with self._lock:
+            if not self.pending or self.clock() - self.last_flush < self.flush_interval:
+                return False
+            self.flush()
+            return True
+
+    def _flush_loop(self):
+        # Check twice per interval so nothing waits much past its deadline
+        while not self._closed.wait(self.flush_interval / 2):
+            self.flush_if_due()
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self.writer.close()
+            self.writer.write_index()
+
+    def _new_writer(self):
+        path = os.path.join(self.directory, f"segment_{self.next_seq:08d}.wal")
+        self.next_seq += 1
+        writer = _SegmentWriter(path, self.coordinate_scale, self.block_records)
+        self.segments[path] = writer.blocks
+        return writer
+
+    def _rotate(self):
+        self.writer.close()
+        self.writer.write_index()
+        self.writer = self._new_writer()
+        if len(self.segments) - 1 >= self.compact_after:
+            self._compact_in_background()
+
+    def _compact_in_background(self):
+        """Start compact() on a worker thread unless one is already running"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name='tracking-log-compact', daemon=True)
+        self._compactor.start()
+
+    def _finish_compaction(self):
+        """Complete or roll back a compaction interrupted by a crash"""
+        manifest = os.path.join(self.directory, COMPACTION_MANIFEST)
+        try:
+            with open(manifest) as file:
+                journal = json.load(file)
+        except (OSError, ValueError):
+            return
+        temp_path = os.path.join(self.directory, journal['target']) + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)  # Never published: the originals are intact
+        else:
+            for name in journal['merged']:
+                path = os.path.join(self.directory, name)
+                for leftover in (path, _index_path(path)):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+        os.remove(manifest)
+
+    def _scale_of(self, path):
+        with open(path, 'rb') as file:
+            header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return self.coordinate_scale
+        magic, version, scale = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a tracking log segment: {path}")
+        return scale
+
+    def _load_index(self, path):
+        """Read a segment's sidecar index, rebuilding it (and dropping a torn tail) if stale"""
+        size = os.path.getsize(path)
+        try:
+            with open(_index_path(path)) as file:
+                index = json.load(file)
+            if index['size'] == size:
+                return index['blocks']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        blocks = []
+        good_end = HEADER.size
+        if size > HEADER.size:
+            self._scale_of(path)
+            with open(path, 'rb') as file:
+                blocks, good_end = _scan(file.read(), HEADER.size, size)
+
+        if good_end < size:
+            with open(path, 'r+b') as file:
+                file.truncate(good_end)
+        return blocks
+
+    def _read_segment(self, path, start_ms=None, end_ms=None):
+        """Yield events from a segment, decoding only blocks overlapping the range"""
+        # Take the block list and open the file together, so a compaction
+        # replacing the segment cannot pair one's index with the other's data
+        with self._lock:
+            if path == self.writer.path:
+                self.writer.flush()
+            blocks = list(self.segments.get(path, []))
+            if not blocks:
+                return  # Empty, or merged away since the caller listed it
+            size = os.path.getsize(path)
+            if size <= HEADER.size:
+                return
+            scale = self._scale_of(path)
+            file = open(path, 'rb')
+        with file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for i, (offset, min_ts, max_ts) in enumerate(blocks):
+                    if start_ms is not None and max_ts < start_ms:
+                        continue
+                    if end_ms is not None and min_ts > end_ms:
+                        continue
+                    block_end = blocks[i + 1][0] if i + 1 < len(blocks) else size
+                    for ts, driver_id, kind, value, _ in _decode(data, offset, block_end, scale):
+                        yield ts, driver_id, kind, value
+
+    def query(self, start=None, end=None, driver_ids=None):
+        """
+        Yield (timestamp, driver_id, kind, value) events with start <= timestamp <= end.
+        Times are epoch seconds or datetimes; kind is 'location' or 'status'.
+        """
+        start_ms = None if start is None else _to_ms(start)
+        end_ms = None if end is None else _to_ms(end)
+        wanted = set(driver_ids) if driver_ids is not None else None
+
+        with self._lock:
+            paths = list(self.segments)
+        for path in paths:
+            for ts, driver_id, kind, value in self._read_segment(path, start_ms, end_ms):
+                if start_ms is not None and ts < start_ms:
+                    continue
+                if end_ms is not None and ts > end_ms:
+                    continue
+                if wanted is not None and driver_id not in wanted:
+                    continue
+                yield ts / 1000.0, driver_id, kind, value
+
+    def trajectory(self, driver_id, start=None, end=None):
+        """List of (timestamp, location) for one driver"""
+        return [(ts, value) for ts, _, kind, value in self.query(start, end, [driver_id])
+                if kind == 'location']
+
+    def replay(self, tracking_service=None):
+        """
+        Rebuild the latest known state of every driver from the log.
+        If a tracking service is given, the state is loaded into it.
+        """
+        state = {}
+        for ts, driver_id, kind, value in self.query():
+            info = state.setdefault(driver_id, {'location': None, 'status': 'active'})
+            info[kind] = value
+            info['timestamp'] = ts
+
+        if tracking_service is not None:
+            # Do not write the replayed events back into the log
+            event_log = tracking_service.event_log
+            tracking_service.event_log = None
+            try:
+                tracking_service.update_driver_locations([
+                    (driver_id, info['location'], info['status'])
+                    for driver_id, info in state.items()
+                    if info['location'] is not None and info['status'] != 'removed'
+                ])
+            finally:
+                tracking_service.event_log = event_log
+        return state
+
+    def compact(self):
+        """
+        Merge all sealed segments into one compact segment. Sealed segments
+        are immutable, so only publishing the result holds the lock.
+        """
+        with self._compact_lock:
+            self._compact()
+            # Rotations during the merge were skipped; catch up on them
+            while not self._closed.is_set() and len(self.segments) - 1 >= max(self.compact_after, 2):
+                self._compact()
+
+    def _compact(self):
+        with self._lock:
+            sealed = [path for path in self.segments if path != self.writer.path]
+        if not sealed:
+            return
+
+        cutoff_ms = None
+        if self.retention_seconds is not None:
+            cutoff_ms = _to_ms(self.clock() - self.retention_seconds)
+
+        target = sealed[0]
+        temp_path = target + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        writer = _SegmentWriter(temp_path, self.coordinate_scale, self.block_records * 4)
+
+        last_location = {}
+        for path in sealed:
+            for ts, driver_id, kind, value in self._read_segment(path):
+                if cutoff_ms is not None and ts < cutoff_ms:
+                    continue
+                if kind == 'location':
+                    # A stationary driver only needs its first report kept
+                    if last_location.get(driver_id) == value:
+                        continue
+                    last_location[driver_id] = value
+                else:
+                    last_location.pop(driver_id, None)
+                writer.append(kind, driver_id, value, ts)
+        writer.flush(fsync=True)
+        writer.file.close()
+
+        with self._lock:
+            # Journal the segments the merged one replaces before publishing it:
+            # a crash after the rename then finishes the deletes on reopen
+            # instead of replaying their events twice
+            manifest = os.path.join(self.directory, COMPACTION_MANIFEST)
+            with open(manifest + '.tmp', 'w') as file:
+                json.dump({'target': os.path.basename(target),
+                           'merged': [os.path.basename(path) for path in sealed[1:]]}, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(manifest + '.tmp', manifest)
+            if os.path.exists(_index_path(target)):
+                os.remove(_index_path(target))
+            os.replace(temp_path, target)
+            _write_index(target, writer.size, writer.blocks)
+            self._finish_compaction()
+
+            segments = {target: writer.blocks}
+            for path, blocks in self.segments.items():
+                if path not in sealed:
+                    segments[path] = blocks
+            self.segments = segments
@@ -1,27 +1,93 @@
 from datetime import datetime
+import time
+
+from services.location_pubsub import LocationBroker
+from utils.timing_wheel import TimingWheel
 
 class TrackingService:
-    def __init__(self):
+    def __init__(self, ttl_seconds=60, clock=time.monotonic, event_log=None):
         self.drivers = {}
+        self.graph = None
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        # Drivers are rescheduled on every report, so going stale costs O(1)
+        self.expiry_wheel = TimingWheel(tick=1.0, start=clock())
+        self.expiry_listeners = []
+        self.broker = None  # Created on first subscribe()
+        self.event_log = event_log  # Optional TrackingLog recording history
+
+    # The event log is written before the in-memory state changes, so the
+    # state never holds an update the log could lose
 
     def add_driver(self, driver_id, initial_location):
+        if self.event_log is not None:
+            self.event_log.append_location(driver_id, initial_location)
+            self.event_log.append_status(driver_id, 'active')
         self.drivers[driver_id] = {
             'location': initial_location,
             'status': 'active',
             'last_update': datetime.now()
         }
+        self._touch(driver_id)
+        self._publish(driver_id)
+
+    def remove_driver(self, driver_id):
+        if driver_id in self.drivers:
+            if self.event_log is not None:
+                self.event_log.append_status(driver_id, 'removed')
+            self.expiry_wheel.cancel(driver_id)
+            info = self.drivers.pop(driver_id)
+            if self.broker is not None:
+                self.broker.publish(driver_id, dict(info, status='removed'))
+        else:
+            raise ValueError("Driver ID not found.")
 
     def update_driver_location(self, driver_id, new_location):
         if driver_id in self.drivers:
+            if self.event_log is not None:
+                self.event_log.append_location(driver_id, new_location)
             self.drivers[driver_id]['location'] = new_location
             self.drivers[driver_id]['last_update'] = datetime.now()
+            # A fresh position report brings an expired driver back online
+            if self.drivers[driver_id]['status'] == 'inactive':
+                self.drivers[driver_id]['status'] = 'active'
+            self._touch(driver_id)
+            self._publish(driver_id)
         else:
             raise ValueError("Driver ID not found.")
 
+    def update_driver_locations(self, updates):
+        """Apply a batch of (driver_id, location, status) updates, registering unknown drivers"""
+        now = self.clock()
+        timestamp = datetime.now()
+        self.expire_stale_drivers(now)
+
+        deadline = now + self.ttl_seconds
+        for driver_id, location, status in updates:
+            if self.event_log is not None:
+                self.event_log.append_location(driver_id, location)
+                if status is not None:
+                    self.event_log.append_status(driver_id, status)
+            info = self.drivers.get(driver_id)
+            if info is None:
+                info = self.drivers[driver_id] = {'location': location, 'status': 'active'}
+            info['location'] = location
+            if status is not None:
+                info['status'] = status
+            elif info['status'] == 'inactive':
+                info['status'] = 'active'
+            info['last_update'] = timestamp
+            self.expiry_wheel.schedule(driver_id, deadline)
+            self._publish(driver_id)
+
     def update_driver_status(self, driver_id, status):
         if driver_id in self.drivers:
+            if self.event_log is not None:
+                self.event_log.append_status(driver_id, status)
             self.drivers[driver_id]['status'] = status
             self.drivers[driver_id]['last_update'] = datetime.now()
+            self._touch(driver_id)
+            self._publish(driver_id)
         else:
             raise ValueError("Driver ID not found.")
 
@@ -32,4 +98,82 @@ class TrackingService:
             raise ValueError("Driver ID not found.")
 
     def get_all_drivers(self):
-        return self.drivers
\ No newline at end of file
+        return self.drivers
+
+    def subscribe(self, driver_ids=None, region=None, max_pending=1000, callback=None):
+        """
+        Subscribe to coalesced driver updates for a set of drivers and/or a
+        region (x_min, y_min, x_max, y_max). The subscription starts with the
+        current state of matching drivers; consumers call poll() at their own pace.
+        """
+        if self.broker is None:
+            self.broker = LocationBroker(self.graph, clock=self.clock)
+        return self.broker.subscribe(driver_ids, region, max_pending, callback, initial=self.drivers)
+
+    def unsubscribe(self, subscription):
+        if self.broker is not None:
+            self.broker.unsubscribe(subscription)
+
+    def start_tracking(self, graph, host='127.0.0.1', port=8765):
+        """Run the location ingestion server until interrupted"""
+        import asyncio
+        from services.ingestion_server import LocationIngestServer
+
+        self.graph = graph
+        if self.broker is not None:
+            self.broker.graph = graph
+        server = LocationIngestServer(self, host=host, port=port, graph=graph)
+        print(f"Tracking server listening on {host}:{port}")
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            print("Tracking server stopped")
+
+    def get_active_drivers(self):
+        """Get drivers that have reported within the TTL"""
+        self.expire_stale_drivers()
+        return {driver_id: info for driver_id, info in self.drivers.items()
+                if info['status'] != 'inactive'}
+
+    def is_driver_active(self, driver_id):
+        """Check whether a driver is known and has not gone stale"""
+        self.expire_stale_drivers()
+        info = self.drivers.get(driver_id)
+        return info is not None and info['status'] != 'inactive'
+
+    def add_expiry_listener(self, callback):
+        """Register callback(driver_id, info) to run when a driver goes stale"""
+        self.expiry_listeners.append(callback)
+
+    def remove_expiry_listener(self, callback):
+        if callback in self.expiry_listeners:
+            self.expiry_listeners.remove(callback)
+
+    def expire_stale_drivers(self, now=None):
+        """Mark drivers that missed their TTL as inactive and notify listeners"""
+        if now is None:
+            now = self.clock()
+
+        expired = []
+        for driver_id in self.expiry_wheel.advance(now):
+            info = self.drivers.get(driver_id)
+            if info is None:
+                continue
+            if self.event_log is not None:
+                self.event_log.append_status(driver_id, 'inactive')
+            info['status'] = 'inactive'
+            expired.append(driver_id)
+            for callback in self.expiry_listeners:
+                callback(driver_id, info)
+            self._publish(driver_id)
+
+        return expired
+
+    def _touch(self, driver_id):
+        now = self.clock()
+        self.expire_stale_drivers(now)
+        self.expiry_wheel.schedule(driver_id, now + self.ttl_seconds)
+
+    def _publish(self, driver_id):
+        if self.broker is not None:
+            self.broker.publish(driver_id, self.drivers[driver_id])
@@ -0,0 +1,37 @@
+import argparse
+import json
+import os
+import sys
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml.eta_lookup import accuracy_report
+from ml.time_predictor import TimePredictor
+
+def parse_resolutions(text):
+    """'5x11x3,9x21x5' -> [(5, 11, 3), (9, 21, 5)] as (prep, distance, rating) points"""
+    return [tuple(int(n) for n in part.split('x')) for part in text.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description="ETA lookup table accuracy against the model by grid resolution")
+    parser.add_argument('--resolutions', default='3x6x2,5x11x3,9x21x5,17x41x11',
+                        help="Comma separated PREPxDISTANCExRATING grid point counts")
+    parser.add_argument('--samples', type=int, default=2000, help="Random orders to compare on")
+    parser.add_argument('--data', help="Training CSV (defaults to the enhanced dataset)")
+    parser.add_argument('--json', action='store_true', help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    predictor = TimePredictor(args.data)
+    predictor.train()
+    rows = accuracy_report(predictor, parse_resolutions(args.resolutions), args.samples)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'grid':>10} {'cells':>9} {'MB':>7} {'build s':>8} {'MAE':>7} {'p95':>7} {'max':>7}  (minutes)")
+    for row in rows:
+        grid = 'x'.join(str(n) for n in row['resolution'])
+        print(f"{grid:>10} {row['cells']:>9} {row['megabytes']:>7} {row['build_seconds']:>8} "
+              f"{row['mae_minutes']:>7} {row['p95_error_minutes']:>7} {row['max_error_minutes']:>7}")
+
+if __name__ == '__main__':
+    main()
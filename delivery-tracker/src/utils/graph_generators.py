@@ -0,0 +1,128 @@
+import math
+import os
+import random
+import sys
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from models.graph import Graph
+
+# The GUI's grid puts intersections 150 px apart with 5 minute roads
+MINUTES_PER_UNIT = 5 / 150
+
+def _travel_time(graph, node1, node2, minutes_per_unit, rng=None, congestion=0.0):
+    a, b = graph.nodes[node1], graph.nodes[node2]
+    minutes = math.hypot(a['x'] - b['x'], a['y'] - b['y']) * minutes_per_unit
+    if rng is not None and congestion:
+        minutes *= 1 + rng.random() * congestion
+    return round(max(minutes, 0.01), 3)
+
+def grid_graph(rows, cols, spacing=150, minutes_per_unit=MINUTES_PER_UNIT,
+               jitter=0.0, congestion=0.0, seed=0):
+    """
+    Street grid like the GUI's create_grid, with integer node ids
+    (row * cols + col). jitter moves intersections by up to that fraction of
+    the spacing and congestion slows each road by up to that fraction, both
+    reproducibly from seed.
+    """
+    rng = random.Random(seed)
+    graph = Graph()
+    graph.add_nodes(
+        (row * cols + col, {
+            'x': col * spacing + (rng.uniform(-jitter, jitter) * spacing if jitter else 0),
+            'y': row * spacing + (rng.uniform(-jitter, jitter) * spacing if jitter else 0)
+        })
+        for row in range(rows) for col in range(cols))
+
+    def edges():
+        for row in range(rows):
+            for col in range(cols):
+                node = row * cols + col
+                if col + 1 < cols:
+                    yield node, node + 1, _travel_time(graph, node, node + 1, minutes_per_unit, rng, congestion)
+                if row + 1 < rows:
+                    yield node, node + cols, _travel_time(graph, node, node + cols, minutes_per_unit, rng, congestion)
+    graph.add_edges(edges())
+    return graph
+
+def linear_graph(count, spacing=120, minutes_per_unit=4 / 120):
+    """Chain of intersections like the GUI's create_linear"""
+    graph = Graph()
+    graph.add_nodes((i, {'x': i * spacing, 'y': 0}) for i in range(count))
+    graph.add_edges((i, i + 1, round(spacing * minutes_per_unit, 3)) for i in range(count - 1))
+    return graph
+
+def random_geometric_graph(count, average_degree=6, spacing=150,
+                           minutes_per_unit=MINUTES_PER_UNIT, seed=0):
+    """
+    Intersections scattered uniformly over a square with about `spacing`
+    between neighbours; every pair closer than the radius that gives the
+    requested average degree is joined by a road. Neighbours are found
+    through a bucket grid, so generation is linear in the node count.
+    """
+    rng = random.Random(seed)
+    side = math.sqrt(count) * spacing
+    radius = math.sqrt(average_degree * side * side / (count * math.pi)) if count else 0
+    graph = Graph()
+    graph.add_nodes((i, {'x': rng.uniform(0, side), 'y': rng.uniform(0, side)}) for i in range(count))
+
+    buckets = {}
+    for node, attrs in graph.nodes.items():
+        buckets.setdefault((int(attrs['x'] // radius), int(attrs['y'] // radius)), []).append(node)
+
+    def edges():
+        radius_squared = radius * radius
+        for (cx, cy), members in buckets.items():
+            for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+                others = buckets.get((cx + dx, cy + dy))
+                if not others:
+                    continue
+                for i, node in enumerate(members):
+                    a = graph.nodes[node]
+                    candidates = members[i + 1:] if (dx, dy) == (0, 0) else others
+                    for other in candidates:
+                        b = graph.nodes[other]
+                        if (a['x'] - b['x']) ** 2 + (a['y'] - b['y']) ** 2 <= radius_squared:
+                            yield node, other, _travel_time(graph, node, other, minutes_per_unit)
+    graph.add_edges(list(edges()))
+    return graph
+
+def scale_free_graph(count, edges_per_node=2, spacing=150,
+                     minutes_per_unit=MINUTES_PER_UNIT, seed=0):
+    """
+    Barabasi-Albert preferential attachment: each new intersection links to
+    edges_per_node existing ones chosen in proportion to their degree, giving
+    a few highly connected hubs. Nodes get random positions so travel times
+    still follow distance.
+    """
+    rng = random.Random(seed)
+    side = math.sqrt(max(count, 1)) * spacing
+    graph = Graph()
+    graph.add_nodes((i, {'x': rng.uniform(0, side), 'y': rng.uniform(0, side)}) for i in range(count))
+
+    seeds = min(edges_per_node + 1, count)
+    edge_list = [(i, j) for i in range(seeds) for j in range(i + 1, seeds)]
+    # Each node appears once per incident edge, so a uniform pick is degree-weighted
+    endpoints = [node for edge in edge_list for node in edge]
+    for node in range(seeds, count):
+        chosen = set()
+        while len(chosen) < edges_per_node:
+            chosen.add(rng.choice(endpoints))
+        for other in chosen:
+            edge_list.append((node, other))
+            endpoints.extend((node, other))
+    graph.add_edges((a, b, _travel_time(graph, a, b, minutes_per_unit)) for a, b in edge_list)
+    return graph
+
+GENERATORS = {
+    'grid': lambda size, seed: grid_graph(int(math.sqrt(size)), int(math.sqrt(size)), jitter=0.2,
+                                          congestion=0.5, seed=seed),
+    'geometric': lambda size, seed: random_geometric_graph(size, seed=seed),
+    'scale_free': lambda size, seed: scale_free_graph(size, seed=seed),
+}
+
+def generate(kind, size, seed=0):
+    """Build a graph of about `size` nodes with one of the GENERATORS"""
+    if kind not in GENERATORS:
+        raise ValueError(f"Unknown graph kind: {kind}")
+    return GENERATORS[kind](size, seed)
@@ -10,7 +10,6 @@ from sklearn.ensemble import RandomForestClassifier
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from models.graph import Graph
-from algorithms.routing import Routing
 
 class ImageMapCreator:
     def __init__(self, parent_gui=None):
@@ -758,7 +757,7 @@ class ImageMapCreator:
                         self.parent_gui.graph.add_edge(node1, node2, weight)
             
             # Update routing and refresh displays
-            self.parent_gui.routing = Routing(self.parent_gui.graph)
+            self.parent_gui.graph_changed()
             
             self.parent_gui.update_location_combos()
             self.parent_gui.draw_graph()
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from services.ingestion_server import LocationIngestServer
+from services.tracking_service import TrackingService
+from utils.graph_generators import grid_graph
+from utils.stats import percentile
+
+class SimulatedDriver:
+    """A driver that wanders along graph edges at a fixed speed"""
+
+    def __init__(self, driver_id, graph, rng, speed=1.0):
+        self.driver_id = driver_id
+        self.graph = graph
+        self.rng = rng
+        self.speed = speed  # Edge weight units per second
+        self.current = rng.choice(list(graph.nodes))
+        self.target = self._pick_next()
+        self.progress = 0.0
+
+    def _pick_next(self):
+        neighbors = self.graph.get_neighbors(self.current)
+        return self.rng.choice(neighbors) if neighbors else self.current
+
+    def step(self, dt):
+        """Advance along the current edge and return the interpolated [x, y]"""
+        if self.target != self.current:
+            weight = self.graph.get_edge_weight(self.current, self.target) or 1
+            self.progress += self.speed * dt / weight
+            while self.progress >= 1.0 and self.target != self.current:
+                self.progress -= 1.0
+                self.current, self.target = self.target, None
+                self.target = self._pick_next()
+
+        start = self.graph.nodes[self.current]
+        end = self.graph.nodes[self.target]
+        t = min(self.progress, 1.0)
+        return [start.get('x', 0) + (end.get('x', 0) - start.get('x', 0)) * t,
+                start.get('y', 0) + (end.get('y', 0) - start.get('y', 0)) * t]
+
+async def _run_connection(host, port, drivers, rate_hz, duration, send_stalls):
+    reader, writer = await asyncio.open_connection(host, port)
+    interval = 1.0 / rate_hz
+    sent = 0
+    deadline = time.perf_counter() + duration
+    next_tick = time.perf_counter()
+
+    while time.perf_counter() < deadline:
+        now = time.time()
+        lines = []
+        for driver in drivers:
+            location = driver.step(interval)
+            lines.append(json.dumps({'driver_id': driver.driver_id, 'location': location, 'ts': now}))
+        writer.write(("\n".join(lines) + "\n").encode())
+
+        # Time spent blocked here is the backpressure the server applies
+        stall_start = time.perf_counter()
+        await writer.drain()
+        send_stalls.append(time.perf_counter() - stall_start)
+        sent += len(lines)
+
+        next_tick += interval
+        await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return sent, stats
+
+async def run_load(graph, n_drivers=1000, rate_hz=1.0, duration=10.0, connections=4,
+                   host='127.0.0.1', port=8765, seed=42):
+    """
+    Simulate n_drivers reporting at rate_hz over the given number of connections
+    and return throughput plus client- and server-side latency figures.
+    """
+    rng = random.Random(seed)
+    drivers = [SimulatedDriver(f"SIM{i:05d}", graph, rng, speed=rng.uniform(0.5, 2.0))
+               for i in range(n_drivers)]
+    groups = [drivers[i::connections] for i in range(connections)]
+    send_stalls = []
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        _run_connection(host, port, group, rate_hz, duration, send_stalls)
+        for group in groups if group
+    ])
+    elapsed = time.perf_counter() - started
+
+    total_sent = sum(sent for sent, _ in results)
+    # Every connection sees the same server; the last snapshot is the most complete
+    server_stats = results[-1][1] if results else {}
+    stalls = sorted(send_stalls)
+
+    return {
+        'drivers': n_drivers,
+        'connections': len(results),
+        'duration_s': round(elapsed, 3),
+        'sent_total': total_sent,
+        'sent_per_second': round(total_sent / elapsed, 1) if elapsed else 0,
+        'send_stall_ms': {
+            'p50': round(percentile(stalls, 0.50) * 1000, 3),
+            'p99': round(percentile(stalls, 0.99) * 1000, 3),
+        },
+        'server': server_stats
+    }
+
+async def _run_local(args, graph):
+    server = LocationIngestServer(TrackingService(), host=args.host, port=0,
+                                  batch_size=args.batch_size, max_queue=args.max_queue)
+    await server.start()
+    try:
+        return await run_load(graph, args.drivers, args.rate, args.duration,
+                              args.connections, args.host, server.port, args.seed)
+    finally:
+        await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Location ingestion load generator")
+    parser.add_argument('--drivers', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=1.0, help="Reports per driver per second")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--connections', type=int, default=4)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--grid', type=int, default=20, help="Grid size when no map is given")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--local', action='store_true',
+                        help="Start an in-process server instead of connecting to a running one")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--max-queue', type=int, default=10000)
+    args = parser.parse_args()
+
+    graph = grid_graph(args.grid, args.grid)
+    if args.local:
+        report = asyncio.run(_run_local(args, graph))
+    else:
+        report = asyncio.run(run_load(graph, args.drivers, args.rate, args.duration,
+                                      args.connections, args.host, args.port, args.seed))
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from services.map_service import MapService
+
+def write_grid_map(path, rows, cols, spacing=100, travel_time=5, ndjson=False):
+    """Write a synthetic grid map in the JSON (or NDJSON) map format"""
+    def intersections():
+        for row in range(rows):
+            for col in range(cols):
+                yield {'id': f"N{row}_{col}", 'location': {'x': col * spacing, 'y': row * spacing}}
+
+    def roads():
+        for row in range(rows):
+            for col in range(cols):
+                if col + 1 < cols:
+                    yield {'start': f"N{row}_{col}", 'end': f"N{row}_{col + 1}", 'travel_time': travel_time}
+                if row + 1 < rows:
+                    yield {'start': f"N{row}_{col}", 'end': f"N{row + 1}_{col}", 'travel_time': travel_time}
+
+    with open(path, 'w') as file:
+        if ndjson:
+            for item in intersections():
+                file.write(json.dumps(dict(item, kind='intersection')) + "\n")
+            for item in roads():
+                file.write(json.dumps(dict(item, kind='road')) + "\n")
+        else:
+            file.write('{"intersections": [')
+            file.write(', '.join(json.dumps(item) for item in intersections()))
+            file.write('], "roads": [')
+            file.write(', '.join(json.dumps(item) for item in roads()))
+            file.write(']}')
+
+def measure(load):
+    """
+    Return (seconds, peak traced bytes, graph) for load(). Time and memory
+    come from separate runs because tracemalloc slows allocation down a lot.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    graph = load()
+    elapsed = time.perf_counter() - start
+    del graph
+
+    gc.collect()
+    tracemalloc.start()
+    graph = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, graph
+
+def run_benchmark(rows, cols, directory):
+    json_path = os.path.join(directory, 'map.json')
+    ndjson_path = os.path.join(directory, 'map.ndjson')
+    write_grid_map(json_path, rows, cols)
+    write_grid_map(ndjson_path, rows, cols, ndjson=True)
+
+    def json_load():
+        service = MapService(json_path, cache_dir=None)
+        with open(json_path) as file:
+            return service.build_graph(json.load(file))
+
+    loaders = [
+        ('json.load + build_graph', json_load),
+        ('streaming JSON', lambda: MapService(json_path, cache_dir=None).stream_graph()),
+        ('streaming NDJSON', lambda: MapService(ndjson_path, cache_dir=None).stream_graph()),
+    ]
+    results = []
+    for name, load in loaders:
+        elapsed, peak, graph = measure(load)
+        results.append({
+            'loader': name,
+            'seconds': round(elapsed, 3),
+            'peak_mb': round(peak / 1e6, 1),
+            'nodes': graph.get_node_count(),
+            'edges': graph.get_edge_count()
+        })
+        del graph
+    return {'file_mb': round(os.path.getsize(json_path) / 1e6, 1), 'results': results}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare map loading time and peak memory")
+    parser.add_argument('--rows', type=int, default=300)
+    parser.add_argument('--cols', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = run_benchmark(args.rows, args.cols, directory)
+
+    print(f"{args.rows}x{args.cols} grid, {report['file_mb']} MB JSON")
+    for result in report['results']:
+        print(f"  {result['loader']:<24} {result['seconds']:>7.3f}s  peak {result['peak_mb']:>7.1f} MB  "
+              f"({result['nodes']} nodes, {result['edges']} edges)")
+
+if __name__ == '__main__':
+    main()
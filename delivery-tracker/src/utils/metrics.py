@@ -0,0 +1,272 @@
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, from 50 microseconds to 10 seconds
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    """Monotonic count, such as calls or items processed"""
+
+    kind = 'counter'
+
+    def __init__(self, registry, name, help=''):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return {'type': self.kind, 'value': self.value}
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+class Histogram:
+    """
+    Observations counted into fixed buckets (upper bounds, plus an implicit
+    +Inf), with their sum and count, so percentiles can be estimated without
+    keeping samples
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help='', buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if not self.registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the seconds spent inside it"""
+        return Timer(self)
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'type': self.kind,
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.sum = 0.0
+            self.count = 0
+
+class Timer:
+    """
+    Times a block into a histogram, as a context manager or a decorator.
+    When the registry is disabled it skips the clock entirely.
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter() if self.histogram.registry.enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self._started is not None:
+            self.histogram.observe(time.perf_counter() - self._started)
+
+    def __call__(self, func):
+        histogram = self.histogram
+        registry = histogram.registry
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+
+class MetricsRegistry:
+    """
+    Named counters and histograms for the hot paths (routing, assignment,
+    prediction, map loading).
+
+    Metrics are created once, usually at import time, and updated in place.
+    While the registry is disabled every update returns after one attribute
+    check, so instrumentation can stay in production code.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.metrics = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _get(self, cls, name, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(self, name, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help=''):
+        return self._get(Counter, name, help=help)
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help=help, buckets=buckets)
+
+    def timer(self, name, help=''):
+        """Timer (decorator or context manager) for the histogram `name`, in seconds"""
+        return Timer(self.histogram(name, help=help))
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        for metric in list(self.metrics.values()):
+            metric.reset()
+        self.started = time.time()
+
+    def snapshot(self):
+        return {
+            'enabled': self.enabled,
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'metrics': {name: metric.snapshot() for name, metric in sorted(self.metrics.items())},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if metric.kind == 'counter':
+                lines.append(f"{name} {metric.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, metric.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {metric.count}')
+            lines.append(f"{name}_sum {metric.sum}")
+            lines.append(f"{name}_count {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, format=None):
+        """
+        Write a snapshot to path, atomically, as JSON or Prometheus text
+        (picked from the .prom extension unless format is given)
+        """
+        format = format or ('prometheus' if path.endswith('.prom') else 'json')
+        text = self.to_prometheus() if format == 'prometheus' else self.to_json()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+
+    def serve(self, host='127.0.0.1', port=9102):
+        """
+        Serve /metrics (Prometheus text) and /metrics.json from a daemon
+        thread; returns the server, whose server_address has the real port
+        when started with port=0
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = registry.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.stop_server()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def stop_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+# Process-wide registry used by the instrumented modules. Off unless
+# DELIVERY_TRACKER_METRICS is set or something calls registry.enable().
+registry = MetricsRegistry(enabled=os.environ.get('DELIVERY_TRACKER_METRICS', '') not in ('', '0'))
+
+def counter(name, help=''):
+    return registry.counter(name, help)
+
+def histogram(name, help='', buckets=DEFAULT_BUCKETS):
+    return registry.histogram(name, help, buckets)
+
+def timer(name, help=''):
+    return registry.timer(name, help)
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml.time_predictor import TimePredictor
+
+def make_orders(count, seed=0):
+    """Random orders as predict_batch keyword arrays"""
+    rng = np.random.default_rng(seed)
+    return {
+        'cuisine': rng.choice(['Italian', 'Chinese', 'Indian', 'Mexican', 'Japanese', 'American'], count),
+        'base_prep_time': rng.integers(10, 40, count).astype(float),
+        'distance': rng.uniform(1, 15, count).round(2),
+        'traffic_level': rng.choice(['Low', 'Medium', 'High', 'Jam'], count),
+        'weather': rng.choice(['Clear', 'Rain', 'Fog', 'Snow'], count),
+        'time_of_day': rng.choice(['Breakfast', 'Lunch', 'Afternoon', 'Dinner', 'Late Night'], count),
+        'driver_rating': rng.uniform(3, 5, count).round(1),
+    }
+
+def run_benchmark(batch_size=10000, single_calls=500, data_path=None):
+    predictor = TimePredictor(data_path)
+    predictor.train()
+    orders = make_orders(batch_size)
+
+    # Warm both paths before timing
+    predictor.predict('Italian', 20, 5.0)
+    predictor.predict_batch(**{name: values[:10] for name, values in orders.items()})
+
+    singles = [tuple(orders[name][i % batch_size] for name in orders) for i in range(single_calls)]
+    start = time.perf_counter()
+    for order in singles:
+        predictor.predict(*order)
+    single_seconds = (time.perf_counter() - start) / single_calls
+
+    # Dispatch re-scores the same orders: the second pass hits the memo cache
+    cache = predictor.use_prediction_cache()
+    for order in singles:
+        predictor.predict(*order)
+    start = time.perf_counter()
+    for order in singles:
+        predictor.predict(*order)
+    cached_seconds = (time.perf_counter() - start) / single_calls
+    predictor.use_prediction_cache(False)
+
+    start = time.perf_counter()
+    predictor.predict_batch(**orders)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        'single_ms': round(single_seconds * 1000, 3),
+        'cached_single_ms': round(cached_seconds * 1000, 4),
+        'cache_hit_rate': cache.stats()['hit_rate'],
+        'batch_size': batch_size,
+        'batch_ms': round(batch_seconds * 1000, 3),
+        'batch_per_prediction_us': round(batch_seconds / batch_size * 1e6, 3),
+        'loop_estimate_ms': round(single_seconds * batch_size * 1000, 1),
+        'speedup': round(single_seconds * batch_size / batch_seconds, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Single vs batched TimePredictor latency")
+    parser.add_argument('--batch', type=int, default=10000, help="Orders in the batched call")
+    parser.add_argument('--single', type=int, default=500, help="Single predict() calls to time")
+    parser.add_argument('--data', help="Training CSV (defaults to the enhanced dataset)")
+    parser.add_argument('--json', action='store_true', help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.batch, args.single, args.data)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"predict():       {report['single_ms']:.3f} ms per order, "
+          f"{report['cached_single_ms']:.4f} ms when cached (hit rate {report['cache_hit_rate']:.0%})")
+    print(f"predict_batch(): {report['batch_ms']:.1f} ms for {report['batch_size']} orders "
+          f"({report['batch_per_prediction_us']:.2f} us per order)")
+    print(f"{report['batch_size']} single calls would take ~{report['loop_estimate_ms']:.0f} ms; "
+          f"batching is {report['speedup']}x faster")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from algorithms.routing import Routing
+from utils.graph_generators import grid_graph
+
+def make_pairs(graph, sources, targets_per_source, seed=0):
+    """Restaurant x zone style query set: few starts, many ends each"""
+    rng = random.Random(seed)
+    nodes = list(graph.nodes)
+    return [(start, rng.choice(nodes))
+            for start in rng.sample(nodes, sources)
+            for _ in range(targets_per_source)]
+
+def run_benchmark(rows, cols, sources, targets_per_source, worker_counts, algorithm='dijkstra'):
+    graph = grid_graph(rows, cols)
+    routing = Routing(graph)
+    pairs = make_pairs(graph, sources, targets_per_source)
+    results = []
+    for workers in worker_counts:
+        stats = {}
+        for _ in routing.route_many(pairs, algorithm=algorithm, workers=workers, stats=stats):
+            pass
+        results.append(stats)
+    return {
+        'graph': {'nodes': graph.get_node_count(), 'edges': graph.get_edge_count()},
+        'algorithm': algorithm,
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of Routing.route_many by worker count")
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--cols', type=int, default=100)
+    parser.add_argument('--sources', type=int, default=64)
+    parser.add_argument('--targets', type=int, default=200, help="Targets per source")
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--algorithm', default='dijkstra', choices=['dijkstra', 'astar', 'bfs'])
+    parser.add_argument('--json', action='store_true', help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.rows, args.cols, args.sources, args.targets,
+                           [int(w) for w in args.workers.split(',')], args.algorithm)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['graph']['nodes']} nodes, {report['algorithm']}, {report['cpu_count']} CPUs")
+    baseline = report['results'][0]['pairs_per_second']
+    for stats in report['results']:
+        print(f"  {stats['workers']} workers: {stats['pairs']} pairs in {stats['seconds']:.2f}s "
+              f"= {stats['pairs_per_second']:.0f} pairs/s ({stats['pairs_per_second'] / baseline:.2f}x), "
+              f"{stats['searches']} searches, {stats['chunks']} chunks")
+
+if __name__ == '__main__':
+    main()
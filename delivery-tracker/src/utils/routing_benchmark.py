@@ -0,0 +1,189 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from algorithms.routing import Routing
+from models.compiled_graph import CompiledGraph, graph_arrays
+from utils.graph_generators import GENERATORS, generate
+from utils.stats import percentile
+
+def _routing(graph):
+    return Routing(graph)
+
+def _preprocessed(graph):
+    routing = Routing(graph, preprocess=True)
+    routing.refresh_preprocessing()
+    return routing
+
+def _compiled(graph):
+    return Routing(CompiledGraph.from_arrays(*graph_arrays(graph)))
+
+# name: (build the engine from a Graph, name of the Routing search method).
+# DFS is left out: it explores every simple path and does not finish on
+# anything but toy graphs.
+ENGINES = {
+    'bfs': (_routing, 'find_shortest_path_bfs'),
+    'dijkstra': (_routing, 'shortest_path'),
+    'astar': (_routing, 'a_star_search'),
+    'dijkstra_preprocessed': (_preprocessed, 'shortest_path'),
+    'dijkstra_compiled': (_compiled, 'shortest_path'),
+}
+
+def make_queries(graph, count, seed=0):
+    """
+    Fixed, seeded (start, end) pairs whose endpoints share a component, so
+    every engine does a real search for every query
+    """
+    rng = random.Random(seed)
+    nodes = sorted(graph.nodes)
+    queries = []
+    attempts = 0
+    while len(queries) < count and attempts < count * 100:
+        attempts += 1
+        start, end = rng.choice(nodes), rng.choice(nodes)
+        if start != end and graph.same_component(start, end):
+            queries.append((start, end))
+    return queries
+
+def run_engine(search, routing, queries, warmup=5, repeats=3):
+    """
+    Latency percentiles (milliseconds) and mean nodes settled for one engine.
+    Each query is timed on its own with perf_counter_ns, repeats times, after
+    warmup untimed queries. Peak memory comes from a separate traced pass
+    because tracemalloc slows every allocation down.
+    """
+    for start, end in queries[:warmup]:
+        search(start, end)
+
+    samples = []
+    settled = []
+    for _ in range(repeats):
+        for start, end in queries:
+            begin = time.perf_counter_ns()
+            search(start, end)
+            samples.append(time.perf_counter_ns() - begin)
+            settled.append(routing.nodes_settled)
+
+    gc.collect()
+    tracemalloc.start()
+    for start, end in queries:
+        search(start, end)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        'queries': len(queries),
+        'repeats': repeats,
+        'p50_ms': round(percentile(samples, 0.50) / 1e6, 4),
+        'p95_ms': round(percentile(samples, 0.95) / 1e6, 4),
+        'p99_ms': round(percentile(samples, 0.99) / 1e6, 4),
+        'mean_ms': round(sum(samples) / len(samples) / 1e6, 4) if samples else 0.0,
+        'mean_nodes_settled': round(sum(settled) / len(settled), 1) if settled else 0.0,
+        'peak_search_kb': round(peak / 1024, 1),
+    }
+
+def run_benchmark(kinds=('grid',), sizes=(1000, 10000), engines=tuple(ENGINES),
+                  queries=50, warmup=5, repeats=3, seed=0):
+    results = []
+    for kind in kinds:
+        for size in sizes:
+            started = time.perf_counter()
+            graph = generate(kind, size, seed=seed)
+            graph_seconds = time.perf_counter() - started
+            query_set = make_queries(graph, queries, seed=seed)
+            for name in engines:
+                build, method = ENGINES[name]
+                started = time.perf_counter()
+                routing = build(graph)
+                build_seconds = time.perf_counter() - started
+                result = run_engine(getattr(routing, method), routing, query_set, warmup, repeats)
+                result.update({
+                    'graph': kind,
+                    'size': size,
+                    'nodes': graph.get_node_count(),
+                    'edges': graph.get_edge_count(),
+                    'engine': name,
+                    'graph_seconds': round(graph_seconds, 3),
+                    'build_seconds': round(build_seconds, 3),
+                })
+                results.append(result)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': seed,
+        'results': results,
+    }
+
+def find_regressions(baseline, report, threshold=0.2, metrics=('p50_ms', 'p95_ms')):
+    """
+    Messages for every (graph, size, engine, metric) that got more than
+    threshold (a fraction) slower than in the baseline report. Entries
+    missing from either report are ignored.
+    """
+    previous = {(r['graph'], r['size'], r['engine']): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = previous.get((result['graph'], result['size'], result['engine']))
+        if old is None:
+            continue
+        for metric in metrics:
+            if old.get(metric) and result[metric] > old[metric] * (1 + threshold):
+                regressions.append(
+                    f"{result['graph']}/{result['size']}/{result['engine']} {metric}: "
+                    f"{old[metric]} -> {result[metric]} ms "
+                    f"(+{100 * (result[metric] / old[metric] - 1):.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Routing latency across engines and synthetic graphs")
+    parser.add_argument('--graphs', default='grid', help=f"Comma separated: {', '.join(GENERATORS)}")
+    parser.add_argument('--sizes', default='1000,10000', help="Comma separated node counts (up to 1000000)")
+    parser.add_argument('--engines', default=','.join(ENGINES))
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--baseline', help="Earlier JSON report to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed slowdown against the baseline as a fraction")
+    args = parser.parse_args()
+
+    engines = args.engines.split(',')
+    for name in engines:
+        if name not in ENGINES:
+            parser.error(f"unknown engine {name!r}")
+    report = run_benchmark(args.graphs.split(','), [int(s) for s in args.sizes.split(',')],
+                           engines, args.queries, args.warmup, args.repeats, args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    for result in report['results']:
+        print(f"{result['graph']:>10} {result['nodes']:>8} {result['engine']:>22}: "
+              f"p50 {result['p50_ms']:.3f} ms, p95 {result['p95_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms, "
+              f"{result['mean_nodes_settled']:.0f} settled, {result['peak_search_kb']:.0f} KiB",
+              file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(json.load(file), report, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Allow running as a script from the repository root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from ml.time_predictor import TimePredictor
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def run_benchmark(data_path=None):
+    """
+    Seconds spent getting a usable TimePredictor at startup: a full fit
+    (the old behaviour), filling the model cache, loading from it, lazy
+    loading on the first predict, and how long train_async blocks
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def predictor(**kwargs):
+            return TimePredictor(data_path, cache_dir=cache_dir, **kwargs)
+
+        fit_seconds, _ = _timed(lambda: predictor().train(use_cache=False))
+        cold_seconds, _ = _timed(lambda: predictor().train())
+        warm_seconds, _ = _timed(lambda: predictor().train())
+
+        lazy = predictor(lazy=True)
+        first_predict_seconds, _ = _timed(lambda: lazy.predict('Italian', 20, 5.0))
+        next_predict_seconds, _ = _timed(lambda: lazy.predict('Italian', 20, 5.0))
+
+        # Remove the cached file so the background run does a full fit
+        for name in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, name))
+        background = predictor()
+        started = time.perf_counter()
+        async_seconds, thread = _timed(background.train_async)
+        fallback_seconds, _ = _timed(lambda: background.predict('Italian', 20, 5.0))
+        thread.join()
+        ready_seconds = time.perf_counter() - started
+
+    return {
+        'fit_seconds': round(fit_seconds, 3),
+        'fit_and_cache_seconds': round(cold_seconds, 3),
+        'cached_load_seconds': round(warm_seconds, 3),
+        'lazy_first_predict_seconds': round(first_predict_seconds, 3),
+        'lazy_next_predict_seconds': round(next_predict_seconds, 4),
+        'train_async_blocking_seconds': round(async_seconds, 4),
+        'predict_while_training_seconds': round(fallback_seconds, 4),
+        'async_ready_seconds': round(ready_seconds, 3),
+        'speedup': round(fit_seconds / warm_seconds, 1) if warm_seconds else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="TimePredictor startup cost with and without the model cache")
+    parser.add_argument('--data', help="Training CSV (defaults to the enhanced dataset)")
+    parser.add_argument('--json', action='store_true', help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.data)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"Fit on startup:          {report['fit_seconds']:.3f}s")
+    print(f"First run (fit + cache): {report['fit_and_cache_seconds']:.3f}s")
+    print(f"Cached load:             {report['cached_load_seconds']:.3f}s ({report['speedup']}x faster)")
+    print(f"Lazy first predict:      {report['lazy_first_predict_seconds']:.3f}s, "
+          f"then {report['lazy_next_predict_seconds'] * 1000:.1f} ms")
+    print(f"train_async blocks for:  {report['train_async_blocking_seconds'] * 1000:.1f} ms, "
+          f"heuristic predict meanwhile {report['predict_while_training_seconds'] * 1000:.2f} ms, "
+          f"model ready after {report['async_ready_seconds']:.3f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+class TimingWheel:
+    """
+    Hierarchical timing wheel.
+
+    Timers are bucketed by deadline into levels of slots, so scheduling,
+    rescheduling and cancelling a timer are O(1) and advancing the clock
+    only touches the slots that actually come due.
+    """
+
+    def __init__(self, tick=1.0, slots_per_level=64, levels=4, start=0.0):
+        if tick <= 0:
+            raise ValueError("Tick must be greater than zero.")
+        self.tick = tick
+        self.slots_per_level = slots_per_level
+        self.levels = levels
+        self.current_tick = int(start // tick)
+        self.wheels = [[set() for _ in range(slots_per_level)] for _ in range(levels)]
+        self.timers = {}  # key: (level, slot, deadline_tick)
+        self.overflow = set()  # keys whose deadline is beyond the top level
+
+    def __len__(self):
+        return len(self.timers)
+
+    def __contains__(self, key):
+        return key in self.timers
+
+    def schedule(self, key, deadline):
+        """Schedule (or reschedule) key to expire at the given deadline"""
+        deadline_tick = int(-(-deadline // self.tick))  # Round up
+        self.cancel(key)
+        self._place(key, max(deadline_tick, self.current_tick + 1))
+
+    def cancel(self, key):
+        """Cancel the timer for key; returns True if one was pending"""
+        timer = self.timers.pop(key, None)
+        if timer is None:
+            return False
+        level, slot, _ = timer
+        if level is None:
+            self.overflow.discard(key)
+        else:
+            self.wheels[level][slot].discard(key)
+        return True
+
+    def advance(self, now):
+        """Move the clock forward to now and return the keys that expired"""
+        target = int(now // self.tick)
+        expired = []
+
+        if not self.timers:
+            self.current_tick = max(self.current_tick, target)
+            return expired
+
+        slots = self.slots_per_level
+        while self.current_tick < target:
+            self.current_tick += 1
+            tick = self.current_tick
+
+            # Cascade higher levels down when the lower level wraps around
+            span = slots
+            for level in range(1, self.levels):
+                if tick % span:
+                    break
+                self._cascade(level, (tick // span) % slots)
+                span *= slots
+            else:
+                if tick % span == 0 and self.overflow:
+                    for key in list(self.overflow):
+                        self.overflow.discard(key)
+                        self._place(key, self.timers.pop(key)[2])
+
+            bucket = self.wheels[0][tick % slots]
+            if bucket:
+                for key in bucket:
+                    del self.timers[key]
+                expired.extend(bucket)
+                bucket.clear()
+
+            if not self.timers:
+                self.current_tick = target
+                break
+
+        return expired
+
+    def _cascade(self, level, slot):
+        bucket = self.wheels[level][slot]
+        if not bucket:
+            return
+        keys = list(bucket)
+        bucket.clear()
+        for key in keys:
+            self._place(key, self.timers.pop(key)[2])
+
+    def _place(self, key, deadline_tick):
+        delta = deadline_tick - self.current_tick
+        if delta < 0:
+            # Already due: expire on the tick currently being processed
+            deadline_tick = self.current_tick
+            delta = 0
+
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots_per_level:
+                slot = (deadline_tick // span) % self.slots_per_level
+                self.wheels[level][slot].add(key)
+                self.timers[key] = (level, slot, deadline_tick)
+                return
+            span *= self.slots_per_level
+
+        self.overflow.add(key)
+        self.timers[key] = (None, None, deadline_tick)
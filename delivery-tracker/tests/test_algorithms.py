@@ -1,4 +1,10 @@
 import unittest
+import sys
+import os
+
+# Add src to path: src modules import each other as top-level packages
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
 from src.algorithms.bfs import bfs
 from src.algorithms.dfs import dfs
 from src.models.graph import Graph
@@ -6,6 +6,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from services.assignment_service import AssignmentService
+from services.tracking_service import TrackingService
 from models.driver import Driver
 from models.delivery import Delivery
 from models.graph import Graph
@@ -38,5 +39,19 @@ class TestAssignmentService(unittest.TestCase):
         best_driver = self.assignment_service.find_best_driver(self.delivery, drivers)
         self.assertEqual(best_driver.driver_id, "D1")
 
+    def test_skips_drivers_that_stopped_reporting(self):
+        now = [0.0]
+        tracking = TrackingService(ttl_seconds=60, clock=lambda: now[0])
+        tracking.add_driver("D1", "A")
+        tracking.add_driver("D2", "B")
+        now[0] = 50.0
+        tracking.update_driver_location("D2", "B")
+        now[0] = 70.0  # D1's last report is past the TTL, D2's is not
+
+        service = AssignmentService(self.graph, tracking)
+        self.assertEqual(service.score_driver(self.driver1, "A"), -1)
+        drivers = {"D1": self.driver1, "D2": self.driver2}
+        self.assertEqual(service.find_best_driver(self.delivery, drivers).driver_id, "D2")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from algorithms.batch_routing import dijkstra_many, group_by_source
+from algorithms.routing import Routing
+from utils.graph_generators import grid_graph
+
+class TestRouteMany(unittest.TestCase):
+    def setUp(self):
+        self.graph = grid_graph(6, 6)
+        # Ids stay integers: compiled graphs store mixed ids as strings
+        self.island = 36
+        self.graph.add_node(self.island)
+        self.routing = Routing(self.graph)
+        nodes = sorted(self.graph.nodes)
+        self.pairs = [(start, end) for start in nodes[:4] for end in nodes[::3]]
+
+    def assert_matches_serial(self, results):
+        self.assertEqual(len(results), len(self.pairs))
+        for start, end, path in results:
+            expected = self.routing.shortest_path(start, end)
+            if expected is None:
+                self.assertIsNone(path)
+            else:
+                self.assertEqual((path[0], path[-1]), (start, end))
+                self.assertEqual(self.routing.calculate_route_time(path),
+                                 self.routing.calculate_route_time(expected))
+
+    def test_single_search_serves_a_group(self):
+        paths = dijkstra_many(self.graph, 0, [35, 1, self.island, "Missing"])
+        self.assertEqual(paths[1], [0, 1])
+        self.assertEqual(len(paths[35]), 11)
+        self.assertIsNone(paths[self.island])
+        self.assertIsNone(paths["Missing"])
+        self.assertEqual(group_by_source([("A", 1), ("B", 2), ("B", 3)]), [("B", [2, 3]), ("A", [1])])
+
+    def test_in_process(self):
+        stats = {}
+        self.assert_matches_serial(list(self.routing.route_many(self.pairs, stats=stats)))
+        self.assertEqual(stats['searches'], 4)
+        self.assertEqual(stats['pairs'], len(self.pairs))
+
+    def test_process_pool(self):
+        stats = {}
+        results = list(self.routing.route_many(self.pairs, workers=2, stats=stats))
+        self.assert_matches_serial(results)
+        self.assertEqual(stats['workers'], 2)
+
+    def test_process_pool_with_preprocessing(self):
+        routing = Routing(self.graph, preprocess=True)
+        stats = {}
+        self.assert_matches_serial(list(routing.route_many(self.pairs, workers=2, stats=stats)))
+        # Preprocessed routing searches each pair on its own
+        self.assertEqual(stats['searches'], len(self.pairs))
+
+    def test_unknown_algorithm(self):
+        # Raised by the call itself, before the results are iterated
+        with self.assertRaises(ValueError):
+            self.routing.route_many(self.pairs, algorithm='dfs')
+
+if __name__ == '__main__':
+    unittest.main()
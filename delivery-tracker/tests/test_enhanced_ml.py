@@ -10,7 +10,7 @@ from ml.time_predictor import TimePredictor
 class TestEnhancedML(unittest.TestCase):
     def test_enhanced_training_and_prediction(self):
         print("\nTesting Enhanced TimePredictor...")
-        predictor = TimePredictor()
+        predictor = TimePredictor(cache_dir=None)
         
         # Train
         success = predictor.train()
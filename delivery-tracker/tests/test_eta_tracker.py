@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.graph import Graph
+from services.eta_tracker import EtaTracker
+
+class TestEtaTracker(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph()
+        for node_id, x in [("A", 0), ("B", 100), ("C", 200), ("D", 300)]:
+            self.graph.add_node(node_id, {"x": x, "y": 0})
+        self.graph.add_node("E", {"x": 150, "y": 100})
+        self.graph.add_edge("A", "B", 5)
+        self.graph.add_edge("B", "C", 5)
+        self.graph.add_edge("C", "D", 5)
+        self.graph.add_edge("B", "E", 8)
+        self.graph.add_edge("E", "D", 8)
+        self.tracker = EtaTracker(self.graph)
+        self.published = []
+        self.tracker.add_listener(self.published.append)
+
+    def test_advances_without_rerouting(self):
+        self.assertEqual(self.tracker.track("DEL1", "D1", "A", "D"), 15)
+        self.tracker.update_position("D1", "B", "C", 0.5)
+        batch = self.tracker.flush()
+
+        self.assertEqual(batch["DEL1"]["eta_minutes"], 7.5)
+        self.assertEqual(batch["DEL1"]["next_node"], "C")
+        self.assertEqual(self.tracker.reroute_count, 0)
+        self.assertEqual(self.published, [batch])
+
+    def test_reroutes_when_off_route(self):
+        self.tracker.track("DEL1", "D1", "A", "D")
+        self.tracker.update_position("D1", "E")
+        self.assertEqual(self.tracker.get_eta("DEL1"), 8)
+        self.assertEqual(self.tracker.reroute_count, 1)
+
+    def test_reroutes_when_edge_weight_changes(self):
+        self.tracker.track("DEL1", "D1", "A", "D")
+        self.tracker.update_position("D1", "B")
+        self.graph.add_edge("C", "D", 50)
+        self.tracker.edge_weight_changed("C", "D")
+        batch = self.tracker.flush()
+
+        self.assertEqual(batch["DEL1"]["eta_minutes"], 16)
+        self.assertEqual(batch["DEL1"]["next_node"], "E")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from algorithms.batch_routing import route_batch
+from algorithms.routing import Routing
+from models.compiled_graph import CompiledGraph, compile_graph
+from models.graph import Graph
+from models.shared_graph import SharedGraph
+from services.map_service import MapService, iter_map_json
+
+MAP_DATA = {
+    'intersections': [
+        {'id': 'A', 'location': {'x': 0, 'y': 0}},
+        {'id': 'B', 'location': {'x': 100, 'y': 0, 'name': 'Depot'}},
+        {'id': 'C', 'location': {'x': 100, 'y': 100}},
+        {'id': 'D', 'location': {'x': 0, 'y': 100}}
+    ],
+    'roads': [
+        {'start': 'A', 'end': 'B', 'travel_time': 5},
+        {'start': 'B', 'end': 'C', 'travel_time': 5},
+        {'start': 'A', 'end': 'D', 'travel_time': 2},
+        {'start': 'D', 'end': 'C', 'travel_time': 2}
+    ]
+}
+
+class TestCompiledGraph(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.graph = MapService('unused.json', cache_dir=None).build_graph(MAP_DATA)
+        self.path = os.path.join(self.temp_dir.name, 'map.graphbin')
+        compile_graph(self.graph, self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_matches_source_graph(self):
+        compiled = CompiledGraph(self.path)
+        self.assertEqual(list(compiled.nodes), list(self.graph.nodes))
+        self.assertEqual(compiled.nodes['B'], {'x': 100, 'y': 0, 'name': 'Depot'})
+        self.assertEqual(compiled.edges['A'], {'B': 5, 'D': 2})
+        self.assertEqual(compiled.get_edge_weight('D', 'C'), 2)
+        self.assertEqual(compiled.get_edge_weight('A', 'C'), float('inf'))
+        self.assertNotIn('Z', compiled.nodes)
+        self.assertEqual(compiled.get_edge_count(), 4)
+        self.assertTrue(compiled.is_connected())
+        self.assertTrue(compiled.same_component('A', 'C'))
+        self.assertFalse(compiled.same_component('A', 'Z'))
+        self.assertEqual(compiled.to_graph().edges, self.graph.edges)
+
+    def test_routing_on_compiled_graph(self):
+        compiled = CompiledGraph(self.path)
+        self.assertEqual(Routing(compiled).shortest_path('A', 'C'), Routing(self.graph).shortest_path('A', 'C'))
+
+    def test_integer_ids(self):
+        graph = Graph()
+        graph.add_edge(1, 2, 3)
+        compile_graph(graph, self.path)
+        compiled = CompiledGraph(self.path)
+        self.assertEqual(compiled.get_neighbors(1), [2])
+
+    def test_rejects_other_versions(self):
+        with open(os.path.join(self.path, 'meta.json')) as file:
+            meta = json.load(file)
+        meta['version'] += 1
+        with open(os.path.join(self.path, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+        with self.assertRaises(ValueError):
+            CompiledGraph(self.path)
+
+class TestSharedGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = MapService('unused.json', cache_dir=None).build_graph(MAP_DATA)
+
+    def test_attach_sees_published_arrays(self):
+        with SharedGraph.publish(self.graph) as shared:
+            attached = SharedGraph.attach(shared.handle)
+            self.assertEqual(attached.graph.edges['A'], {'B': 5, 'D': 2})
+            self.assertEqual(attached.graph.nodes['B']['name'], 'Depot')
+            self.assertEqual(Routing(attached.graph).shortest_path('A', 'C'), ['A', 'D', 'C'])
+            attached.close()
+
+    def test_publish_compiled_graph_keeps_attributes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph')
+            compile_graph(self.graph, path)
+            with SharedGraph.publish(CompiledGraph(path)) as shared:
+                self.assertEqual(shared.graph.nodes['B']['name'], 'Depot')
+                self.assertEqual(shared.graph.nodes['B']['x'], self.graph.nodes['B']['x'])
+
+    def test_route_batch_matches_serial_routing(self):
+        pairs = [(start, end) for start in 'ABCD' for end in 'ABCD'] + [('A', 'Z')]
+        routing = Routing(self.graph)
+        expected = [routing.shortest_path(start, end) for start, end in pairs]
+        self.assertEqual(route_batch(self.graph, pairs, workers=2, chunk_size=3), expected)
+
+class TestMapServiceCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.map_path = os.path.join(self.temp_dir.name, 'map.json')
+        with open(self.map_path, 'w') as file:
+            json.dump(MAP_DATA, file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_second_load_uses_compiled_cache(self):
+        first = MapService(self.map_path)
+        first.load_map()
+        self.assertIsInstance(first.get_graph(), Graph)
+
+        second = MapService(self.map_path)
+        second.load_map()
+        # Same mutable type on warm runs; the edges come from the cached copy
+        self.assertIsInstance(second.get_graph(), Graph)
+        self.assertEqual(second.get_graph().edges['C'], first.get_graph().edges['C'])
+        second.get_graph().add_node('Z', {'x': 0, 'y': 0})
+
+        compiled = MapService(self.map_path)
+        compiled.load_compiled()
+        self.assertIsInstance(compiled.get_graph(), CompiledGraph)
+        self.assertEqual(compiled.get_graph().edges['C'], first.get_graph().edges['C'])
+
+    def test_changed_map_is_recompiled(self):
+        MapService(self.map_path).load_map()
+        data = dict(MAP_DATA, roads=MAP_DATA['roads'][:1])
+        MapService(self.map_path).save_map(data)
+
+        service = MapService(self.map_path)
+        service.load_map()
+        self.assertIsInstance(service.get_graph(), Graph)
+        self.assertEqual(service.get_graph().get_edge_count(), 1)
+
+class TestStreamingLoader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_elements_split_across_chunks(self):
+        document = json.dumps(dict(MAP_DATA, meta={'note': 'ignored ] , }', 'size': 12345}), indent=2)
+        expected = ([('intersection', item) for item in MAP_DATA['intersections']] +
+                    [('road', item) for item in MAP_DATA['roads']])
+        for chunk_size in (1, 7, 64, 4096):
+            self.assertEqual(list(iter_map_json(io.StringIO(document), chunk_size)), expected)
+
+    def test_stream_graph_matches_build_graph(self):
+        path = os.path.join(self.temp_dir.name, 'map.json')
+        MapService(path).save_map(MAP_DATA)
+        progress = []
+        graph = MapService(path, cache_dir=None).stream_graph(
+            batch_size=3, progress=lambda *args: progress.append(args), chunk_size=16)
+
+        expected = MapService(path).build_graph(MAP_DATA)
+        self.assertEqual(graph.nodes, expected.nodes)
+        self.assertEqual(graph.edges, expected.edges)
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(progress[-1], (os.path.getsize(path), os.path.getsize(path), 4, 4))
+
+    def test_ndjson_map(self):
+        path = os.path.join(self.temp_dir.name, 'map.ndjson')
+        with open(path, 'w') as file:
+            for road in MAP_DATA['roads']:
+                file.write(json.dumps(road) + "\n")
+            for intersection in MAP_DATA['intersections']:
+                file.write(json.dumps(dict(intersection, kind='intersection')) + "\n")
+        graph = MapService(path, cache_dir=None).stream_graph()
+        self.assertEqual(graph.nodes['B'], MAP_DATA['intersections'][1]['location'])
+        self.assertEqual(graph.get_edge_weight('D', 'C'), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.graph_generators import generate, grid_graph, scale_free_graph
+from utils.routing_benchmark import ENGINES, find_regressions, make_queries, run_benchmark
+
+class TestGraphGenerators(unittest.TestCase):
+    def test_generators_are_reproducible(self):
+        for kind in ('grid', 'geometric', 'scale_free'):
+            first, second = generate(kind, 400, seed=3), generate(kind, 400, seed=3)
+            self.assertEqual(first.nodes, second.nodes)
+            self.assertEqual(first.edges, second.edges)
+            self.assertNotEqual(first.edges, generate(kind, 400, seed=4).edges)
+
+    def test_grid_shape(self):
+        graph = grid_graph(4, 5)
+        self.assertEqual(graph.get_node_count(), 20)
+        self.assertEqual(graph.get_edge_count(), 4 * 4 + 3 * 5)
+        self.assertEqual(graph.get_edge_weight(0, 1), 5)
+
+    def test_scale_free_is_connected_with_hubs(self):
+        graph = scale_free_graph(500, edges_per_node=2)
+        self.assertTrue(graph.is_connected())
+        degrees = sorted(len(neighbors) for neighbors in graph.edges.values())
+        self.assertGreater(degrees[-1], 5 * degrees[len(degrees) // 2])
+
+class TestRoutingBenchmark(unittest.TestCase):
+    def test_every_engine_reports(self):
+        report = run_benchmark(kinds=('grid',), sizes=(100,), queries=5, warmup=1, repeats=1)
+        self.assertEqual([r['engine'] for r in report['results']], list(ENGINES))
+        for result in report['results']:
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['mean_nodes_settled'], 0)
+
+    def test_queries_stay_in_one_component(self):
+        graph = generate('geometric', 300)
+        for start, end in make_queries(graph, 20):
+            self.assertTrue(graph.same_component(start, end))
+
+    def test_regression_threshold(self):
+        baseline = {'results': [{'graph': 'grid', 'size': 100, 'engine': 'bfs', 'p50_ms': 1.0, 'p95_ms': 2.0}]}
+        current = {'results': [{'graph': 'grid', 'size': 100, 'engine': 'bfs', 'p50_ms': 1.1, 'p95_ms': 3.0}]}
+        regressions = find_regressions(baseline, current, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('p95_ms', regressions[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.graph import Graph
+from services.map_matcher import MapMatcher
+from services.tracking_service import TrackingService
+
+class TestMapMatcher(unittest.TestCase):
+    def setUp(self):
+        # Two parallel east-west roads joined at the west end
+        self.graph = Graph()
+        self.graph.add_node("A", {"x": 0, "y": 0})
+        self.graph.add_node("B", {"x": 300, "y": 0})
+        self.graph.add_node("C", {"x": 0, "y": 60})
+        self.graph.add_node("D", {"x": 300, "y": 60})
+        self.graph.add_edge("A", "B", 5)
+        self.graph.add_edge("C", "D", 5)
+        self.graph.add_edge("A", "C", 2)
+        self.matcher = MapMatcher(self.graph, sigma=20, search_radius=80)
+
+    def test_snaps_fix_to_nearest_edge(self):
+        match = self.matcher.match("D1", 150, 10)
+        self.assertEqual(set(match['edge']), {"A", "B"})
+        self.assertAlmostEqual(match['y'], 0)
+        self.assertAlmostEqual(match['offset'] if match['edge'][0] == "A" else 1 - match['offset'], 0.5)
+
+    def test_transitions_prefer_continuous_route(self):
+        # Drift towards the other road should not flip the match mid-block
+        for x, y in [(50, 5), (100, 10), (150, 20), (200, 32)]:
+            match = self.matcher.match("D1", x, y)
+        self.assertEqual(set(match['edge']), {"A", "B"})
+
+    def test_no_candidates_far_from_roads(self):
+        self.assertIsNone(self.matcher.match("D1", 150, 500))
+
+    def test_expired_drivers_are_dropped(self):
+        tracking_service = TrackingService(ttl_seconds=0)
+        self.matcher.attach(tracking_service)
+        tracking_service.add_driver("D1", (150, 10))
+        self.matcher.match("D1", 150, 10)
+
+        tracking_service.expire_stale_drivers(now=tracking_service.clock() + 5)
+        self.assertNotIn("D1", self.matcher.states)
+
+if __name__ == '__main__':
+    unittest.main()
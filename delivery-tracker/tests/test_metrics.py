@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+import urllib.request
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.metrics import MetricsRegistry
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry(enabled=True)
+
+    def test_counter_and_histogram(self):
+        calls = self.registry.counter('calls_total', "Calls")
+        latency = self.registry.histogram('latency_seconds', buckets=(0.1, 1.0))
+        calls.inc()
+        calls.inc(2)
+        for value in (0.05, 0.5, 0.7, 5.0):
+            latency.observe(value)
+        self.assertEqual(calls.value, 3)
+        self.assertEqual(latency.counts, [1, 2, 1])
+        self.assertEqual(latency.quantile(0.5), 1.0)
+        self.assertEqual(latency.quantile(1.0), float('inf'))
+        self.assertIs(self.registry.counter('calls_total'), calls)
+        with self.assertRaises(ValueError):
+            self.registry.histogram('calls_total')
+
+    def test_timer_decorator_and_context_manager(self):
+        @self.registry.timer('work_seconds')
+        def work(x):
+            return x * 2
+
+        self.assertEqual(work(4), 8)
+        with self.registry.timer('work_seconds'):
+            pass
+        self.assertEqual(self.registry.histogram('work_seconds').count, 2)
+
+    def test_disabled_registry_records_nothing(self):
+        self.registry.disable()
+        calls = self.registry.counter('calls_total')
+        timed = self.registry.timer('work_seconds')(lambda: 1)
+        calls.inc()
+        self.assertEqual(timed(), 1)
+        with self.registry.timer('work_seconds'):
+            pass
+        self.assertEqual(calls.value, 0)
+        self.assertEqual(self.registry.histogram('work_seconds').count, 0)
+
+    def test_exports(self):
+        self.registry.counter('calls_total', "Calls").inc(5)
+        self.registry.histogram('latency_seconds', buckets=(0.1, 1.0)).observe(0.5)
+        text = self.registry.to_prometheus()
+        self.assertIn("# TYPE calls_total counter\ncalls_total 5", text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 1', text)
+        self.assertIn('latency_seconds_count 1', text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.json')
+            self.registry.write(path)
+            with open(path) as file:
+                data = json.load(file)
+            self.assertEqual(data['metrics']['calls_total']['value'], 5)
+
+    def test_http_endpoint(self):
+        self.registry.counter('calls_total').inc()
+        server = self.registry.serve(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            with urllib.request.urlopen(url + "/metrics") as response:
+                self.assertIn(b"calls_total 1", response.read())
+            with urllib.request.urlopen(url + "/metrics.json") as response:
+                self.assertEqual(json.load(response)['metrics']['calls_total']['value'], 1)
+        finally:
+            self.registry.stop_server()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,18 +1,36 @@
 import unittest
 import sys
 import os
+import tempfile
 import pandas as pd
 import numpy as np
+from scipy import stats
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from ml.time_predictor import TimePredictor
+from ml.eta_lookup import EtaLookupTable
+from ml.forest_compiler import compile_forest
+from ml.online_learning import CompletedDeliveryLog, OnlineLearner, assignment_features
+from ml.prediction_cache import PredictionCache
+from ml.time_predictor import TimePredictor, expand_legacy
 from ml.demand_predictor import DemandPredictor
+from models.delivery import Delivery
+from utils.cuisine_time_calculator import CuisineTimeCalculator
 
 class TestMLComponents(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A private model cache: the first test trains, later ones load it,
+        # and nothing is read from or written to data/.model_cache
+        cls.cache_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cache_dir.cleanup()
+
     def setUp(self):
-        self.time_predictor = TimePredictor()
+        self.time_predictor = TimePredictor(cache_dir=self.cache_dir.name)
         self.demand_predictor = DemandPredictor()
 
     def test_time_predictor_training(self):
@@ -30,6 +48,236 @@ class TestMLComponents(unittest.TestCase):
         self.assertIsInstance(prediction, float)
         self.assertGreater(prediction, 0)
 
+    def test_predict_batch_matches_single(self):
+        """Batched predictions equal one-at-a-time predictions"""
+        self.time_predictor.train()
+        cuisines = ["Italian", "Chinese", "Unknown Cuisine"]
+        distances = [2.0, 5.0, 9.5]
+        batch = self.time_predictor.predict_batch(cuisines, 20, distances, traffic_level="High")
+        single = [self.time_predictor.predict(c, 20, d, traffic_level="High")
+                  for c, d in zip(cuisines, distances)]
+        np.testing.assert_allclose(batch, single)
+
+        frame = pd.DataFrame({'Cuisine': cuisines, 'BasePrepTime': [20] * 3, 'Distance': distances,
+                              'TrafficLevel': ["High"] * 3})
+        np.testing.assert_allclose(self.time_predictor.predict_batch(frame), single)
+
+    def test_compiled_encoders(self):
+        """Dict and categorical encoding agree with LabelEncoder; unknowns get code 0"""
+        self.time_predictor.train()
+        fitted = self.time_predictor._fitted
+        encoder = self.time_predictor.encoders['Cuisine']
+        known = list(encoder.classes_[:3])
+        self.assertEqual([fitted.encode('Cuisine', value) for value in known], list(encoder.transform(known)))
+        self.assertEqual(fitted.encode('Cuisine', "Martian"), 0)
+        self.assertEqual(fitted.encode('Cuisine', ["unhashable"]), 0)
+
+        values = known + ["Martian", None]
+        expected = list(encoder.transform(known)) + [0, 0]
+        np.testing.assert_array_equal(fitted.encode_many('Cuisine', values), expected)
+        np.testing.assert_array_equal(fitted.encode_many('Cuisine', pd.Series(values, dtype='category')), expected)
+
+    def test_predict_batch_untrained_uses_heuristic(self):
+        batch = TimePredictor(cache_dir=None).predict_batch(["Italian", "Thai"], [10, 20], [1.0, 2.0], traffic_level="Low")
+        np.testing.assert_allclose(batch, [12.0, 24.0])
+
+    def test_legacy_expansion_matches_row_loop(self):
+        """The vectorised expansion draws from the same distribution as the old per-row loop"""
+        dishes = pd.DataFrame({'Cuisine': ["Italian", "Thai", "Indian"], 'BasePrepTime': [15, 25, 40]})
+        expanded = expand_legacy(dishes, 2000, seed=1)
+        self.assertEqual(len(expanded), 6000)
+        self.assertEqual(set(expanded['Cuisine'].value_counts()), {2000})
+        pd.testing.assert_frame_equal(expand_legacy(dishes, 2000, seed=1), expanded)
+        self.assertEqual(len(expand_legacy(dishes, [1, 2, 3])), 6)
+
+        rng = np.random.default_rng(2)
+        reference = {'Distance': [], 'TrafficFactor': [], 'TotalTime': []}
+        for _, row in dishes.iterrows():
+            for _ in range(2000):
+                distance = rng.uniform(1, 15)
+                traffic_factor = rng.uniform(1.0, 2.0)
+                reference['Distance'].append(distance)
+                reference['TrafficFactor'].append(traffic_factor)
+                reference['TotalTime'].append(row['BasePrepTime'] + distance * 2 * traffic_factor)
+        for column, values in reference.items():
+            self.assertGreater(stats.ks_2samp(expanded[column], values).pvalue, 0.01, column)
+
+    def test_legacy_dataset_training(self):
+        data_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'cuisine_time_dataset1.csv')
+        predictor = TimePredictor(data_path, cache_dir=None, expansion_factor=10, expansion_seed=0)
+        self.assertTrue(predictor.train())
+        self.assertEqual(predictor.feature_columns, ['Cuisine_Encoded', 'BasePrepTime', 'Distance', 'TrafficFactor'])
+        self.assertGreaterEqual(predictor.predict("Italian", 20, 5.0), 20)
+
+    def test_compiled_forest_matches_sklearn(self):
+        """The flattened forest reproduces the fitted model's predictions"""
+        self.time_predictor.train()
+        forest = compile_forest(self.time_predictor.model)
+        rng = np.random.default_rng(0)
+        X = np.column_stack([rng.integers(0, 10, 300), rng.integers(10, 40, 300), rng.uniform(0, 16, 300),
+                             rng.integers(0, 4, 300), rng.integers(0, 4, 300), rng.integers(0, 5, 300),
+                             rng.uniform(3, 5, 300)])
+        expected = self.time_predictor.model.predict(X)
+        np.testing.assert_allclose(forest.predict(X), expected, rtol=1e-9)
+        self.assertAlmostEqual(forest.predict_one(X[0]), expected[0], places=9)
+
+    def test_lookup_table_matches_model_on_grid(self):
+        """At grid points the table returns the model's own prediction"""
+        self.time_predictor.train()
+        table = EtaLookupTable.build(self.time_predictor, prep_points=3, distance_points=5, rating_points=2)
+        prep, distance = table.grids['BasePrepTime'][1], table.grids['Distance'][2]
+        expected = self.time_predictor.predict("Thai", prep, distance, "Jam", "Snow", "Lunch", 5.0)
+        self.assertAlmostEqual(table.lookup("Thai", prep, distance, "Jam", "Snow", "Lunch", 5.0), expected)
+
+        batch = table.lookup_batch(["Thai", "Italian"], [15, 30], [2.5, 12.0], "High")
+        single = [table.lookup("Thai", 15, 2.5, "High"), table.lookup("Italian", 30, 12.0, "High")]
+        np.testing.assert_allclose(batch, single)
+
+        self.assertTrue(self.time_predictor.use_lookup_table(prep_points=3, distance_points=5, rating_points=2))
+        self.assertAlmostEqual(self.time_predictor.predict("Thai", 15, 2.5, "High"), single[0])
+        self.assertFalse(self.time_predictor.use_lookup_table(False))
+
+    def test_prediction_cache(self):
+        """Quantized orders share an entry; a retrain invalidates the cache"""
+        self.time_predictor.train()
+        cache = self.time_predictor.use_prediction_cache(maxsize=2)
+        first = self.time_predictor.predict("Thai", 20, 5.01, driver_rating=4.46)
+        self.assertEqual(self.time_predictor.predict("Thai", 20, 4.98, driver_rating=4.54), first)
+        self.assertAlmostEqual(first, self.time_predictor._predict_fitted(
+            self.time_predictor._fitted, "Thai", 20, 5.0, 'Medium', 'Clear', 'Dinner', 4.5)[0])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.time_predictor.predict("Thai", 20, 6.0)
+        self.time_predictor.predict("Thai", 20, 7.0)
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+
+        version = self.time_predictor.model_version
+        self.time_predictor.train(use_cache=False)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.version, version + 1)
+        cache.put(("stale",), 1.0, version)
+        self.assertIsNone(cache.get(("stale",), version + 1))
+        self.assertEqual(cache.stats()['hit_rate'], round(1 / 5, 4))
+
+    def test_concurrent_predictions_match_sequential(self):
+        """Threads predicting at once never see each other's feature row"""
+        from concurrent.futures import ThreadPoolExecutor
+        self.time_predictor.train()
+        orders = [("Thai", 10 + i % 20, 0.5 + i % 15, 'Medium', 'Clear', 'Dinner', 3.0 + (i % 20) / 10)
+                  for i in range(400)]
+        expected = [self.time_predictor.predict(*order) for order in orders]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda order: self.time_predictor.predict(*order), orders))
+        self.assertEqual(results, expected)
+
+    def test_fallback_predictions_are_not_cached(self):
+        self.time_predictor.train()
+        cache = self.time_predictor.use_prediction_cache()
+        fitted = self.time_predictor._fitted
+        forest, fitted.forest = fitted.forest, None
+        model, fitted.model = fitted.model, None  # Every prediction now raises
+        self.time_predictor.predict("Thai", 20, 5.0)
+        self.assertEqual(len(cache), 0)
+
+        fitted.forest, fitted.model = forest, model
+        self.time_predictor.predict("Thai", 20, 5.0)
+        self.assertEqual(len(cache), 1)
+
+    def test_model_cache_round_trip(self):
+        """A second predictor loads the cached model; other hyperparameters miss the cache"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = TimePredictor(cache_dir=cache_dir)
+            self.assertTrue(first.train())
+            self.assertFalse(first.loaded_from_cache)
+
+            second = TimePredictor(cache_dir=cache_dir)
+            self.assertTrue(second.train())
+            self.assertTrue(second.loaded_from_cache)
+            self.assertAlmostEqual(second.predict("Italian", 15, 5.0), first.predict("Italian", 15, 5.0))
+
+            other = TimePredictor(cache_dir=cache_dir)
+            other.model.set_params(n_estimators=10)
+            self.assertNotEqual(other.cache_key(), first.cache_key())
+            self.assertFalse(other.load_cached())
+
+    def test_lazy_and_background_training(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            lazy = TimePredictor(cache_dir=cache_dir, lazy=True)
+            self.assertFalse(lazy.is_trained)
+            lazy.predict("Italian", 15, 5.0)
+            self.assertTrue(lazy.is_trained)
+
+            background = TimePredictor(cache_dir=cache_dir)
+            finished = []
+            background.train_async(callback=finished.append).join()
+            self.assertEqual(finished, [True])
+            self.assertTrue(background.loaded_from_cache)
+
+    def completed_delivery(self, delivery_id, minutes, **features):
+        delivery = Delivery(delivery_id, "B")
+        if features:
+            delivery.set_eta_features(**features)
+        delivery.created_at -= pd.Timedelta(minutes=minutes)
+        delivery.update_progress(100)
+        return delivery
+
+    def test_assignment_features_come_from_the_delivery(self):
+        """The dish recorded on the delivery decides its features, not any other selection"""
+        calculator = CuisineTimeCalculator()
+        conditions = dict(weather="Rain", traffic_level="High", time_of_day="Dinner")
+        pie = Delivery("DEL1", "B", dish="Apple Pie")
+        features = assignment_features(pie, calculator, conditions)
+        self.assertEqual((features['cuisine'], features['base_prep_time']), ("American", 40.0))
+
+        # Whatever dish is looked up or selected elsewhere (the GUI's cost
+        # calculator) in between, each delivery keeps the features of its own dish
+        baklava = Delivery("DEL2", "B", dish="Baklava")
+        other = assignment_features(baklava, calculator, conditions)
+        self.assertEqual(other['cuisine'], calculator.get_dish_info("Baklava")['cuisine'])
+        self.assertEqual(assignment_features(pie, calculator, conditions), features)
+
+        self.assertIsNone(assignment_features(Delivery("DEL3", "B"), calculator, conditions))
+        self.assertIsNone(assignment_features(Delivery("DEL4", "B", dish="Moon Cheese"), calculator, conditions))
+        self.assertIsNone(assignment_features(pie, calculator, {'time_of_day': "Dinner"}))
+
+    def test_online_learner_swaps_in_refitted_model(self):
+        """Completed deliveries are logged and refitted into a new live model"""
+        features = dict(cuisine="Thai", base_prep_time=20, weather="Rain", traffic_level="High",
+                        time_of_day="Dinner", driver_rating=4.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.time_predictor.train(use_cache=False)
+            version = self.time_predictor.model_version
+            log = CompletedDeliveryLog(os.path.join(tmp, 'completed.csv'))
+            learner = OnlineLearner(self.time_predictor, log, min_new=3, use_process=False)
+            self.assertIsNone(learner.start())
+
+            self.assertFalse(learner.on_delivery_completed(self.completed_delivery("DEL0", 45)))
+            partial = dict(cuisine="Thai", base_prep_time=20, distance=4.0)
+            self.assertFalse(learner.on_delivery_completed(self.completed_delivery("DEL1", 45, **partial)))
+            for minutes in (1, 10, 3000):  # Too fast, faster than prep, restored days later
+                self.assertFalse(learner.on_delivery_completed(
+                    self.completed_delivery("DEL2", minutes, distance=4.0, **features)))
+
+            for i in range(3):
+                delivery = self.completed_delivery(f"DEL{i + 3}", 45, distance=4.0 + i, **features)
+                self.assertTrue(learner.on_delivery_completed(delivery))
+            self.assertTrue(learner.wait(60))
+            learner.shutdown()
+
+            self.assertIsNone(learner.last_error)
+            self.assertEqual(self.time_predictor.model_version, version + 1)
+            self.assertGreater(self.time_predictor.predict("Thai", 20, 5.0), 0)
+
+            # After a restart the logged deliveries are refitted straight away,
+            # in a spawned worker process
+            restarted = OnlineLearner(self.time_predictor, CompletedDeliveryLog(log.path), min_new=50)
+            self.assertEqual(len(restarted.log), 3)
+            self.assertIsNotNone(restarted.start())
+            self.assertTrue(restarted.wait(120))
+            restarted.shutdown()
+            self.assertIsNone(restarted.last_error)
+            self.assertEqual(self.time_predictor.model_version, version + 2)
+
     def test_demand_predictor(self):
         """Test demand hotspot prediction"""
         nodes = {
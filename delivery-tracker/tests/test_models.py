@@ -1,5 +1,11 @@
 import unittest
-from src.models.graph import Graph
+import sys
+import os
+
+# Add src to path: src modules import each other as top-level packages
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.models.graph import Graph, GraphHolder
 from src.models.driver import Driver
 from src.models.delivery import Delivery
 
@@ -22,6 +28,53 @@ class TestGraph(unittest.TestCase):
         weight = self.graph.get_edge_weight("A", "B")
         self.assertEqual(weight, 5)
 
+    def test_components_follow_additions(self):
+        self.assertTrue(self.graph.is_connected())
+        self.graph.add_edge("C", "D", 1)
+        self.assertEqual(self.graph.component_count(), 2)
+        self.assertFalse(self.graph.same_component("A", "D"))
+        self.graph.add_edge("B", "C", 1)
+        self.assertTrue(self.graph.same_component("A", "D"))
+        self.assertEqual(set(self.graph.component_ids().values()), {0})
+
+    def test_components_after_removal(self):
+        self.graph.add_edge("B", "C", 1)
+        self.assertTrue(self.graph.is_connected())
+        self.graph.remove_edge("A", "B")
+        self.assertFalse(self.graph.same_component("A", "C"))
+        self.assertEqual(self.graph.component_id("B"), self.graph.component_id("C"))
+        self.assertIsNone(self.graph.component_id("Z"))
+
+    def test_snapshot_is_isolated_from_changes(self):
+        snapshot = self.graph.snapshot()
+        self.assertIs(self.graph.snapshot(), snapshot)
+        self.graph.add_edge("A", "C", 10)
+        self.graph.remove_edge("A", "B")
+        self.assertEqual(snapshot.edges, {"A": {"B": 5}, "B": {"A": 5}})
+        self.assertEqual(self.graph.edges["A"], {"C": 10})
+        self.assertGreater(self.graph.version, snapshot.version)
+        with self.assertRaises(TypeError):
+            snapshot.add_node("D")
+        self.assertEqual(snapshot.thaw().edges, snapshot.edges)
+
+    def test_snapshot_copies_node_attributes(self):
+        self.graph.add_node("C", {"x": 1})
+        snapshot = self.graph.snapshot()
+        self.graph.nodes["C"]["x"] = 2
+        self.assertEqual(snapshot.nodes["C"], {"x": 1})
+        thawed = snapshot.thaw()
+        thawed.nodes["C"]["x"] = 3
+        self.assertEqual(snapshot.nodes["C"], {"x": 1})
+
+    def test_holder_publishes_latest_snapshot(self):
+        holder = GraphHolder(self.graph)
+        first = holder.current()
+        self.graph.add_node("C")
+        self.assertNotIn("C", first.nodes)
+        holder.publish(self.graph)
+        self.assertIn("C", holder.current().nodes)
+        self.assertEqual(holder.generation, 2)
+
 class TestDriver(unittest.TestCase):
     def setUp(self):
         self.driver = Driver(driver_id="D1", current_location="A")
@@ -46,5 +99,18 @@ class TestDelivery(unittest.TestCase):
         self.delivery.update_progress("In Transit")
         self.assertEqual(self.delivery.status, "In Transit")
 
+    def test_completion_listeners_fire_once(self):
+        completed = []
+        Delivery.add_completion_listener(completed.append)
+        try:
+            self.delivery.update_progress(60)
+            self.assertEqual(completed, [])
+            self.delivery.update_progress(40)
+            self.delivery.update_status("Completed")
+        finally:
+            Delivery.remove_completion_listener(completed.append)
+        self.assertEqual(completed, [self.delivery])
+        self.assertGreaterEqual(self.delivery.actual_minutes(), 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
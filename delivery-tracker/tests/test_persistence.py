@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from datetime import datetime, timedelta
+
+from models.delivery import Delivery
+from models.driver import Driver
+from models.graph import Graph
+from services.persistence_service import SnapshotStore, import_legacy_backups, open_state_store
+from services.sqlite_store import SQLiteStore
+
+def make_state(drivers):
+    return {
+        'nodes': {'A': {'x': 0, 'y': 0}, 'B': {'x': 100, 'y': 0}},
+        'edges': {'A': {'B': 5}, 'B': {'A': 5}},
+        'drivers': drivers,
+        'deliveries': {},
+        'app_state': {'total_drivers': len(drivers)}
+    }
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_deltas_only_record_changes(self):
+        store = SnapshotStore(self.directory, base_every=10)
+        self.assertEqual(store.save(make_state({'D1': {'current_location': 'A'}})), 'base')
+        self.assertEqual(store.save(make_state({'D1': {'current_location': 'B'}})), 'delta')
+        self.assertIsNone(store.save(make_state({'D1': {'current_location': 'B'}})))
+
+        with open(os.path.join(self.directory, 'delta_000000.jsonl')) as file:
+            lines = file.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertNotIn('nodes', lines[0])
+
+        state = SnapshotStore(self.directory).load()
+        self.assertEqual(state['drivers']['D1']['current_location'], 'B')
+
+    def test_torn_delta_is_truncated_before_appending(self):
+        store = SnapshotStore(self.directory, base_every=10)
+        store.save(make_state({'D1': {'current_location': 'A'}}))
+        store.save(make_state({'D1': {'current_location': 'B'}}))
+        with open(os.path.join(self.directory, 'delta_000000.jsonl'), 'a') as file:
+            file.write('{"saved_at": "2025-')  # Interrupted save
+
+        restarted = SnapshotStore(self.directory, base_every=10)
+        self.assertEqual(restarted.save(make_state({'D1': {'current_location': 'C'}})), 'delta')
+        self.assertEqual(SnapshotStore(self.directory).load()['drivers']['D1']['current_location'], 'C')
+
+    def test_retention_drops_old_snapshots(self):
+        store = SnapshotStore(self.directory, base_every=1, keep_bases=2)
+        for i in range(6):
+            store.save(make_state({'D1': {'current_location': str(i)}}))
+
+        snapshots = sorted(name for name in os.listdir(self.directory) if name.startswith('snapshot_'))
+        self.assertEqual(snapshots, ['snapshot_000001.json', 'snapshot_000002.json'])
+        self.assertEqual(store.load()['drivers']['D1']['current_location'], '5')
+
+    def test_background_save(self):
+        store = SnapshotStore(self.directory)
+        for i in range(20):
+            store.save_async(make_state({'D%d' % j: {} for j in range(i + 1)}))
+        store.close()
+        self.assertEqual(len(SnapshotStore(self.directory).load()['drivers']), 20)
+
+    def test_import_legacy_backups(self):
+        legacy_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'persistent')
+        state = import_legacy_backups(legacy_dir)
+        self.assertIn('D001', state['drivers'])
+        self.assertIn('A', state['nodes'])
+
+class TestSQLiteStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = SQLiteStore(os.path.join(self.temp_dir.name, 'tracker.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_wal_mode(self):
+        mode = self.store.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), 'wal')
+
+    def test_pending_deliveries_older_than(self):
+        now = datetime.now()
+        deliveries = []
+        for i in range(100):
+            delivery = Delivery(f"DL{i:03d}", 'B')
+            delivery.created_at = now - timedelta(minutes=i)
+            if i % 2:
+                delivery.update_status('Completed')
+            deliveries.append(delivery)
+        self.store.upsert_drivers([Driver('D1', 'Ann', 'A')])
+        self.store.upsert_deliveries(deliveries, driver_ids={'DL010': 'D1'})
+
+        old = list(self.store.pending_deliveries_older_than(now - timedelta(minutes=89.5)))
+        self.assertEqual([row['delivery_id'] for row in old],
+                         ['DL098', 'DL096', 'DL094', 'DL092', 'DL090'])
+        self.assertEqual([row['delivery_id'] for row in self.store.deliveries_for_driver('D1')], ['DL010'])
+
+        plan = self.store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM deliveries WHERE status = ? AND created_at < ?",
+            ('Pending', now.isoformat())).fetchall()
+        self.assertIn('idx_deliveries_status_created', ' '.join(str(tuple(row)) for row in plan))
+
+    def test_delivery_driver_must_exist(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.store.upsert_deliveries([Delivery('DL1', 'A')], driver_ids={'DL1': 'D9'})
+
+        self.store.upsert_drivers([Driver('D1', 'Ann', 'A')])
+        self.store.upsert_deliveries([Delivery('DL1', 'A')], driver_ids={'DL1': 'D1'})
+        # Deleting the driver unassigns its deliveries
+        self.store.save_state(dict(make_state({}), deliveries={'DL1': {'destination': 'A'}}))
+        self.assertEqual(self.store.count('deliveries'), 1)
+        self.assertEqual(list(self.store.deliveries_for_driver('D1')), [])
+
+    def test_batch_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.store.batch():
+                self.store.upsert_deliveries([Delivery('DL1', 'A')])
+                raise RuntimeError('boom')
+        self.assertEqual(self.store.count('deliveries'), 0)
+
+    def test_graph_round_trip(self):
+        graph = Graph()
+        graph.add_node('A', {'x': 0, 'y': 0})
+        graph.add_node('B', {'x': 100, 'y': 0})
+        graph.add_edge('A', 'B', 5)
+        self.store.save_graph(graph)
+
+        self.assertEqual(self.store.get_neighbors('B'), {'A': 5})
+        loaded = self.store.load_graph()
+        self.assertEqual(loaded.edges, graph.edges)
+        self.assertEqual(loaded.nodes, graph.nodes)
+
+    def test_state_round_trip(self):
+        state = make_state({'D1': {'name': 'Ann', 'current_location': 'A', 'status': 'Available',
+                                   'assigned_deliveries': ['DL1'], 'rating': 4.5,
+                                   'efficiency_score': 100}})
+        state['deliveries'] = {'DL1': {'destination': 'B', 'dish': 'Apple Pie', 'status': 'Pending', 'progress': 0}}
+        self.assertFalse(self.store.has_saved_state())
+        self.store.save_state(state)
+
+        self.assertTrue(self.store.has_saved_state())
+        loaded = self.store.load_state()
+        self.assertEqual(loaded['deliveries']['DL1']['dish'], 'Apple Pie')
+        self.assertEqual(loaded['edges'], state['edges'])
+        self.assertEqual(loaded['drivers']['D1']['assigned_deliveries'], ['DL1'])
+        self.assertEqual(loaded['deliveries']['DL1']['destination'], 'B')
+
+        self.assertEqual(loaded['drivers']['D1']['current_location'], 'A')
+
+        # Entries missing from the new state are removed
+        self.store.save_state(make_state({}))
+        self.assertEqual(self.store.count('drivers'), 0)
+        self.assertEqual(self.store.count('deliveries'), 0)
+
+    def test_driver_locations_round_trip(self):
+        locations = {'D1': 'A', 'D2': (12.5, -3.25), 'D3': 7, 'D4': '42'}
+        self.store.save_state(make_state({
+            driver_id: {'name': driver_id, 'current_location': location, 'status': 'Available'}
+            for driver_id, location in locations.items()}))
+        loaded = self.store.load_state()['drivers']
+        self.assertEqual({driver_id: data['current_location'] for driver_id, data in loaded.items()},
+                         locations)
+
+        self.store.upsert_drivers([Driver('D5', 'Eve', (1.0, 2.0))])
+        self.assertEqual(self.store.load_state()['drivers']['D5']['current_location'], (1.0, 2.0))
+
+    def test_stands_in_for_snapshot_store(self):
+        store = open_state_store(self.temp_dir.name, 'sqlite')
+        try:
+            self.assertIsInstance(store, SQLiteStore)
+            store.save_async(make_state({'D1': {'name': 'Ann', 'current_location': 'B'}}))
+        finally:
+            store.close()
+        reopened = SQLiteStore(os.path.join(self.temp_dir.name, 'state.db'))
+        try:
+            self.assertEqual(reopened.load()['drivers']['D1']['current_location'], 'B')
+        finally:
+            reopened.close()
+
+        self.assertIsInstance(open_state_store(self.temp_dir.name), SnapshotStore)
+        with self.assertRaises(ValueError):
+            open_state_store(self.temp_dir.name, 'csv')
+
+if __name__ == '__main__':
+    unittest.main()
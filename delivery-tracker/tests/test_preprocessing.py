@@ -0,0 +1,121 @@
+import random
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from algorithms.preprocessing import preprocess_graph, largest_component
+from algorithms.routing import Routing
+from models.graph import Graph
+from models.union_find import UnionFind
+
+def path_cost(graph, path):
+    return sum(graph.get_edge_weight(a, b) for a, b in zip(path, path[1:]))
+
+class TestUnionFind(unittest.TestCase):
+    def test_union_and_groups(self):
+        sets = UnionFind(range(5))
+        self.assertTrue(sets.union(0, 1))
+        self.assertTrue(sets.union(3, 4))
+        self.assertFalse(sets.union(1, 0))
+        self.assertEqual(sets.count, 3)
+        self.assertTrue(sets.connected(0, 1))
+        self.assertFalse(sets.connected(1, 3))
+        self.assertEqual(sorted(sorted(group) for group in sets.groups().values()), [[0, 1], [2], [3, 4]])
+
+class TestPreprocessing(unittest.TestCase):
+    def setUp(self):
+        # A loop A-B-C-A made of degree-2 chains, spurs E, F and G off the
+        # junctions, and a separate fragment X-Y
+        self.graph = Graph()
+        self.graph.add_edge('A', 'a1', 1)
+        self.graph.add_edge('a1', 'a2', 1)
+        self.graph.add_edge('a2', 'B', 1)
+        self.graph.add_edge('B', 'b1', 2)
+        self.graph.add_edge('b1', 'C', 2)
+        self.graph.add_edge('C', 'D', 3)
+        self.graph.add_edge('D', 'd1', 1)
+        self.graph.add_edge('d1', 'A', 1)
+        self.graph.add_edge('A', 'E', 1)
+        self.graph.add_edge('B', 'F', 1)
+        self.graph.add_edge('C', 'G', 1)
+        self.graph.add_edge('X', 'Y', 1)
+
+    def test_largest_component(self):
+        nodes, components = largest_component(self.graph)
+        self.assertEqual(components, 2)
+        self.assertNotIn('X', nodes)
+        self.assertIn('b1', nodes)
+
+    def test_chains_are_contracted(self):
+        reduced = preprocess_graph(self.graph)
+        self.assertEqual(set(reduced.graph.nodes), {'A', 'B', 'C', 'E', 'F', 'G'})
+        self.assertEqual(reduced.graph.get_edge_weight('A', 'B'), 3)
+        self.assertEqual(reduced.expand(['A', 'B', 'C']), ['A', 'a1', 'a2', 'B', 'b1', 'C'])
+        self.assertEqual(reduced.report['fragment_nodes_removed'], 2)
+        self.assertEqual(reduced.report['contracted_nodes'], 5)
+        self.assertEqual(reduced.graph.get_edge_weight('C', 'A'), 5)
+
+    def test_routes_from_contracted_nodes(self):
+        routing = Routing(self.graph, preprocess=True)
+        self.assertEqual(routing.shortest_path('E', 'C'), ['E', 'A', 'd1', 'D', 'C'])
+        self.assertEqual(routing.shortest_path('a2', 'b1'), ['a2', 'B', 'b1'])
+        self.assertEqual(routing.shortest_path('a2', 'a1'), ['a2', 'a1'])
+        self.assertEqual(routing.shortest_path('a1', 'd1'), ['a1', 'A', 'd1'])
+        self.assertEqual(routing.shortest_path('X', 'Y'), ['X', 'Y'])
+        self.assertIsNone(routing.shortest_path('A', 'X'))
+
+    def test_rebuilds_after_graph_changes(self):
+        routing = Routing(self.graph, preprocess=True)
+        self.assertEqual(routing.shortest_path('E', 'C'), ['E', 'A', 'd1', 'D', 'C'])
+        reduced = routing.preprocessed
+        self.graph.add_edge('E', 'G', 1)
+        self.assertEqual(routing.shortest_path('E', 'C'), ['E', 'G', 'C'])
+        self.assertIsNot(routing.preprocessed, reduced)
+        self.assertEqual(routing.preprocessed_version, self.graph.version)
+
+    def test_astar_stops_once_target_cannot_improve(self):
+        # A grid whose heuristic is exact along the rows: A* should settle
+        # the straight run only, not drain the rest of the heap
+        graph = Graph()
+        for x in range(10):
+            for y in range(10):
+                graph.add_node((x, y), {'x': x, 'y': y})
+                if x:
+                    graph.add_edge((x - 1, y), (x, y), 1)
+                if y:
+                    graph.add_edge((x, y - 1), (x, y), 1)
+        routing = Routing(graph, preprocess=True)
+        path = routing.a_star_search((0, 0), (9, 0))
+        self.assertEqual(path_cost(graph, path), 9)
+        self.assertLess(routing.nodes_settled, 20)
+
+    def test_matches_plain_dijkstra_on_random_graphs(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            graph = Graph()
+            count = rng.randint(2, 20)
+            for node in range(count):
+                graph.add_node(node)
+            for _ in range(count + 3):
+                a, b = rng.randrange(count), rng.randrange(count)
+                if a != b:
+                    graph.add_edge(a, b, rng.randint(1, 9))
+
+            plain = Routing(graph)
+            reduced = Routing(graph, preprocess=True)
+            for _ in range(20):
+                start, end = rng.randrange(count), rng.randrange(count)
+                expected = plain.shortest_path(start, end)
+                path = reduced.shortest_path(start, end)
+                if expected is None:
+                    self.assertIsNone(path)
+                    continue
+                self.assertEqual((path[0], path[-1]), (start, end))
+                self.assertTrue(all(graph.has_edge(a, b) for a, b in zip(path, path[1:])))
+                self.assertEqual(path_cost(graph, path), path_cost(graph, expected))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,10 @@
 import unittest
+import sys
+import os
+
+# Add src to path: src modules import each other as top-level packages
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
 from src.services.tracking_service import TrackingService
 from src.models.driver import Driver
 from src.models.delivery import Delivery
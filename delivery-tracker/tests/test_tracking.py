@@ -0,0 +1,312 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.graph import Graph
+from services.ingestion_server import LocationIngestServer
+from services.tracking_log import TrackingLog
+from services.tracking_service import TrackingService
+from utils.timing_wheel import TimingWheel
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTimingWheel(unittest.TestCase):
+    def test_expires_at_deadline(self):
+        """Timers expire on their tick, including ones that cascade down levels"""
+        wheel = TimingWheel(tick=1.0, slots_per_level=8, levels=3)
+        wheel.schedule("near", 3)
+        wheel.schedule("far", 100)
+
+        self.assertEqual(wheel.advance(2), [])
+        self.assertEqual(wheel.advance(3), ["near"])
+        self.assertEqual(wheel.advance(99), [])
+        self.assertEqual(wheel.advance(100), ["far"])
+        self.assertEqual(len(wheel), 0)
+
+    def test_reschedule_and_cancel(self):
+        wheel = TimingWheel(tick=1.0, slots_per_level=8, levels=2)
+        wheel.schedule("a", 5)
+        wheel.schedule("a", 20)
+        wheel.schedule("b", 5)
+        self.assertTrue(wheel.cancel("b"))
+
+        self.assertEqual(wheel.advance(10), [])
+        self.assertEqual(wheel.advance(20), ["a"])
+
+class TestDriverExpiry(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.tracking_service = TrackingService(ttl_seconds=30, clock=self.clock)
+        self.tracking_service.add_driver("D1", "A")
+        self.tracking_service.add_driver("D2", "B")
+
+    def test_stale_driver_marked_inactive(self):
+        expired = []
+        self.tracking_service.add_expiry_listener(lambda driver_id, info: expired.append(driver_id))
+
+        self.clock.now = 20
+        self.tracking_service.update_driver_location("D1", "C")
+        self.clock.now = 31
+        self.assertEqual(self.tracking_service.expire_stale_drivers(), ["D2"])
+
+        self.assertEqual(expired, ["D2"])
+        self.assertEqual(self.tracking_service.get_driver_info("D2")['status'], 'inactive')
+        self.assertEqual(list(self.tracking_service.get_active_drivers()), ["D1"])
+
+    def test_location_update_revives_driver(self):
+        self.clock.now = 60
+        self.tracking_service.expire_stale_drivers()
+        self.tracking_service.update_driver_location("D1", "B")
+        self.assertTrue(self.tracking_service.is_driver_active("D1"))
+        self.assertFalse(self.tracking_service.is_driver_active("D2"))
+
+class TestLocationSubscriptions(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.tracking_service = TrackingService(clock=self.clock)
+        self.tracking_service.add_driver("D1", (0, 0))
+
+    def test_updates_are_coalesced(self):
+        subscription = self.tracking_service.subscribe(driver_ids=["D1", "D2"])
+        self.tracking_service.add_driver("D2", (5, 5))
+        for x in range(1, 4):
+            self.tracking_service.update_driver_location("D1", (x, x))
+
+        updates = subscription.poll()
+        self.assertEqual(list(updates), ["D1", "D2"])
+        self.assertEqual(updates["D1"]['location'], (3, 3))
+        self.assertEqual(subscription.lag_stats()['coalesced_total'], 3)
+        self.assertEqual(subscription.poll(), {})
+
+    def test_region_subscription_reports_exit(self):
+        subscription = self.tracking_service.subscribe(region=(0, 0, 10, 10))
+        self.tracking_service.add_driver("D2", (50, 50))
+        self.assertEqual(list(subscription.poll()), ["D1"])
+
+        self.tracking_service.update_driver_location("D1", (20, 20))
+        self.assertFalse(subscription.poll()["D1"]['in_region'])
+
+    def test_slow_consumer_keeps_latest_state(self):
+        subscription = self.tracking_service.subscribe(max_pending=2)
+        self.clock.now = 5
+        self.tracking_service.add_driver("D2", (1, 1))
+        self.tracking_service.add_driver("D3", (2, 2))
+        # D1's queued state was dropped for room; its next move must still arrive
+        self.tracking_service.update_driver_location("D1", (9, 9))
+
+        stats = subscription.lag_stats()
+        self.assertEqual(stats['dropped_total'], 1)
+        self.assertEqual(stats['pending'], 3)
+        self.assertEqual(stats['max_lag_seconds'], 5)
+        updates = subscription.poll(max_items=2)
+        self.assertEqual(list(updates), ["D1", "D2"])
+        self.assertEqual(updates["D1"]['location'], (9, 9))
+        self.assertEqual(list(subscription.poll()), ["D3"])
+
+class TestTrackingLog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.clock.now = 1700000000.0
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def open_log(self, **kwargs):
+        return TrackingLog(self.temp_dir.name, clock=self.clock, block_records=4, **kwargs)
+
+    def test_replay_restores_latest_state(self):
+        log = self.open_log()
+        tracking_service = TrackingService(event_log=log)
+        tracking_service.add_driver("D1", "A")
+        tracking_service.add_driver("D2", (12.5, -3.25))
+        for i in range(10):
+            self.clock.now += 1
+            tracking_service.update_driver_location("D2", (12.5 + i, -3.25))
+        tracking_service.update_driver_status("D1", "busy")
+        log.close()
+
+        restored = TrackingService()
+        state = self.open_log().replay(restored)
+        self.assertEqual(state["D2"]['location'], (21.5, -3.25))
+        self.assertEqual(restored.get_driver_info("D1")['location'], "A")
+        self.assertEqual(restored.get_driver_info("D1")['status'], "busy")
+
+    def test_time_range_query(self):
+        log = self.open_log()
+        for i in range(20):
+            log.append_location("D1", (i, i), timestamp=self.clock.now + i)
+        log.flush()
+
+        start = self.clock.now + 5
+        trajectory = log.trajectory("D1", start, start + 3)
+        self.assertEqual([location for _, location in trajectory], [(5, 5), (6, 6), (7, 7), (8, 8)])
+
+    def test_torn_tail_is_discarded(self):
+        log = self.open_log()
+        for i in range(5):
+            log.append_location("D1", "N%d" % i, timestamp=self.clock.now + i)
+        log.flush()
+        path = log.writer.path
+        log.writer.file.close()
+        with open(path, 'ab') as file:
+            file.write(bytes([3, 0]))  # Half a record
+
+        events = list(self.open_log().query())
+        self.assertEqual([value for _, _, _, value in events], ["N0", "N1", "N2", "N3", "N4"])
+
+    def test_compaction_merges_segments(self):
+        log = self.open_log(segment_bytes=64, compact_after=100)
+        for i in range(60):
+            # Stationary driver: repeated positions collapse on compaction
+            log.append_location("D1", (i // 10, 0), timestamp=self.clock.now + i)
+            log.flush()
+        self.assertGreater(len(log.segments), 3)
+
+        log.compact()
+        self.assertEqual(len(log.segments), 2)
+        locations = [location for _, location in log.trajectory("D1")]
+        self.assertLess(len(locations), 20)
+        self.assertEqual(sorted(set(locations)), [(x, 0) for x in range(6)])
+
+    def test_interrupted_compaction_is_finished_on_reopen(self):
+        log = self.open_log(segment_bytes=64, compact_after=100)
+        for i in range(60):
+            log.append_location("D1", (i // 10, 0), timestamp=self.clock.now + i)
+            log.flush()
+        log._finish_compaction = lambda: None  # Crash before the merged segments are deleted
+        log.compact()
+        compacted = log.trajectory("D1")
+        log.close()
+
+        reopened = self.open_log()
+        self.assertEqual(len(reopened.segments), 2)
+        self.assertEqual(reopened.trajectory("D1"), compacted)
+
+    def test_query_rounds_like_append(self):
+        log = self.open_log()
+        moment = self.clock.now + 0.0006  # Stored as the next whole millisecond
+        log.append_location("D1", "A", timestamp=moment)
+        self.assertEqual([value for _, value in log.trajectory("D1", moment, moment)], ["A"])
+
+    def test_buffer_is_flushed_once_traffic_stops(self):
+        log = self.open_log(flush_every=1000, flush_interval=1.0)
+        log.append_location("D1", "A")
+        size = os.path.getsize(log.writer.path)
+        self.assertFalse(log.flush_if_due())
+        self.clock.now += 2  # No further appends: the flusher has to write it
+        deadline = time.monotonic() + 5
+        while os.path.getsize(log.writer.path) == size and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertGreater(os.path.getsize(log.writer.path), size)
+        self.assertEqual(log.pending, 0)
+        log.close()
+
+    def test_rotation_compacts_in_background(self):
+        log = self.open_log(segment_bytes=64, compact_after=3)
+        for i in range(60):
+            log.append_location("D1", (i // 10, 0), timestamp=self.clock.now + i)
+            log.flush()
+        log._compactor.join()
+        self.assertLess(len(log.segments), log.next_seq)  # Some segments were merged
+        locations = [location for _, location in log.trajectory("D1")]
+        self.assertEqual(sorted(set(locations)), [(x, 0) for x in range(6)])
+        log.close()
+
+    def test_idle_buffer_is_flushed_after_interval(self):
+        log = self.open_log(flush_every=1000, flush_interval=1.0)
+        log.append_location("D1", "A")
+        size = os.path.getsize(log.writer.path)
+        self.clock.now += 2
+        log.append_location("D1", "B")
+        self.assertGreater(os.path.getsize(log.writer.path), size)
+        self.assertEqual(log.pending, 0)
+
+class TestLocationIngestServer(unittest.IsolatedAsyncioTestCase):
+    async def test_ingests_ndjson_reports(self):
+        tracking_service = TrackingService()
+        server = LocationIngestServer(tracking_service, port=0, batch_size=2)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            reports = [
+                {'driver_id': 'D1', 'location': 'A'},
+                {'driver_id': 'D2', 'location': [10, 20]},
+                {'driver_id': 'D1', 'location': 'B', 'status': 'busy'},
+            ]
+            for report in reports:
+                writer.write(json.dumps(report).encode() + b"\n")
+            writer.write(b"not json\n")
+            writer.write(b'{"op": "stats"}\n')
+            await writer.drain()
+            await server.queue.join()
+
+            stats = json.loads(await reader.readline())
+            writer.close()
+        finally:
+            await server.stop()
+
+        self.assertEqual(stats['received_total'], 3)
+        self.assertEqual(stats['rejected_total'], 1)
+        self.assertEqual(tracking_service.get_driver_info('D1')['location'], 'B')
+        self.assertEqual(tracking_service.get_driver_info('D1')['status'], 'busy')
+        self.assertEqual(tracking_service.get_driver_info('D2')['location'], (10, 20))
+
+    async def test_malformed_reports_are_rejected(self):
+        """Bad lines are counted and skipped; the writer keeps applying later reports"""
+        tracking_service = TrackingService()
+        graph = Graph()
+        graph.add_node("A")
+        server = LocationIngestServer(tracking_service, port=0, graph=graph, batch_size=1)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            for line in (b'5', b'[1]', b'"text"', b'{"driver_id": 1, "location": {}}',
+                         b'{"driver_id": [1], "location": "A"}', b'{"driver_id": 2, "location": [1, "x"]}',
+                         b'{"driver_id": 3, "location": "Z"}', b'{"driver_id": 5, "location": "A", "status": "removed"}',
+                         b'{"driver_id": 6, "location": "A", "status": ["busy"]}', b'{"driver_id": 4, "location": "A"}'):
+                writer.write(line + b"\n")
+            writer.write(b'{"op": "stats"}\n')
+            await writer.drain()
+            await asyncio.wait_for(reader.readline(), 5)  # Stats reply: all lines were read
+            await asyncio.wait_for(server.queue.join(), 5)
+            writer.close()
+        finally:
+            await asyncio.wait_for(server.stop(), 5)
+
+        self.assertEqual(tracking_service.get_driver_info(4)['location'], "A")
+        self.assertEqual(server.metrics.rejected_total, 9)
+        self.assertEqual(server.metrics.applied_total, 1)
+
+    async def test_failed_update_does_not_drop_its_batch(self):
+        """Only the report that raised counts as rejected; the rest of the batch is applied"""
+        class FlakyTrackingService(TrackingService):
+            def update_driver_locations(self, updates):
+                if any(driver_id == 'bad' for driver_id, _, _ in updates):
+                    raise RuntimeError("storage unavailable")
+                super().update_driver_locations(updates)
+
+        tracking_service = FlakyTrackingService()
+        server = LocationIngestServer(tracking_service, port=0, batch_size=10)
+        server._apply_batch([{'driver_id': 'D1', 'location': 'A'},
+                             {'driver_id': 'bad', 'location': 'A'},
+                             {'driver_id': 'D2', 'location': 'B'}])
+
+        self.assertEqual(server.metrics.rejected_total, 1)
+        self.assertEqual(server.metrics.applied_total, 2)
+        self.assertEqual(tracking_service.get_driver_info('D2')['location'], 'B')
+
+if __name__ == '__main__':
+    unittest.main()